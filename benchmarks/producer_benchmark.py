@@ -0,0 +1,73 @@
+"""Compare per-message RabbitMQ connections with the pooled publisher.
+
+Needs a reachable broker (``RABBITMQ_URL``, default localhost)::
+
+    python -m benchmarks.producer_benchmark --messages 2000 --threads 4
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+
+from webapp.config import get_config
+from webapp.publisher import RabbitMQPublisher
+
+QUEUE = "producer_benchmark"
+
+
+def publish_per_message(parameters, body):
+    """What producer.py did before: connect, declare, publish, close."""
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    channel.queue_declare(queue=QUEUE)
+    channel.basic_publish(exchange="", routing_key=QUEUE, body=body)
+    connection.close()
+
+
+def run(label, publish, messages, threads):
+    body = json.dumps({"job_id": "benchmark", "user_id": "benchmark"})
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: publish(body), range(messages)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<12} {messages} messages in {elapsed:.2f}s "
+        f"({messages / elapsed:,.0f} msg/s, {elapsed / messages * 1000:.2f} ms/msg)"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--messages", type=int, default=1000)
+    arg_parser.add_argument("--threads", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    config = get_config()
+    parameters = pika.URLParameters(config.RABBITMQ_URL)
+    publisher = RabbitMQPublisher(config.RABBITMQ_URL, pool_size=args.threads)
+
+    run(
+        "per-message",
+        lambda body: publish_per_message(parameters, body),
+        args.messages,
+        args.threads,
+    )
+    run(
+        "pooled",
+        lambda body: publisher.publish(QUEUE, body),
+        args.messages,
+        args.threads,
+    )
+    print("publisher stats:", publisher.stats())
+
+    publisher.close()
+    connection = pika.BlockingConnection(parameters)
+    connection.channel().queue_delete(queue=QUEUE)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from webapp import application_consumer
+from webapp.application_consumer import count_applications, handle_application_batch
+
+
+@pytest.fixture
+def mock_mongo():
+    with patch.object(application_consumer, "mongo") as mock_mongo:
+        yield mock_mongo
+
+
+def message(job_id, user_id):
+    return json.dumps({"job_id": job_id, "user_id": user_id}).encode()
+
+
+def test_count_applications(mock_mongo):
+    mock_mongo.db.job_applications.aggregate.return_value = [
+        {"_id": "1", "applications": 2},
+        {"_id": "2", "applications": 1},
+    ]
+
+    assert count_applications("job_id", {"1", "2"}) == {"1": 2, "2": 1}
+    pipeline = mock_mongo.db.job_applications.aggregate.call_args.args[0]
+    assert sorted(pipeline[0]["$match"]["job_id"]["$in"]) == ["1", "2"]
+
+
+def test_handle_application_batch_records_then_recounts(mock_mongo):
+    mock_mongo.db.job_applications.aggregate.side_effect = [
+        [{"_id": "1", "applications": 2}],
+        [{"_id": "a", "applications": 1}, {"_id": "b", "applications": 3}],
+    ]
+
+    results = handle_application_batch(
+        [message("1", "a"), message("1", "b"), message("1", "a"), b"not json"]
+    )
+
+    assert results[:3] == [None, None, None]
+    assert isinstance(results[3], ValueError)
+    records = mock_mongo.db.job_applications.bulk_write.call_args.args[0]
+    assert [r._filter["_id"] for r in records] == ["a:1", "b:1"]
+    assert all(r._upsert and "$inc" not in r._doc for r in records)
+    requests, kwargs = mock_mongo.db.application_counters.bulk_write.call_args
+    assert not kwargs["ordered"]
+    counts = {r._filter["_id"]: r._doc["$max"]["applications"] for r in requests[0]}
+    assert counts == {"job:1": 2, "user:a": 1, "user:b": 3}
+
+
+def test_handle_application_batch_is_idempotent(mock_mongo):
+    mock_mongo.db.job_applications.aggregate.side_effect = lambda pipeline: [
+        {"_id": key, "applications": 1}
+        for key in pipeline[0]["$match"][pipeline[1]["$group"]["_id"][1:]]["$in"]
+    ]
+
+    handle_application_batch([message("1", "a")])
+    first = mock_mongo.db.application_counters.bulk_write.call_args.args[0]
+    handle_application_batch([message("1", "a")])
+    second = mock_mongo.db.application_counters.bulk_write.call_args.args[0]
+
+    assert [r._doc["$max"] for r in first] == [r._doc["$max"] for r in second]
+
+
+def test_handle_application_batch_fails_every_message_when_write_fails(mock_mongo):
+    error = BulkWriteError({"writeErrors": [], "upserted": []})
+    mock_mongo.db.job_applications.bulk_write.side_effect = error
+
+    results = handle_application_batch([message("1", "a"), message("2", "b")])
+
+    assert results == [error, error]
+    mock_mongo.db.application_counters.bulk_write.assert_not_called()
+
+
+def test_handle_application_batch_without_valid_messages(mock_mongo):
+    results = handle_application_batch([b"{}"])
+
+    assert isinstance(results[0], KeyError)
+    mock_mongo.db.job_applications.bulk_write.assert_not_called()
+    mock_mongo.db.application_counters.bulk_write.assert_not_called()
@@ -1,9 +1,20 @@
+import time
 from unittest.mock import MagicMock, patch
 
+import jwt
 import pytest
 from flask import Flask, jsonify, request
 
-from webapp.utils.auth import token_required, validate_token
+from webapp.utils.auth import (
+    config,
+    token_cache,
+    token_cache_stats,
+    token_required,
+    validate_token,
+    verify_jwt,
+)
+
+JWT_SECRET = "test-secret"
 
 
 # Create a Flask app for testing
@@ -24,8 +35,16 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
 def test_validate_token_success():
-    with patch("webapp.utils.auth.requests.post") as mock_post:
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
         mock_post.return_value = MagicMock(
             status_code=200, json=lambda: {"user_id": "test_user"}
         )
@@ -34,7 +53,8 @@ def test_validate_token_success():
 
 
 def test_validate_token_failure():
-    with patch("webapp.utils.auth.requests.post") as mock_post:
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
         mock_post.return_value = MagicMock(status_code=401)  # Unauthorized
         result = validate_token("invalid_token")
         assert result is None
@@ -67,3 +87,83 @@ def test_token_required_valid_token(client):
             "message": "Access granted",
             "user": {"user_id": "test_user"},
         }
+
+
+def test_validate_token_uses_cache():
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        mock_post.return_value = MagicMock(
+            status_code=200, json=lambda: {"user_id": "test_user"}
+        )
+        assert validate_token("cached_token") == {"user_id": "test_user"}
+        assert validate_token("cached_token") == {"user_id": "test_user"}
+
+        mock_post.assert_called_once()
+        stats = token_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+
+def test_validate_token_caches_rejections():
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        mock_post.return_value = MagicMock(status_code=401)
+        assert validate_token("rejected_token") is None
+        assert validate_token("rejected_token") is None
+        mock_post.assert_called_once()
+
+
+def test_validate_token_does_not_cache_server_errors():
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        mock_post.return_value = MagicMock(status_code=503)
+        assert validate_token("flaky_token") is None
+        assert validate_token("flaky_token") is None
+        assert mock_post.call_count == 2
+
+
+@pytest.fixture
+def jwt_mode():
+    with patch.object(config, "AUTH_VERIFICATION_MODE", "jwt"), patch.object(
+        config, "JWT_SECRET_KEY", JWT_SECRET
+    ):
+        yield
+
+
+def test_verify_jwt_returns_claims(jwt_mode):
+    token = jwt.encode(
+        {"sub": "42", "email": "test@example.com", "exp": time.time() + 60},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+    assert verify_jwt(token) == {"user_id": "42", "email": "test@example.com"}
+
+
+def test_validate_token_jwt_mode_skips_rails(jwt_mode):
+    token = jwt.encode({"sub": "42"}, JWT_SECRET, algorithm="HS256")
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        assert validate_token(token) == {"user_id": "42", "email": None}
+        mock_post.assert_not_called()
+
+
+def test_validate_token_jwt_mode_falls_back_when_expired(jwt_mode):
+    token = jwt.encode(
+        {"sub": "42", "exp": time.time() - 60}, JWT_SECRET, algorithm="HS256"
+    )
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        mock_post.return_value = MagicMock(status_code=401)
+        assert validate_token(token) is None
+        mock_post.assert_called_once()
+
+
+def test_validate_token_jwt_mode_falls_back_for_unknown_key(jwt_mode):
+    token = jwt.encode({"sub": "42"}, "some-other-secret", algorithm="HS256")
+    with patch("webapp.utils.auth.get_rails_client") as mock_client:
+        mock_post = mock_client.return_value.validate_token
+        mock_post.return_value = MagicMock(
+            status_code=200, json=lambda: {"user_id": "42"}
+        )
+        assert validate_token(token) == {"user_id": "42"}
+        mock_post.assert_called_once()
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from webapp.utils.cache import MISSING, TTLCache
+
+
+def test_get_missing_key():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("missing") is MISSING
+    assert cache.stats()["misses"] == 1
+
+
+def test_caches_none_values():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("negative", None)
+    assert cache.get("negative") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" becomes least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = TTLCache(maxsize=2, ttl=10)
+    with patch("webapp.utils.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("webapp.utils.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_zero_ttl_disables_caching():
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is MISSING
@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pika
+import pytest
+
+from webapp.concurrent_consumer import BatchingConsumer, ConcurrentConsumer
+
+
+@pytest.fixture
+def consumer():
+    handler = MagicMock()
+    consumer = ConcurrentConsumer(
+        "amqp://localhost", "queue", handler, retry_delays=(5, 60), max_attempts=3
+    )
+    consumer.connection = MagicMock()
+    # Run the thread-safe callbacks straight away, as the connection would
+    consumer.connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+    consumer.channel = MagicMock()
+    consumer._executor = ThreadPoolExecutor(max_workers=2)
+    yield consumer
+    consumer._executor.shutdown(wait=True)
+
+
+def deliver(consumer, tag, attempts=None):
+    method = MagicMock(delivery_tag=tag, redelivered=False)
+    headers = {"x-attempts": attempts} if attempts else None
+    properties = pika.BasicProperties(headers=headers, delivery_mode=2)
+    consumer._on_message(consumer.channel, method, properties, b"body")
+    consumer._executor.shutdown(wait=True)
+
+
+def republished(consumer):
+    """Return the ``(queue, headers)`` the failed message was republished with."""
+    kwargs = consumer.channel.basic_publish.call_args.kwargs
+    return kwargs["routing_key"], kwargs["properties"].headers
+
+
+def test_acks_after_handler_succeeds(consumer):
+    deliver(consumer, 7)
+
+    consumer.handler.assert_called_once_with(b"body")
+    consumer.channel.basic_ack.assert_called_once_with(delivery_tag=7)
+    stats = consumer.stats()
+    assert stats["processed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["per_second"] == 1 / 60
+
+
+def test_sends_a_failure_to_its_retry_queue(consumer):
+    consumer.handler.side_effect = RuntimeError("smtp down")
+
+    deliver(consumer, 3)
+
+    queue, headers = republished(consumer)
+    assert queue == "queue.retry.5s"
+    assert headers["x-attempts"] == 1
+    assert headers["x-last-error"] == "smtp down"
+    consumer.channel.basic_ack.assert_called_once_with(delivery_tag=3)
+    stats = consumer.stats()
+    assert (stats["failed"], stats["retried"], stats["dead_lettered"]) == (1, 1, 0)
+
+
+def test_backs_off_with_each_attempt(consumer):
+    consumer.handler.side_effect = RuntimeError("smtp down")
+
+    deliver(consumer, 4, attempts=1)
+
+    assert republished(consumer)[0] == "queue.retry.60s"
+
+
+def test_dead_letters_after_max_attempts(consumer):
+    consumer.handler.side_effect = RuntimeError("smtp down")
+
+    deliver(consumer, 5, attempts=2)
+
+    queue, headers = republished(consumer)
+    assert queue == "queue.dead"
+    assert headers["x-attempts"] == 3
+    consumer.channel.basic_ack.assert_called_once_with(delivery_tag=5)
+    assert consumer.stats()["dead_lettered"] == 1
+
+
+def test_requeues_a_failure_the_broker_did_not_confirm(consumer):
+    consumer.handler.side_effect = RuntimeError("SMTP down")
+    consumer.channel.basic_publish.side_effect = pika.exceptions.NackError([])
+
+    deliver(consumer, 7)
+
+    consumer.channel.basic_ack.assert_not_called()
+    consumer.channel.basic_nack.assert_called_once_with(delivery_tag=7, requeue=True)
+    assert consumer.stats()["retried"] == 0
+
+
+def test_run_sets_prefetch_and_manual_ack():
+    with patch("pika.BlockingConnection") as mock_connection:
+        channel = mock_connection.return_value.channel.return_value
+        consumer = ConcurrentConsumer(
+            "amqp://localhost", "queue", MagicMock(), prefetch=5, workers=2
+        )
+
+        consumer.run()
+
+        channel.confirm_delivery.assert_called_once()
+        channel.basic_qos.assert_called_once_with(prefetch_count=5)
+        retry_queue = channel.queue_declare.call_args_list[1].kwargs
+        assert retry_queue["queue"] == "queue.retry.5s"
+        assert retry_queue["arguments"] == {
+            "x-message-ttl": 5000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": "queue",
+        }
+        assert channel.queue_declare.call_args.kwargs == {"queue": "queue.dead"}
+        kwargs = channel.basic_consume.call_args.kwargs
+        assert kwargs["queue"] == "queue"
+        assert "auto_ack" not in kwargs
+        channel.start_consuming.assert_called_once()
+
+
+@pytest.fixture
+def batching_consumer():
+    handler = MagicMock()
+    consumer = BatchingConsumer(
+        "amqp://localhost", "queue", handler, max_batch=3, max_wait=0.5, prefetch=1
+    )
+    consumer.connection = MagicMock()
+    consumer.connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+    consumer.channel = MagicMock()
+    consumer._executor = ThreadPoolExecutor(max_workers=1)
+    yield consumer
+    consumer._executor.shutdown(wait=True)
+
+
+def receive(consumer, tag):
+    method = MagicMock(delivery_tag=tag, redelivered=False)
+    properties = pika.BasicProperties()
+    consumer._on_message(consumer.channel, method, properties, f"body-{tag}")
+
+
+def test_batches_flush_when_full(batching_consumer):
+    consumer = batching_consumer
+    consumer.handler.return_value = [None, RuntimeError("bad"), None]
+    assert consumer.prefetch == 3
+
+    for tag in (1, 2, 3):
+        receive(consumer, tag)
+    consumer._executor.shutdown(wait=True)
+
+    consumer.handler.assert_called_once_with(["body-1", "body-2", "body-3"])
+    acked = [c.kwargs["delivery_tag"] for c in consumer.channel.basic_ack.mock_calls]
+    assert sorted(acked) == [1, 2, 3]
+    assert republished(consumer)[0] == "queue.retry.5s"
+    consumer.channel.basic_nack.assert_not_called()
+    consumer.connection.remove_timeout.assert_called_once()
+    stats = consumer.stats()
+    assert (stats["processed"], stats["failed"], stats["in_flight"]) == (2, 1, 0)
+    assert stats["avg_batch_size"] == 3
+
+
+def test_batches_flush_after_max_wait(batching_consumer):
+    consumer = batching_consumer
+    consumer.handler.return_value = [None]
+
+    receive(consumer, 1)
+    delay, on_timer = consumer.connection.call_later.call_args.args
+    assert delay == 0.5
+    consumer.handler.assert_not_called()
+
+    on_timer()
+    consumer._executor.shutdown(wait=True)
+
+    consumer.handler.assert_called_once_with(["body-1"])
+    consumer.channel.basic_ack.assert_called_once_with(delivery_tag=1)
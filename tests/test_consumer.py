@@ -1,39 +1,26 @@
 import json
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 import pytest
-from flask import Flask
-from flask_mail import Mail
 
-from webapp.consumer import callback, compose_followup_message, get_job_details, slugify
-
-
-@pytest.fixture
-def app():
-    app = Flask(__name__)
-    return app
-
-
-@pytest.fixture
-def mail_instance(app):
-    with app.app_context():
-        mail = Mail(app)
-        yield mail
-
-
-def test_slugify():
-    assert (
-        slugify("Software Engineer", "Tech Company") == "software-engineer-tech-company"
-    )
+from webapp.consumer import (
+    compose_followup_message,
+    get_followup_job_details,
+    get_job_details,
+    get_many_followup_job_details,
+    handle_followup,
+    handle_followup_batch,
+    handle_followup_digest,
+)
 
 
 def test_get_job_details_success():
     job_id = "12345"
     mock_job_data = {"title": "Software Engineer", "company_title": "Tech Company"}
 
-    with patch("requests.get") as mock_get:
-        mock_get.return_value = MagicMock(status_code=200, json=lambda: mock_job_data)
+    with patch("webapp.consumer.get_job_post_cache") as mock_cache:
+        mock_cache.return_value.get.return_value = mock_job_data
         with patch("webapp.config.get_config") as mock_config:
             mock_config.return_value.RAILS_API_URL = "http://localhost:4200"
             title, link = get_job_details(job_id)
@@ -66,43 +53,137 @@ def test_compose_followup_message():
         assert "Follow-Up Date: January 01, 2025, 12:00 PM UTC" in message
 
 
-def test_callback_success(mail_instance):
-    followup_data = {
-        "user_email": "test@example.com",
-        "jobId": "12345",
-        "status": "completed",
-        "notes": "This is a note.",
-    }
+def test_handle_followup_raises_when_send_fails():
+    followup_data = {"user_email": "test@example.com", "jobId": "1", "status": "x"}
 
     with patch("webapp.consumer.compose_followup_message") as mock_compose:
         mock_compose.return_value = "Follow-up message."
-        with patch("webapp.consumer.Mail.send") as mock_send:
-            callback(
-                MagicMock(),
-                MagicMock(),
-                MagicMock(),
-                json.dumps(followup_data).encode(),
-            )
-            mock_send.assert_called_once()
+        with patch("webapp.consumer.smtp_pool.send") as mock_send:
+            mock_send.side_effect = Exception("Email error")
+            with pytest.raises(Exception, match="Email error"):
+                handle_followup(json.dumps(followup_data).encode())
 
+            mock_send.side_effect = None
+            handle_followup(json.dumps(followup_data).encode())
+            assert mock_send.call_args.args[0].recipients == ["test@example.com"]
 
-def test_callback_failure(mail_instance):
+
+def test_handle_followup_formats_iso_follow_up_date():
     followup_data = {
         "user_email": "test@example.com",
-        "jobId": "12345",
-        "status": "completed",
-        "notes": "This is a note.",
+        "jobId": "1",
+        "status": "applied",
+        "followUpDate": "2025-01-21T10:00:00Z",
     }
 
-    with patch("webapp.consumer.compose_followup_message") as mock_compose:
-        mock_compose.return_value = "Follow-up message."
-        with patch("webapp.consumer.Mail.send") as mock_send:
-            mock_send.side_effect = Exception("Email error")
-            callback(
-                MagicMock(),
-                MagicMock(),
-                MagicMock(),
-                json.dumps(followup_data).encode(),
-            )
-            # Ensure the logger captures the error (if you have logging set up)
-            # You can mock the logger if needed
+    with patch("webapp.consumer.get_followup_job_details") as mock_details:
+        mock_details.return_value = (None, None)
+        with patch("webapp.consumer.smtp_pool.send") as mock_send:
+            handle_followup(json.dumps(followup_data).encode())
+
+    body = mock_send.call_args.args[0].body
+    assert "Follow-Up Date: January 21, 2025, 10:00 AM UTC" in body
+
+
+def test_handle_followup_batch_fetches_each_job_once():
+    bodies = [
+        json.dumps({"user_email": f"user{n}@example.com", "jobId": job, "status": "x"})
+        for n, job in enumerate(["1", "2", "1", "1"])
+    ] + [b"not json"]
+
+    with patch("webapp.consumer.get_job_post_cache") as mock_cache:
+        mock_cache.return_value.get_many.return_value = {
+            "1": {"title": "Engineer", "company_title": "Acme"}
+        }
+        with patch("webapp.consumer.smtp_pool.send") as mock_send:
+            results = handle_followup_batch(bodies)
+
+    mock_cache.return_value.get_many.assert_called_once_with(
+        ["1", "2"], ("title", "company_title")
+    )
+    mock_cache.return_value.get.assert_not_called()
+    assert results[:4] == [None] * 4
+    assert isinstance(results[4], ValueError)
+    bodies_sent = [c.args[0].body for c in mock_send.call_args_list]
+    assert "Job Title: Engineer" in bodies_sent[0]
+    assert "Job Title" not in bodies_sent[1]
+
+
+def test_handle_followup_digest_sends_one_email_per_user():
+    bodies = [
+        json.dumps({"user_email": email, "jobId": job, "status": status})
+        for email, job, status in [
+            ("a@example.com", "1", "applied"),
+            ("b@example.com", "1", "saved"),
+            ("a@example.com", "2", "interviewing"),
+        ]
+    ]
+
+    with patch("webapp.consumer.get_job_post_cache") as mock_cache:
+        mock_cache.return_value.get_many.return_value = {
+            "1": {"title": "Engineer", "company_title": "Acme"},
+            "2": {"title": "Designer", "company_title": "Acme"},
+        }
+        with patch("webapp.consumer.smtp_pool.send") as mock_send:
+            mock_send.side_effect = [None, Exception("SMTP error")]
+            results = handle_followup_digest(bodies)
+
+    digest, single = [c.args[0] for c in mock_send.call_args_list]
+    assert digest.recipients == ["a@example.com"]
+    assert digest.subject == "Follow-Up Digest: 2 jobs"
+    assert "Job Title: Engineer" in digest.body
+    assert "Status: interviewing" in digest.body
+    assert single.subject == "Follow-Up Notification"
+    assert results[0] is None and results[2] is None
+    assert str(results[1]) == "SMTP error"
+
+
+def snapshot(captured_at):
+    return {
+        "title": "Snapshot Title",
+        "company": "Acme",
+        "link": "http://localhost:4200/job-posts#snapshot-title-acme",
+        "capturedAt": captured_at.isoformat() + "+00:00",
+    }
+
+
+def test_get_followup_job_details_uses_fresh_snapshot():
+    followup_data = {"jobId": "1", "jobSnapshot": snapshot(datetime.utcnow())}
+
+    with patch("webapp.consumer.get_job_details") as mock_get_job_details:
+        details = get_followup_job_details(followup_data)
+
+    assert details == ("Snapshot Title", followup_data["jobSnapshot"]["link"])
+    mock_get_job_details.assert_not_called()
+
+
+def test_get_followup_job_details_refreshes_old_snapshot():
+    followup_data = {"jobId": "1", "jobSnapshot": snapshot(datetime(2020, 1, 1))}
+
+    with patch("webapp.consumer.get_job_details") as mock_get_job_details:
+        mock_get_job_details.return_value = ("Fresh Title", "http://x/fresh")
+        assert get_followup_job_details(followup_data) == (
+            "Fresh Title",
+            "http://x/fresh",
+        )
+
+        # An old snapshot still beats nothing when Rails is down
+        mock_get_job_details.return_value = (None, None)
+        assert get_followup_job_details(followup_data)[0] == "Snapshot Title"
+
+
+def test_get_many_followup_job_details_fetches_only_stale_jobs():
+    followups = [
+        {"jobId": "1", "jobSnapshot": snapshot(datetime.utcnow())},
+        {"jobId": "2", "jobSnapshot": snapshot(datetime(2020, 1, 1))},
+        {"jobId": "3"},
+    ]
+
+    with patch("webapp.consumer.get_many_job_details") as mock_get_many:
+        mock_get_many.return_value = {"3": ("Job 3", "http://x/3")}
+        details = get_many_followup_job_details(followups)
+
+    assert list(mock_get_many.call_args.args[0]) == ["2", "3"]
+    assert details["1"][0] == "Snapshot Title"
+    assert details["2"][0] == "Snapshot Title"
+    assert details["3"] == ("Job 3", "http://x/3")
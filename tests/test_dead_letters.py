@@ -0,0 +1,51 @@
+from unittest.mock import MagicMock
+
+import pika
+
+from webapp.dead_letters import queue_depths, replay
+
+
+def dead_letter(tag, attempts=5):
+    method = MagicMock(delivery_tag=tag)
+    properties = pika.BasicProperties(
+        headers={"x-attempts": attempts, "x-last-error": "smtp down"}, delivery_mode=2
+    )
+    return method, properties, f"body-{tag}".encode()
+
+
+def test_replay_moves_messages_back_with_fresh_attempts():
+    channel = MagicMock()
+    channel.basic_get.side_effect = [dead_letter(1), dead_letter(2), (None, None, None)]
+
+    assert replay(channel, "followup_notifications") == 2
+
+    channel.confirm_delivery.assert_called_once()
+    channel.basic_get.assert_called_with(queue="followup_notifications.dead")
+    kwargs = channel.basic_publish.call_args.kwargs
+    assert kwargs["routing_key"] == "followup_notifications"
+    assert kwargs["body"] == b"body-2"
+    assert "x-attempts" not in kwargs["properties"].headers
+    acked = [c.kwargs["delivery_tag"] for c in channel.basic_ack.mock_calls]
+    assert acked == [1, 2]
+
+
+def test_replay_stops_at_limit():
+    channel = MagicMock()
+    channel.basic_get.side_effect = [dead_letter(1), dead_letter(2)]
+
+    assert replay(channel, "followup_notifications", limit=1) == 1
+    assert channel.basic_get.call_count == 1
+
+
+def test_queue_depths():
+    channel = MagicMock()
+    channel.queue_declare.return_value.method.message_count = 3
+
+    depths = queue_depths(channel, "followup_notifications", (5,))
+
+    assert depths == {
+        "followup_notifications": 3,
+        "followup_notifications.retry.5s": 3,
+        "followup_notifications.dead": 3,
+    }
+    assert channel.queue_declare.call_args.kwargs["passive"]
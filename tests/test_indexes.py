@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from webapp.models.indexes import (
+    JOB_INTERACTION_INDEXES,
+    OUTBOX_INDEXES,
+    ensure_indexes,
+    index_report,
+)
+
+
+@patch("webapp.models.indexes.mongo")
+def test_ensure_indexes(mock_mongo):
+    ensure_indexes()
+    create_indexes = mock_mongo.db.__getitem__.return_value.create_indexes
+    create_indexes.assert_any_call(JOB_INTERACTION_INDEXES)
+    create_indexes.assert_any_call(OUTBOX_INDEXES)
+    mock_mongo.db.__getitem__.assert_any_call("outbox")
+
+
+def test_listing_indexes_are_partial():
+    documents = {
+        index.document["name"]: index.document for index in JOB_INTERACTION_INDEXES
+    }
+    assert documents["user_id_1_job_id_1"]["unique"] is True
+    assert documents["saved_by_user"]["partialFilterExpression"] == {"is_saved": True}
+
+
+@patch.dict(
+    "webapp.models.indexes.INDEXES",
+    {"job_interactions": JOB_INTERACTION_INDEXES},
+    clear=True,
+)
+@patch("webapp.models.indexes.mongo")
+def test_index_report(mock_mongo):
+    collection = mock_mongo.db["job_interactions"]
+    collection.index_information.return_value = {
+        "_id_": {},
+        "user_id_1_job_id_1": {},
+        "pinned_by_user": {},
+        "saved_by_user": {},
+        "changes_by_user": {},
+    }
+    collection.aggregate.return_value = [
+        {"name": "_id_", "accesses": {"ops": 0}},
+        {"name": "user_id_1_job_id_1", "accesses": {"ops": 120}},
+        {"name": "pinned_by_user", "accesses": {"ops": 0}},
+        {"name": "saved_by_user", "accesses": {"ops": 3}},
+        {"name": "changes_by_user", "accesses": {"ops": 7}},
+    ]
+
+    report = index_report()["job_interactions"]
+
+    assert report["missing"] == ["follow_ups_by_user", "staged"]
+    assert report["unused"] == ["pinned_by_user"]
+    collection.aggregate.assert_called_once_with([{"$indexStats": {}}])
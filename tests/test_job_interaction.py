@@ -1,6 +1,11 @@
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+import mongomock
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
 from webapp import create_app
 from webapp.models.job_interaction import JobInteraction
 
@@ -22,17 +27,33 @@ class JobInteractionTestCase(TestCase):
 
     @patch("webapp.models.job_interaction.mongo")
     def test_save(self, mock_mongo):
-        mock_mongo.db.job_interactions.insert_one.return_value = MagicMock()
+        collection = mock_mongo.db.job_interactions
+        stored_at = datetime(2025, 1, 9, 10, 0)
+        collection.find_one_and_update.return_value = {"updated_at": stored_at}
+
         self.interaction.save()
-        mock_mongo.db.job_interactions.insert_one.assert_called_once_with(
-            self.interaction.to_dict()
-        )
+
+        query, (stage,) = collection.find_one_and_update.call_args.args
+        self.assertEqual(query, {"_id": self.interaction.id})
+        self.assertTrue(collection.find_one_and_update.call_args.kwargs["upsert"])
+        self.assertEqual(stage["$set"]["user_id"], {"$literal": self.user_id})
+        self.assertNotIn("_id", stage["$set"])
+        # Stamped with the server's clock, which changes_since compares against
+        self.assertEqual(stage["$set"]["updated_at"], "$$NOW")
+        self.assertEqual(self.interaction.updated_at, stored_at)
 
     @patch("webapp.models.job_interaction.mongo")
     def test_update(self, mock_mongo):
-        mock_mongo.db.job_interactions.update_one.return_value = MagicMock()
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.return_value = None
+
         self.interaction.update()
-        mock_mongo.db.job_interactions.update_one.assert_called_once()
+
+        query, (stage,) = collection.find_one_and_update.call_args.args
+        self.assertEqual(query, {"user_id": self.user_id, "job_id": self.job_id})
+        self.assertFalse(collection.find_one_and_update.call_args.kwargs["upsert"])
+        self.assertEqual(stage["$set"]["updated_at"], "$$NOW")
+        self.assertIn("written_at.is_pinned", stage["$set"])
 
     @patch("webapp.models.job_interaction.mongo")
     def test_find(self, mock_mongo):
@@ -43,6 +64,492 @@ class JobInteractionTestCase(TestCase):
         self.assertEqual(found_interaction.user_id, self.user_id)
         self.assertEqual(found_interaction.job_id, self.job_id)
 
+    @patch("webapp.models.job_interaction.mongo")
+    def test_toggle(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.return_value = {"is_pinned": True}
+
+        self.assertTrue(JobInteraction.toggle(self.user_id, self.job_id, "is_pinned"))
+
+        query, pipeline = collection.find_one_and_update.call_args.args
+        kwargs = collection.find_one_and_update.call_args.kwargs
+        self.assertEqual(query, {"user_id": self.user_id, "job_id": self.job_id})
+        self.assertEqual(
+            pipeline[0]["$set"]["is_pinned"],
+            {"$not": [{"$ifNull": ["$is_pinned", False]}]},
+        )
+        self.assertTrue(kwargs["upsert"])
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_toggle_retries_duplicate_key(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.side_effect = [
+            DuplicateKeyError("duplicate"),
+            {"is_saved": False},
+        ]
+
+        self.assertFalse(JobInteraction.toggle(self.user_id, self.job_id, "is_saved"))
+        self.assertEqual(collection.find_one_and_update.call_count, 2)
+
+    def test_toggle_rejects_unknown_field(self):
+        with self.assertRaises(ValueError):
+            JobInteraction.toggle(self.user_id, self.job_id, "has_follow_up")
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_upsert(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.return_value = {
+            **self.interaction.to_dict(),
+            "has_follow_up": True,
+        }
+
+        interaction = JobInteraction.upsert(
+            self.user_id, self.job_id, {"has_follow_up": True}
+        )
+
+        self.assertTrue(interaction.has_follow_up)
+        (stage,) = collection.find_one_and_update.call_args.args[1]
+        self.assertEqual(stage["$set"]["has_follow_up"], {"$literal": True})
+        self.assertEqual(stage["$set"]["is_pinned"], {"$ifNull": ["$is_pinned", False]})
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_upsert_bumps_follow_up_version(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.return_value = self.interaction.to_dict()
+
+        JobInteraction.upsert(
+            self.user_id,
+            self.job_id,
+            {"follow_up_data": {"followUpDate": "2024-06-01T09:00:00Z"}},
+        )
+
+        (stage,) = collection.find_one_and_update.call_args.args[1]
+        data, bump = stage["$set"]["follow_up_data"]["$mergeObjects"]
+        self.assertEqual(
+            data, {"$literal": {"followUpDate": datetime(2024, 6, 1, 9, 0)}}
+        )
+        self.assertEqual(
+            bump,
+            {"version": {"$add": [{"$ifNull": ["$follow_up_data.version", 0]}, 1]}},
+        )
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_upsert_stages_notifications_with_the_new_version(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one_and_update.return_value = self.interaction.to_dict()
+        notification = {"_id": "user:job", "status": "scheduled"}
+
+        JobInteraction.upsert(
+            self.user_id,
+            self.job_id,
+            {"follow_up_data": {"status": "applied"}},
+            notifications=[notification],
+        )
+
+        first, second = collection.find_one_and_update.call_args.args[1]
+        self.assertIn("staged_token", first["$set"])
+        self.assertEqual(
+            second["$set"]["staged_notifications"]["$concatArrays"][1],
+            [
+                {
+                    "$mergeObjects": [
+                        {"$literal": notification},
+                        {"version": "$follow_up_data.version"},
+                    ]
+                }
+            ],
+        )
+        mock_mongo.db.scheduled_notifications.replace_one.assert_not_called()
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_follow_up_versions(self, mock_mongo):
+        mock_mongo.db.job_interactions.find.return_value = [
+            {
+                "user_id": self.user_id,
+                "job_id": "job_1",
+                "follow_up_data": {"version": 2},
+                "follow_up_notified_version": 1,
+            },
+            {"user_id": self.user_id, "job_id": "job_2", "follow_up_data": None},
+        ]
+
+        versions = JobInteraction.follow_up_versions(
+            [(self.user_id, "job_1"), (self.user_id, "job_2")]
+        )
+
+        self.assertEqual(
+            versions,
+            {(self.user_id, "job_1"): (2, 1), (self.user_id, "job_2"): (None, None)},
+        )
+
+    def mock_mongo(self):
+        """Patch the model's ``mongo`` with an in-memory database."""
+        patcher = patch("webapp.models.job_interaction.mongo")
+        mock_mongo = patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_mongo.db = mongomock.MongoClient().db
+        return mock_mongo.db.job_interactions
+
+    def test_upsert_stages_events_with_the_change(self):
+        collection = self.mock_mongo()
+        first = {"_id": ObjectId(), "kind": "message", "status": "pending"}
+        second = {"_id": ObjectId(), "kind": "task", "status": "pending"}
+
+        JobInteraction.upsert(
+            self.user_id, self.job_id, {"has_follow_up": True}, events=[first]
+        )
+        JobInteraction.upsert(
+            self.user_id, self.job_id, {"has_follow_up": False}, events=[second]
+        )
+
+        document = collection.find_one({"job_id": self.job_id})
+        self.assertFalse(document["has_follow_up"])
+        self.assertEqual(document["staged_events"], [first, second])
+        self.assertIn("staged_token", document)
+
+    def test_drain_staged_moves_events_to_the_outbox_once(self):
+        collection = self.mock_mongo()
+        event = {"_id": ObjectId(), "kind": "message", "status": "pending"}
+        JobInteraction.upsert(
+            self.user_id, self.job_id, {"has_follow_up": True}, events=[event]
+        )
+        document = collection.find_one({"job_id": self.job_id})
+
+        self.assertEqual(JobInteraction.drain_staged(), 1)
+        # A relay that crashed before clearing the events moves them again
+        collection.update_one({"_id": document["_id"]}, {"$set": document})
+        self.assertEqual(JobInteraction.drain_staged(), 1)
+
+        outbox = collection.database.outbox
+        self.assertEqual(list(outbox.find()), [event])
+        document = collection.find_one({"job_id": self.job_id})
+        self.assertNotIn("staged_events", document)
+        self.assertNotIn("staged_token", document)
+        self.assertEqual(JobInteraction.drain_staged(), 0)
+
+    def test_drain_staged_schedules_notifications_unless_newer(self):
+        collection = self.mock_mongo()
+        scheduled = collection.database.scheduled_notifications
+        # A concurrent save already scheduled version 3 of the first follow-up
+        scheduled.insert_one({"_id": "user:job_1", "version": 3})
+        for job_id, version in (("job_1", 2), ("job_2", 1)):
+            collection.insert_one(
+                {
+                    "user_id": self.user_id,
+                    "job_id": job_id,
+                    "staged_notifications": [
+                        {"_id": f"user:{job_id}", "version": version}
+                    ],
+                    "staged_token": ObjectId(),
+                }
+            )
+
+        self.assertEqual(JobInteraction.drain_staged(), 2)
+
+        self.assertEqual(
+            list(scheduled.find().sort("_id")),
+            [{"_id": "user:job_1", "version": 3}, {"_id": "user:job_2", "version": 1}],
+        )
+        self.assertEqual(collection.count_documents({"staged_token": None}), 2)
+        self.assertEqual(
+            collection.count_documents({"staged_notifications": {"$exists": True}}), 0
+        )
+
+    def test_bulk_upsert_is_last_writer_wins_per_field(self):
+        collection = self.mock_mongo()
+        morning, noon = datetime(2024, 5, 1, 10, 0), datetime(2024, 5, 1, 12, 0)
+
+        results = JobInteraction.bulk_upsert(
+            self.user_id,
+            [("job_1", {"is_pinned": (True, noon), "is_saved": (True, noon)})],
+        )
+        self.assertEqual(
+            results, [{"status": "created", "fields": ["is_pinned", "is_saved"]}]
+        )
+
+        # An older pin loses, a newer save wins; neither touches the other.
+        # (mongomock misnumbers upserts that follow an update, so new jobs go
+        # first in these tests.)
+        results = JobInteraction.bulk_upsert(
+            self.user_id,
+            [
+                ("job_2", {"is_pinned": (True, morning)}),
+                (
+                    "job_1",
+                    {
+                        "is_pinned": (False, morning),
+                        "is_saved": (False, datetime(2024, 5, 1, 13, 0)),
+                    },
+                ),
+            ],
+        )
+
+        self.assertEqual(
+            results,
+            [
+                {"status": "created", "fields": ["is_pinned"]},
+                {"status": "applied", "fields": ["is_saved"]},
+            ],
+        )
+        stored = collection.find_one({"job_id": "job_1"})
+        self.assertTrue(stored["is_pinned"])
+        self.assertFalse(stored["is_saved"])
+
+    def test_bulk_upsert_is_not_beaten_by_a_write_to_another_field(self):
+        self.mock_mongo()
+        JobInteraction.toggle(self.user_id, self.job_id, "is_saved")
+
+        # Replayed from before the save, but the pin was never written since
+        results = JobInteraction.bulk_upsert(
+            self.user_id,
+            [(self.job_id, {"is_pinned": (True, datetime(2024, 5, 1, 10, 0))})],
+        )
+
+        self.assertEqual(results, [{"status": "applied", "fields": ["is_pinned"]}])
+
+    def test_bulk_upsert_reports_stale_operations(self):
+        collection = self.mock_mongo()
+        JobInteraction.bulk_upsert(
+            self.user_id, [(self.job_id, {"is_pinned": (True, datetime(2024, 5, 2))})]
+        )
+
+        # Stored dates keep milliseconds only
+        written_at = datetime(2024, 5, 1, 12, 0, 0, 123456)
+        results = JobInteraction.bulk_upsert(
+            self.user_id,
+            [
+                ("job_2", {"is_saved": (True, written_at)}),
+                (self.job_id, {"is_pinned": (False, written_at)}),
+            ],
+        )
+
+        self.assertEqual(
+            results,
+            [
+                {"status": "created", "fields": ["is_saved"]},
+                {"status": "stale", "fields": []},
+            ],
+        )
+        self.assertTrue(collection.find_one({"job_id": self.job_id})["is_pinned"])
+
+    def test_bulk_upsert_rejects_repeated_jobs(self):
+        with self.assertRaises(ValueError):
+            JobInteraction.bulk_upsert(self.user_id, [("job_1", {}), ("job_1", {})])
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_bulk_upsert_reports_errors_and_retries_duplicates(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.bulk_write.side_effect = [
+            BulkWriteError(
+                {
+                    "upserted": [{"index": 0, "_id": ObjectId()}],
+                    "writeErrors": [
+                        {"index": 1, "code": 11000, "errmsg": "duplicate"},
+                        {"index": 2, "code": 2, "errmsg": "bad value"},
+                    ],
+                }
+            ),
+            MagicMock(upserted_ids={}),
+        ]
+        written_at = datetime(2024, 5, 1, 12, 0)
+        collection.find.return_value = [
+            {"job_id": job_id, "written_at": {"is_saved": written_at}}
+            for job_id in ("a", "b")
+        ]
+
+        results = JobInteraction.bulk_upsert(
+            self.user_id,
+            [(job_id, {"is_saved": (True, written_at)}) for job_id in ("a", "b", "c")],
+        )
+
+        self.assertEqual(
+            results,
+            [
+                {"status": "created", "fields": ["is_saved"]},
+                {"status": "applied", "fields": ["is_saved"]},
+                {"status": "error", "error": "bad value"},
+            ],
+        )
+        self.assertEqual(len(collection.bulk_write.call_args.args[0]), 1)
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_find_many(self, mock_mongo):
+        mock_mongo.db.job_interactions.find.return_value = [self.interaction.to_dict()]
+
+        found = JobInteraction.find_many(self.user_id, [self.job_id, "other_job"])
+
+        self.assertEqual(list(found), [self.job_id])
+        mock_mongo.db.job_interactions.find.assert_called_once_with(
+            {"user_id": self.user_id, "job_id": {"$in": [self.job_id, "other_job"]}},
+            {
+                "user_id": 1,
+                "job_id": 1,
+                "is_pinned": 1,
+                "is_saved": 1,
+                "has_follow_up": 1,
+            },
+        )
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_find_with_projection(self, mock_mongo):
+        collection = mock_mongo.db.job_interactions
+        collection.find_one.side_effect = [
+            {
+                "_id": self.interaction.id,
+                "user_id": self.user_id,
+                "job_id": self.job_id,
+            },
+            {"follow_up_data": {"status": "applied"}},
+        ]
+
+        found = JobInteraction.find(
+            self.user_id, self.job_id, fields=JobInteraction.STATUS_FIELDS
+        )
+
+        projection = collection.find_one.call_args.args[1]
+        self.assertNotIn("follow_up_data", projection)
+        self.assertEqual(projection["is_pinned"], 1)
+        self.assertEqual(collection.find_one.call_count, 1)
+
+        # follow_up_data was projected out, so it is loaded on first access
+        self.assertEqual(found.follow_up_data, {"status": "applied"})
+        self.assertEqual(found.follow_up_data, {"status": "applied"})
+        self.assertEqual(collection.find_one.call_count, 2)
+
+    def test_to_dict_stores_native_datetimes(self):
+        self.interaction.follow_up_data = {
+            "status": "applied",
+            "followUpDate": "2025-01-09T12:00:00+02:00",
+        }
+
+        stored = self.interaction.to_dict()
+
+        self.assertIsInstance(stored["updated_at"], datetime)
+        self.assertEqual(
+            stored["follow_up_data"]["followUpDate"], datetime(2025, 1, 9, 10, 0)
+        )
+        # The caller's data keeps the string it sent
+        self.assertEqual(
+            self.interaction.follow_up_data["followUpDate"],
+            "2025-01-09T12:00:00+02:00",
+        )
+
+    def test_from_dict_returns_iso_strings(self):
+        interaction = JobInteraction.from_dict(
+            {
+                "user_id": self.user_id,
+                "job_id": self.job_id,
+                "follow_up_data": {"followUpDate": datetime(2025, 1, 9, 10, 0)},
+                "updated_at": "2025-01-08T10:00:00",
+            }
+        )
+
+        self.assertEqual(
+            interaction.follow_up_data, {"followUpDate": "2025-01-09T10:00:00+00:00"}
+        )
+        self.assertEqual(interaction.updated_at, datetime(2025, 1, 8, 10, 0))
+
+    def test_cursor_accepts_legacy_string_timestamps(self):
+        last_id = ObjectId()
+        cursor = JobInteraction.encode_cursor("2025-01-08T10:00:00", last_id)
+
+        self.assertEqual(
+            JobInteraction.decode_cursor(cursor),
+            (datetime(2025, 1, 8, 10, 0), last_id),
+        )
+
+    def test_uses_slots(self):
+        self.assertFalse(hasattr(self.interaction, "__dict__"))
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_list_for_user_paginates(self, mock_mongo):
+        documents = [
+            {
+                "_id": ObjectId(),
+                "user_id": self.user_id,
+                "job_id": f"job_{i}",
+                "is_saved": True,
+                "updated_at": datetime(2025, 1, 9 - i, 10, 0),
+            }
+            for i in range(3)
+        ]
+        find = mock_mongo.db.job_interactions.find
+        find.return_value.sort.return_value.limit.return_value = documents
+
+        interactions, next_cursor = JobInteraction.list_for_user(
+            self.user_id, "is_saved", limit=2
+        )
+
+        self.assertEqual([i.job_id for i in interactions], ["job_0", "job_1"])
+        self.assertEqual(
+            JobInteraction.decode_cursor(next_cursor),
+            (documents[1]["updated_at"], documents[1]["_id"]),
+        )
+        self.assertEqual(
+            find.call_args.args[0], {"user_id": self.user_id, "is_saved": True}
+        )
+        find.return_value.sort.return_value.hint.assert_not_called()
+
+        # The cursor turns into a keyset range on (updated_at, _id)
+        JobInteraction.list_for_user(
+            self.user_id, "is_saved", limit=2, cursor=next_cursor
+        )
+        query = find.call_args.args[0]
+        self.assertEqual(
+            query["$or"][1],
+            {
+                "updated_at": documents[1]["updated_at"],
+                "_id": {"$lt": documents[1]["_id"]},
+            },
+        )
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_changes_since(self, mock_mongo):
+        change = {
+            "_id": ObjectId(),
+            "job_id": self.job_id,
+            "is_pinned": False,
+            "updated_at": datetime(2025, 1, 9, 10, 0),
+        }
+        find = mock_mongo.db.job_interactions.find
+        find.return_value.sort.return_value.limit.return_value = [change]
+        cursor = JobInteraction.encode_cursor("2025-01-08T10:00:00", ObjectId())
+
+        documents, next_cursor, has_more = JobInteraction.changes_since(
+            self.user_id, cursor=cursor
+        )
+
+        self.assertEqual(documents, [change])
+        self.assertFalse(has_more)
+        self.assertEqual(
+            JobInteraction.decode_cursor(next_cursor),
+            (change["updated_at"], change["_id"]),
+        )
+        query = find.call_args.args[0]
+        self.assertEqual(
+            query["$or"][0], {"updated_at": {"$gt": datetime(2025, 1, 8, 10, 0)}}
+        )
+        # Changes that may still be committing are left for a later sync,
+        # judged by the server's clock like the updated_at stamps themselves
+        self.assertEqual(
+            query["$expr"],
+            {"$lte": ["$updated_at", {"$subtract": ["$$NOW", 5000]}]},
+        )
+
+    @patch("webapp.models.job_interaction.mongo")
+    def test_changes_since_without_changes_keeps_cursor(self, mock_mongo):
+        find = mock_mongo.db.job_interactions.find
+        find.return_value.sort.return_value.limit.return_value = []
+        cursor = JobInteraction.encode_cursor("2025-01-08T10:00:00", ObjectId())
+
+        _, next_cursor, _ = JobInteraction.changes_since(self.user_id, cursor=cursor)
+
+        self.assertEqual(next_cursor, cursor)
+
+    def test_list_for_user_rejects_bad_cursor(self):
+        with self.assertRaises(ValueError):
+            JobInteraction.list_for_user(self.user_id, "is_saved", cursor="garbage")
+
     @patch("webapp.models.job_interaction.mongo")
     def test_create_index(self, mock_mongo):
         mock_mongo.db.job_interactions.create_index.return_value = MagicMock()
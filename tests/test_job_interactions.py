@@ -1,6 +1,8 @@
 import unittest
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+import mongomock
 import requests
 from flask import json
 
@@ -18,12 +20,14 @@ class JobInteractionsTestCase(unittest.TestCase):
     def tearDown(self):
         self.app_context.pop()  # Pop the application context
 
-    @patch("webapp.routes.job_interactions.requests.post")  # Mock requests.post
-    def test_track_view_error(self, mock_post):
+    @patch("webapp.routes.job_interactions.get_rails_client")  # Mock the Rails client
+    def test_track_view_error(self, mock_client):
         job_id = "job_id"
 
         # Simulate an error from the Rails API
-        mock_post.side_effect = requests.exceptions.RequestException("Connection error")
+        mock_client.return_value.increment_view_count.side_effect = (
+            requests.exceptions.RequestException("Connection error")
+        )
 
         response = self.client.post(
             f"/api/jobs/{job_id}/view", headers={"Authorization": "Bearer token"}
@@ -61,15 +65,84 @@ class JobInteractionsTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("user_email", json.loads(response.data))
 
-    @patch("webapp.routes.job_interactions.requests.post")  # Mock requests.post
-    def test_track_view(self, mock_post):
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.capture_snapshot")
+    @patch("webapp.routes.job_interactions.JobInteraction.upsert")
+    def test_create_follow_up_schedules_notification(
+        self, mock_upsert, mock_capture, mock_validate_token
+    ):
+        mock_validate_token.return_value = {
+            "user_id": "123",
+            "email": "test@example.com",
+        }
+        snapshot = {"title": "Engineer", "company": "Acme", "link": "http://x/1"}
+        mock_capture.return_value = snapshot
+        data = {
+            "followUpDate": "2999-01-21T10:00:00Z",
+            "jobId": "job_id",
+            "status": "applied",
+        }
+
+        response = self.client.post(
+            "/api/jobs/job_id/follow-ups",
+            headers={"Authorization": "Bearer token"},
+            json=data,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        user_id, job_id, fields = mock_upsert.call_args.args
+        self.assertEqual(
+            fields,
+            {
+                "follow_up_data": {**data, "jobSnapshot": snapshot},
+                "has_follow_up": True,
+            },
+        )
+        (notification,) = mock_upsert.call_args.kwargs["notifications"]
+        self.assertEqual(notification["user_id"], "123")
+        self.assertEqual(notification["job_id"], "job_id")
+        self.assertEqual(notification["due_at"], datetime(2999, 1, 21, 10, 0))
+        self.assertEqual(notification["payload"]["user_email"], "test@example.com")
+        self.assertEqual(notification["payload"]["jobSnapshot"], snapshot)
+        (message,) = mock_upsert.call_args.kwargs["events"]
+        self.assertEqual(message["queue"], "job_applications")
+        self.assertEqual(message["payload"], {"job_id": "job_id", "user_id": "123"})
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.capture_snapshot")
+    @patch("webapp.routes.job_interactions.JobInteraction.upsert")
+    @patch("webapp.routes.job_interactions.JobInteraction.find")
+    def test_update_follow_up_in_the_past_queues_nothing(
+        self, mock_find, mock_upsert, mock_capture, mock_validate_token
+    ):
+        mock_validate_token.return_value = {"user_id": "123"}
+        mock_capture.return_value = None
+        data = {
+            "followUpDate": "2020-01-21T10:00:00Z",
+            "jobId": "job_id",
+            "status": "interviewing",
+        }
+
+        response = self.client.put(
+            "/api/jobs/job_id/follow-ups",
+            headers={"Authorization": "Bearer token"},
+            json=data,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        mock_upsert.assert_called_once_with(
+            "123", "job_id", {"follow_up_data": data}, events=[], notifications=[]
+        )
+
+    @patch("webapp.routes.job_interactions.get_rails_client")  # Mock the Rails client
+    def test_track_view(self, mock_client):
         job_id = "job_id"
 
         # Mock the response from the Rails API
-        mock_post.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {"view_count": 15, "last_viewed": "2025-01-13T10:00:00Z"},
-        )
+        mock_client.return_value.increment_view_count.return_value = {
+            "view_count": 15,
+            "last_viewed": "2025-01-13T10:00:00Z",
+        }
 
         response = self.client.post(
             f"/api/jobs/{job_id}/view", headers={"Authorization": "Bearer token"}
@@ -81,6 +154,40 @@ class JobInteractionsTestCase(unittest.TestCase):
         self.assertEqual(data["view_count"], 15)
         self.assertEqual(data["last_viewed"], "2025-01-13T10:00:00Z")
 
+    @patch("webapp.routes.job_interactions.config.VIEW_COUNT_MODE", "buffered")
+    @patch("webapp.routes.job_interactions.get_job_post_cache")
+    @patch("webapp.routes.job_interactions.get_view_counter")
+    @patch("webapp.routes.job_interactions.get_rails_client")
+    def test_track_view_buffered(self, mock_client, mock_counter, mock_cache):
+        # Views are buffered and the count is approximated from the cache
+        mock_counter.return_value.record.return_value = 2
+        mock_cache.return_value.get.return_value = {"view_count": 15}
+
+        response = self.client.post("/api/jobs/job_id/view")
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["view_count"], 17)
+        mock_counter.return_value.record.assert_called_once_with("job_id")
+        mock_cache.return_value.get.assert_called_once_with(
+            "job_id", ("view_count", "last_viewed")
+        )
+        mock_client.return_value.increment_view_count.assert_not_called()
+
+    @patch("webapp.routes.job_interactions.config.VIEW_COUNT_MODE", "buffered")
+    @patch("webapp.routes.job_interactions.get_job_post_cache")
+    @patch("webapp.routes.job_interactions.get_view_counter")
+    def test_track_view_buffered_without_job_post(self, mock_counter, mock_cache):
+        # An unknown count is null, not just the views still in the buffer
+        mock_counter.return_value.record.return_value = 1
+        mock_cache.return_value.get.side_effect = requests.exceptions.Timeout("slow")
+
+        response = self.client.post("/api/jobs/job_id/view")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(json.loads(response.data)["view_count"])
+        mock_counter.return_value.record.assert_called_once_with("job_id")
+
     @patch("webapp.utils.auth.validate_token")  # Mock validate_token
     @patch("requests.get")
     def test_get_follow_up(self, mock_get, mock_validate_token):
@@ -109,18 +216,18 @@ class JobInteractionsTestCase(unittest.TestCase):
         )
 
     @patch("webapp.utils.auth.validate_token")  # Mock validate_token
-    @patch("requests.get")
-    def test_get_interaction_status(self, mock_get, mock_validate_token):
+    @patch("webapp.routes.job_interactions.get_job_post_cache")
+    def test_get_interaction_status(self, mock_cache, mock_validate_token):
         mock_validate_token.return_value = {
             "user_id": "123",
             "email": "test@example.com",
         }
 
         # Mock the response to return the interaction status
-        mock_get.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {"view_count": 10, "last_viewed": "2025-01-13T10:00:00Z"},
-        )
+        mock_cache.return_value.get.return_value = {
+            "view_count": 10,
+            "last_viewed": "2025-01-13T10:00:00Z",
+        }
 
         response = self.client.get(
             "/api/jobs/status/job_id", headers={"Authorization": "Bearer token"}
@@ -132,6 +239,203 @@ class JobInteractionsTestCase(unittest.TestCase):
         self.assertIn("viewCount", data)  # Ensure 'viewCount' key exists
         self.assertEqual(data["viewCount"], 10)
 
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.JobInteraction.find_many")
+    @patch("webapp.routes.job_interactions.get_job_post_cache")
+    def test_get_interaction_statuses(self, mock_cache, mock_find_many, mock_validate):
+        mock_validate.return_value = {"user_id": "123", "email": "test@example.com"}
+        mock_find_many.return_value = {
+            "job_1": JobInteraction(user_id="123", job_id="job_1", is_pinned=True)
+        }
+        mock_cache.return_value.get_many.return_value = {
+            "job_1": {"view_count": 10, "last_viewed": "2025-01-13T10:00:00Z"}
+        }
+
+        response = self.client.get(
+            "/api/jobs/status?ids=job_1,job_2",
+            headers={"Authorization": "Bearer token"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        statuses = json.loads(response.data)["statuses"]
+        self.assertTrue(statuses["job_1"]["isPinned"])
+        self.assertEqual(statuses["job_1"]["viewCount"], 10)
+        self.assertFalse(statuses["job_2"]["isPinned"])
+        self.assertIsNone(statuses["job_2"]["viewCount"])
+        mock_find_many.assert_called_once_with("123", ["job_1", "job_2"])
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    def test_get_interaction_statuses_requires_ids(self, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+        response = self.client.get(
+            "/api/jobs/status", headers={"Authorization": "Bearer token"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.JobInteraction.list_for_user")
+    def test_list_saved(self, mock_list_for_user, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+        mock_list_for_user.return_value = (
+            [JobInteraction(user_id="123", job_id="job_1", is_saved=True)],
+            "next",
+        )
+
+        response = self.client.get(
+            "/api/jobs/saved?limit=500", headers={"Authorization": "Bearer token"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["nextCursor"], "next")
+        self.assertEqual(data["items"][0]["jobId"], "job_1")
+        self.assertTrue(data["items"][0]["isSaved"])
+        mock_list_for_user.assert_called_once_with(
+            "123",
+            "is_saved",
+            limit=100,
+            cursor=None,
+            fields=JobInteraction.STATUS_FIELDS,
+        )
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.JobInteraction.changes_since")
+    def test_sync_interactions(self, mock_changes_since, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+        mock_changes_since.return_value = (
+            [
+                {"job_id": "job_1", "is_pinned": True, "has_follow_up": True},
+                {"job_id": "job_2", "is_pinned": False, "is_saved": False},
+            ],
+            "next",
+            False,
+        )
+
+        response = self.client.get(
+            "/api/jobs/sync?cursor=prev", headers={"Authorization": "Bearer token"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data),
+            {
+                "jobIds": ["job_1", "job_2"],
+                "flags": [5, 0],
+                "cursor": "next",
+                "hasMore": False,
+            },
+        )
+        mock_changes_since.assert_called_once_with("123", cursor="prev", limit=500)
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.routes.job_interactions.JobInteraction.bulk_upsert")
+    def test_batch_interactions(self, mock_bulk_upsert, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+        mock_bulk_upsert.return_value = [
+            {"status": "created", "fields": ["is_pinned"]},
+            {"status": "applied", "fields": []},
+        ]
+
+        response = self.client.post(
+            "/api/jobs/batch",
+            json={
+                "operations": [
+                    {
+                        "jobId": "job_1",
+                        "isPinned": True,
+                        "clientTimestamp": "2024-05-01T14:00:00+02:00",
+                    },
+                    {"jobId": "job_2", "isSaved": "yes"},
+                    {"jobId": "job_3", "clientTimestamp": "2999-01-01T00:00:00Z"},
+                ]
+            },
+            headers={"Authorization": "Bearer token"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data)["results"],
+            [
+                {"jobId": "job_1", "status": "created"},
+                {
+                    "jobId": "job_2",
+                    "status": "invalid",
+                    "error": "isSaved must be a boolean",
+                },
+                {"jobId": "job_3", "status": "applied"},
+            ],
+        )
+        user_id, operations = mock_bulk_upsert.call_args.args
+        self.assertEqual(user_id, "123")
+        self.assertEqual(
+            operations[0], ("job_1", {"is_pinned": (True, datetime(2024, 5, 1, 12, 0))})
+        )
+        self.assertEqual(operations[1], ("job_3", {}))
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    @patch("webapp.models.job_interaction.mongo")
+    def test_batch_interactions_merges_operations_on_a_job(
+        self, mock_mongo, mock_validate_token
+    ):
+        mock_validate_token.return_value = {"user_id": "123"}
+        mock_mongo.db = mongomock.MongoClient().db
+
+        response = self.client.post(
+            "/api/jobs/batch",
+            json={
+                "operations": [
+                    {"jobId": "job_1", "isPinned": True},
+                    {"jobId": "job_1", "isSaved": True},
+                    {"jobId": "job_1", "isPinned": False},
+                    # Timestamps from the future are capped at the time of the request
+                    {
+                        "jobId": "job_1",
+                        "isSaved": False,
+                        "clientTimestamp": "2000-01-01T00:00:00Z",
+                    },
+                    {
+                        "jobId": "job_2",
+                        "isSaved": True,
+                        "clientTimestamp": "2999-01-01T00:00:00Z",
+                    },
+                ]
+            },
+            headers={"Authorization": "Bearer token"},
+        )
+
+        self.assertEqual(
+            [r["status"] for r in json.loads(response.data)["results"]],
+            ["created", "applied", "applied", "stale", "created"],
+        )
+        job_1 = mock_mongo.db.job_interactions.find_one({"job_id": "job_1"})
+        self.assertEqual((job_1["is_pinned"], job_1["is_saved"]), (False, True))
+        job_2 = mock_mongo.db.job_interactions.find_one({"job_id": "job_2"})
+        self.assertLessEqual(job_2["written_at"]["is_saved"], datetime.utcnow())
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    def test_batch_interactions_rejects_a_list_body(self, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+
+        response = self.client.post(
+            "/api/jobs/batch",
+            json=[{"jobId": "job_1"}],
+            headers={"Authorization": "Bearer token"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch("webapp.utils.auth.validate_token")  # Mock validate_token
+    def test_batch_interactions_requires_operations(self, mock_validate_token):
+        mock_validate_token.return_value = {"user_id": "123"}
+
+        response = self.client.post(
+            "/api/jobs/batch",
+            json={"operations": []},
+            headers={"Authorization": "Bearer token"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
     @patch("webapp.utils.auth.validate_token")  # Mock validate_token
     def test_toggle_pin(self, mock_validate_token):
         mock_validate_token.return_value = {
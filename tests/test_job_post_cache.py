@@ -0,0 +1,97 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from webapp.job_post_cache import COUNT_FIELDS, STATIC_FIELDS, JobPostCache
+
+JOB_POST = {
+    "title": "Software Engineer",
+    "company_title": "Tech Company",
+    "view_count": 10,
+    "last_viewed": "2025-01-13T10:00:00Z",
+}
+
+
+@pytest.fixture
+def cache():
+    return JobPostCache(
+        field_ttls={"title": 3600, "company_title": 3600, "view_count": 30},
+        default_ttl=30,
+        stale_ttl=300,
+        miss_budget=1,
+    )
+
+
+@pytest.fixture
+def mock_client():
+    with patch("webapp.job_post_cache.get_rails_client") as mock_get_client:
+        yield mock_get_client.return_value
+
+
+def test_miss_fetches_and_caches(cache, mock_client):
+    mock_client.get_job_post.return_value = JOB_POST
+    assert cache.get("42", COUNT_FIELDS) == JOB_POST
+    assert cache.get("42", STATIC_FIELDS) == JOB_POST
+    mock_client.get_job_post.assert_called_once_with("42")
+
+
+def test_per_field_ttls(cache, mock_client):
+    mock_client.get_job_post.return_value = JOB_POST
+    with patch("webapp.job_post_cache.time.monotonic", return_value=1000.0):
+        cache.get("42", COUNT_FIELDS)
+
+    refreshed = threading.Event()
+    mock_client.get_job_post.side_effect = lambda job_id: refreshed.set() or JOB_POST
+    with patch("webapp.job_post_cache.time.monotonic", return_value=1060.0):
+        # Static fields are still fresh, so no refresh is triggered
+        assert cache.get("42", STATIC_FIELDS) == JOB_POST
+        assert not refreshed.is_set()
+
+        # Counts are stale but inside the stale window: served, then refreshed
+        assert cache.get("42", COUNT_FIELDS) == JOB_POST
+        assert refreshed.wait(1)
+    assert cache.stats()["stale_served"] == 1
+
+
+def test_miss_respects_latency_budget(cache, mock_client):
+    release = threading.Event()
+    mock_client.get_job_post.side_effect = lambda job_id: release.wait(5) and JOB_POST
+    cache.miss_budget = 0.05
+
+    with pytest.raises(requests.exceptions.Timeout):
+        cache.get("42", COUNT_FIELDS)
+    assert cache.stats()["budget_exceeded"] == 1
+    release.set()
+
+
+def test_update_merges_counts(cache, mock_client):
+    mock_client.get_job_post.return_value = JOB_POST
+    cache.get("42", COUNT_FIELDS)
+    cache.update("42", {"view_count": 11})
+    assert cache.get("42", COUNT_FIELDS)["view_count"] == 11
+    assert mock_client.get_job_post.call_count == 1
+
+
+def test_get_many_fetches_misses_concurrently(cache, mock_client):
+    mock_client.get_job_post.side_effect = lambda job_id: {"view_count": int(job_id)}
+    cache.get("1", COUNT_FIELDS)
+
+    results = cache.get_many(["1", "2", "3", "2"], COUNT_FIELDS)
+
+    assert results == {
+        "1": {"view_count": 1},
+        "2": {"view_count": 2},
+        "3": {"view_count": 3},
+    }
+    assert mock_client.get_job_post.call_count == 3
+
+
+def test_get_many_omits_jobs_over_budget(cache, mock_client):
+    release = threading.Event()
+    mock_client.get_job_post.side_effect = lambda job_id: release.wait(5) and {}
+    cache.miss_budget = 0.05
+
+    assert cache.get_many(["1"], COUNT_FIELDS) == {}
+    release.set()
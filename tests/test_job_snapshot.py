@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import requests
+
+from webapp.job_snapshot import capture_snapshot, is_fresh, job_snapshot, slugify
+
+
+def test_slugify():
+    assert (
+        slugify("Software Engineer", "Tech Company") == "software-engineer-tech-company"
+    )
+
+
+def test_job_snapshot():
+    snapshot = job_snapshot({"title": "Software Engineer", "company_title": "Acme"})
+
+    assert snapshot["title"] == "Software Engineer"
+    assert snapshot["company"] == "Acme"
+    assert snapshot["link"].endswith("/job-posts#software-engineer-acme")
+    assert is_fresh(snapshot, 60)
+
+
+def test_capture_snapshot_without_rails():
+    with patch("webapp.job_snapshot.get_job_post_cache") as mock_cache:
+        mock_cache.return_value.get.side_effect = requests.exceptions.Timeout()
+        assert capture_snapshot("1") is None
+
+
+def test_is_fresh():
+    old = (datetime.utcnow() - timedelta(hours=2)).isoformat() + "+00:00"
+
+    assert not is_fresh({"capturedAt": old}, 3600)
+    assert is_fresh({"capturedAt": old}, 3 * 3600)
+    assert not is_fresh({}, 3600)
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from webapp.utils import leasing
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.queue
+
+
+def queued(collection, count, due_at=None, status="pending"):
+    """Insert ``count`` documents due at ``due_at``, oldest first."""
+    due_at = due_at or datetime.utcnow() - timedelta(minutes=1)
+    documents = [
+        {
+            "_id": n,
+            "status": status,
+            "attempts": 0,
+            "next_attempt_at": due_at + timedelta(seconds=n),
+        }
+        for n in range(count)
+    ]
+    collection.insert_many(documents)
+    return documents
+
+
+def test_claim_due_claims_the_oldest_due_documents(collection):
+    queued(collection, 3)
+    collection.insert_one(
+        {"_id": "later", "status": "pending", "next_attempt_at": datetime(2100, 1, 1)}
+    )
+    collection.insert_one(
+        {"_id": "sent", "status": "sent", "next_attempt_at": datetime(2000, 1, 1)}
+    )
+
+    claimed = leasing.claim_due(collection, "pending", 2, lease_seconds=30)
+
+    assert [document["_id"] for document in claimed] == [0, 1]
+    assert claimed[0]["claim"] == claimed[1]["claim"]
+    assert claimed[0]["next_attempt_at"] > datetime.utcnow()
+    # Claimed documents are not due again until their lease runs out
+    again = leasing.claim_due(collection, "pending", 10, lease_seconds=30)
+    assert [document["_id"] for document in again] == [2]
+
+
+def test_claim_due_without_due_documents(collection):
+    queued(collection, 1, due_at=datetime(2100, 1, 1))
+
+    assert leasing.claim_due(collection, "pending", 10, lease_seconds=30) == []
+
+
+def test_complete_marks_claimed_documents_sent(collection):
+    queued(collection, 2)
+    claimed = leasing.claim_due(collection, "pending", 10, lease_seconds=30)
+
+    leasing.complete(collection, claimed[:1])
+
+    sent = collection.find_one({"_id": 0})
+    assert sent["status"] == "sent"
+    assert "sent_at" in sent
+    assert "claim" not in sent
+    assert collection.find_one({"_id": 1})["status"] == "pending"
+
+
+def test_complete_leaves_documents_rewritten_since_the_claim(collection):
+    queued(collection, 1)
+    (claimed,) = leasing.claim_due(collection, "pending", 10, lease_seconds=30)
+    # Rescheduled while claimed
+    collection.replace_one({"_id": 0}, {"status": "pending", "attempts": 0})
+
+    leasing.complete(collection, [claimed])
+
+    assert collection.find_one({"_id": 0})["status"] == "pending"
+
+
+def test_discard_deletes_claimed_documents(collection):
+    queued(collection, 2)
+    claimed = leasing.claim_due(collection, "pending", 10, lease_seconds=30)
+
+    leasing.discard(collection, claimed[1:])
+
+    assert [document["_id"] for document in collection.find()] == [0]
+
+
+def test_retry_later_backs_off_exponentially(collection):
+    queued(collection, 1)
+    collection.update_one({"_id": 0}, {"$set": {"attempts": 3}})
+    (claimed,) = leasing.claim_due(collection, "pending", 10, lease_seconds=300)
+    before = datetime.utcnow()
+
+    leasing.retry_later(collection, claimed, max_backoff=60)
+
+    document = collection.find_one({"_id": 0})
+    assert document["attempts"] == 4
+    assert "claim" not in document
+    backoff = document["next_attempt_at"] - before
+    assert timedelta(seconds=7) <= backoff <= timedelta(seconds=9)
+
+
+def test_retry_later_caps_the_backoff(collection):
+    queued(collection, 1)
+    collection.update_one({"_id": 0}, {"$set": {"attempts": 20}})
+    (claimed,) = leasing.claim_due(collection, "pending", 10, lease_seconds=300)
+
+    leasing.retry_later(collection, claimed, max_backoff=60)
+
+    backoff = collection.find_one({"_id": 0})["next_attempt_at"] - datetime.utcnow()
+    assert backoff <= timedelta(seconds=60)
+
+
+def test_release_makes_documents_due_again(collection):
+    queued(collection, 2)
+    claimed = leasing.claim_due(collection, "pending", 10, lease_seconds=300)
+
+    leasing.release(collection, claimed)
+
+    released = leasing.claim_due(collection, "pending", 10, lease_seconds=300)
+    assert [document["_id"] for document in released] == [0, 1]
+    assert collection.find_one({"_id": 0})["attempts"] == 0
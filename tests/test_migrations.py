@@ -0,0 +1,80 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from bson.objectid import ObjectId
+
+from webapp.migrations import native_datetimes
+from webapp.migrations.native_datetimes import Throttle, convert, migrate
+
+
+def test_convert():
+    _id = ObjectId()
+    document = {
+        "_id": _id,
+        "updated_at": "2025-01-08T10:00:00",
+        "follow_up_data": {"followUpDate": "2025-01-09T12:00:00+02:00"},
+    }
+
+    assert convert(document) == {
+        "updated_at": datetime(2025, 1, 8, 10, 0),
+        "follow_up_data.followUpDate": datetime(2025, 1, 9, 10, 0),
+    }
+
+
+def test_convert_skips_migrated_and_unparseable_values():
+    document = {
+        "_id": ObjectId(),
+        "updated_at": datetime(2025, 1, 8, 10, 0),
+        "follow_up_data": {"followUpDate": "next tuesday"},
+    }
+
+    assert convert(document) is None
+
+
+def test_throttle_sleeps_to_hold_the_rate():
+    clock = MagicMock(side_effect=[0.0, 0.5])
+    sleep = MagicMock()
+    throttle = Throttle(100, clock=clock, sleep=sleep)
+
+    throttle.wait(100)
+
+    sleep.assert_called_once_with(0.5)
+
+
+@patch.object(native_datetimes, "mongo")
+def test_migrate_resumes_from_checkpoint(mock_mongo):
+    last_id, new_id, current_id = ObjectId(), ObjectId(), ObjectId()
+    mock_mongo.db.migrations.find_one.return_value = {
+        "last_id": last_id,
+        "scanned": 10,
+        "migrated": 4,
+    }
+    find = mock_mongo.db.job_interactions.find
+    find.return_value.sort.return_value.limit.side_effect = [
+        [
+            {"_id": new_id, "updated_at": "2025-01-08T10:00:00"},
+            {"_id": current_id, "updated_at": datetime(2025, 1, 8)},
+        ],
+        [],
+    ]
+    mock_mongo.db.job_interactions.bulk_write.return_value.modified_count = 1
+
+    scanned, migrated = migrate(batch_size=2, throttle=MagicMock())
+
+    assert (scanned, migrated) == (12, 5)
+    assert find.call_args_list[0].args[0] == {"_id": {"$gt": last_id}}
+    assert find.call_args_list[1].args[0] == {"_id": {"$gt": current_id}}
+    (request,) = mock_mongo.db.job_interactions.bulk_write.call_args.args[0]
+    assert request._filter == {"_id": new_id, "updated_at": "2025-01-08T10:00:00"}
+    final = mock_mongo.db.migrations.update_one.call_args.args[1]["$set"]
+    assert final["done"] and final["last_id"] == current_id
+
+
+@patch.object(native_datetimes, "mongo")
+def test_migrate_restart_clears_checkpoint(mock_mongo):
+    find = mock_mongo.db.job_interactions.find
+    find.return_value.sort.return_value.limit.return_value = []
+
+    assert migrate(restart=True, throttle=MagicMock()) == (0, 0)
+    mock_mongo.db.migrations.delete_one.assert_called_once()
+    mock_mongo.db.migrations.find_one.assert_not_called()
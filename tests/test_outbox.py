@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from webapp import outbox
+from webapp.outbox import OutboxRelay, message_event, task_event
+
+
+@pytest.fixture
+def mock_mongo():
+    with patch.object(outbox, "mongo") as mock_mongo, patch.object(
+        outbox.JobInteraction, "drain_staged"
+    ):
+        yield mock_mongo
+
+
+@pytest.fixture
+def mock_leasing():
+    with patch.object(outbox, "leasing") as mock_leasing:
+        yield mock_leasing
+
+
+def test_relay_batch_delivers_and_marks_sent(mock_mongo, mock_leasing):
+    eta = datetime(2030, 1, 1, 9, 0)
+    events = [
+        message_event("job_applications", {"job_id": "1", "user_id": "2"}),
+        task_event("app.tasks.jobs.send_followup_notification", [{}], eta=eta),
+    ]
+    mock_leasing.claim_due.return_value = events
+    publisher, celery = MagicMock(), MagicMock()
+    relay = OutboxRelay(publisher, celery)
+
+    assert relay.relay_batch() == 2
+
+    publisher.publish.assert_called_once_with(
+        "job_applications", '{"job_id": "1", "user_id": "2"}'
+    )
+    celery.send_task.assert_called_once_with(
+        "app.tasks.jobs.send_followup_notification",
+        args=[{}],
+        eta=eta.replace(tzinfo=timezone.utc),
+    )
+    outbox.JobInteraction.drain_staged.assert_called_once_with(100)
+    mock_leasing.claim_due.assert_called_once_with(
+        mock_mongo.db.outbox, "pending", 100, 30
+    )
+    mock_leasing.complete.assert_called_once_with(mock_mongo.db.outbox, events)
+
+
+def test_relay_batch_backs_off_failures_and_releases_the_rest(mock_mongo, mock_leasing):
+    events = [message_event("job_applications", {"n": n}) for n in range(3)]
+    mock_leasing.claim_due.return_value = events
+    publisher = MagicMock()
+    publisher.publish.side_effect = [None, ConnectionError("down")]
+    relay = OutboxRelay(publisher, MagicMock(), max_backoff=60)
+
+    assert relay.relay_batch() == 1
+
+    outbox_collection = mock_mongo.db.outbox
+    mock_leasing.retry_later.assert_called_once_with(outbox_collection, events[1], 60)
+    mock_leasing.release.assert_called_once_with(outbox_collection, events[2:])
+    mock_leasing.complete.assert_called_once_with(outbox_collection, events[:1])
+    assert relay.stats()["failed"] == 1
+
+
+def test_relay_batch_without_due_events(mock_mongo, mock_leasing):
+    mock_leasing.claim_due.return_value = []
+
+    assert OutboxRelay(MagicMock(), MagicMock()).relay_batch() == 0
+    mock_leasing.complete.assert_not_called()
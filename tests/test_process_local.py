@@ -0,0 +1,46 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+from webapp.utils.process_local import ProcessLocal
+
+
+def test_get_creates_the_object_once():
+    factory = MagicMock(side_effect=lambda: object())
+    local = ProcessLocal(factory)
+
+    assert local.get() is local.get()
+    factory.assert_called_once()
+
+
+def test_concurrent_first_calls_share_one_object():
+    local = ProcessLocal(object)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(local.get())) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(result) for result in results}) == 1
+
+
+def test_get_recreates_the_object_after_a_fork():
+    local = ProcessLocal(object)
+    parent = local.get()
+
+    with patch("webapp.utils.process_local.os.getpid", return_value=os.getpid() + 1):
+        child = local.get()
+
+    assert child is not parent
+
+
+def test_reset_forgets_the_object():
+    local = ProcessLocal(object)
+    first = local.get()
+
+    local.reset()
+
+    assert local.get() is not first
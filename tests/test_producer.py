@@ -1,7 +1,17 @@
 import json
 from unittest.mock import MagicMock, patch
 
-from webapp.producer import publish_followup_notification
+import pytest
+
+from webapp import publisher
+from webapp.producer import publish_followup_notification, publish_job_application
+
+
+@pytest.fixture(autouse=True)
+def fresh_publisher():
+    publisher._publisher.reset()
+    yield
+    publisher._publisher.reset()
 
 
 def test_publish_followup_notification():
@@ -34,11 +44,27 @@ def test_publish_followup_notification():
                 "notes": "This is a note.",
                 "nextStep": "Next step details.",
                 "followUpDate": "2025-01-01",
+                "jobSnapshot": None,
             }
         )
         mock_channel.basic_publish.assert_called_once_with(
-            exchange="", routing_key="followup_notifications", body=expected_message
+            exchange="",
+            routing_key="followup_notifications",
+            body=expected_message,
+            properties=None,
         )
 
-        # Assert connection close
-        mock_connection.return_value.close.assert_called_once()
+        # The connection stays open for the next message
+        mock_connection.return_value.close.assert_not_called()
+
+
+def test_publish_reuses_connection_and_declaration():
+    with patch("pika.BlockingConnection") as mock_connection:
+        mock_channel = mock_connection.return_value.channel.return_value
+
+        publish_job_application("job_1", "user_1")
+        publish_job_application("job_2", "user_1")
+
+        mock_connection.assert_called_once()
+        mock_channel.queue_declare.assert_called_once_with(queue="job_applications")
+        assert mock_channel.basic_publish.call_count == 2
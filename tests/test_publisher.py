@@ -0,0 +1,103 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pika.exceptions import StreamLostError
+
+from webapp.publisher import RabbitMQPublisher
+
+
+@pytest.fixture
+def mock_connection():
+    with patch("pika.BlockingConnection") as mock_connection:
+        mock_connection.side_effect = lambda _: MagicMock()
+        yield mock_connection
+
+
+def test_reconnects_when_connection_is_lost(mock_connection):
+    publisher = RabbitMQPublisher("amqp://localhost", pool_size=1)
+    publisher.publish("queue", "first")
+    broken = publisher._idle.queue[0]
+    broken.channel.basic_publish.side_effect = StreamLostError("gone")
+
+    publisher.publish("queue", "second")
+
+    stats = publisher.stats()
+    assert stats["reconnects"] == 1
+    assert stats["connections_opened"] == 2
+    assert stats["open"] == 1
+    fresh = publisher._idle.queue[0]
+    fresh.channel.basic_publish.assert_called_once_with(
+        exchange="", routing_key="queue", body="second", properties=None
+    )
+    # The new connection declares the queue again
+    fresh.channel.queue_declare.assert_called_once_with(queue="queue")
+
+
+def test_drops_connections_the_broker_closed_while_idle(mock_connection):
+    publisher = RabbitMQPublisher("amqp://localhost", pool_size=1)
+    publisher.publish("queue", "first")
+    idle = publisher._idle.queue[0]
+    idle.connection.process_data_events.side_effect = StreamLostError("gone")
+
+    publisher.publish("queue", "second")
+
+    assert publisher.stats()["connections_opened"] == 2
+    assert publisher._idle.queue[0] is not idle
+
+
+def test_skips_connections_inherited_across_fork(mock_connection):
+    publisher = RabbitMQPublisher("amqp://localhost", pool_size=1)
+    publisher.publish("queue", "first")
+    inherited = publisher._idle.queue[0]
+    inherited.pid = -1
+
+    publisher.publish("queue", "second")
+
+    inherited.connection.close.assert_not_called()
+    assert publisher.stats()["connections_opened"] == 2
+
+
+def test_pool_is_bounded(mock_connection):
+    publisher = RabbitMQPublisher("amqp://localhost", pool_size=2, acquire_timeout=0.05)
+    in_publish = threading.Barrier(3)
+    release = threading.Event()
+
+    def slow_connect(_):
+        connection = MagicMock()
+
+        def basic_publish(**kwargs):
+            in_publish.wait()
+            release.wait()
+
+        connection.channel.return_value.basic_publish.side_effect = basic_publish
+        return connection
+
+    mock_connection.side_effect = slow_connect
+    threads = [
+        threading.Thread(target=publisher.publish, args=("queue", str(i)))
+        for i in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    in_publish.wait()
+
+    with pytest.raises(TimeoutError):
+        publisher.publish("queue", "third")
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert publisher.stats()["connections_opened"] == 2
+    assert publisher.stats()["idle"] == 2
+
+
+def test_close_closes_idle_connections(mock_connection):
+    publisher = RabbitMQPublisher("amqp://localhost")
+    publisher.publish("queue", "message")
+    slot = publisher._idle.queue[0]
+
+    publisher.close()
+
+    slot.connection.close.assert_called_once()
+    assert publisher.stats()["open"] == 0
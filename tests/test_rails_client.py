@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from webapp.rails_client import RailsClient
+
+
+@pytest.fixture
+def client():
+    return RailsClient(
+        "http://rails.test/",
+        pool_size=4,
+        connect_timeout=1,
+        timeouts={"validate_token": 2, "job_post": 3},
+    )
+
+
+def test_get_job_post_uses_endpoint_timeout(client):
+    with patch.object(client.session, "request") as mock_request:
+        mock_request.return_value = MagicMock(json=lambda: {"title": "Engineer"})
+        assert client.get_job_post("42") == {"title": "Engineer"}
+        mock_request.assert_called_once_with(
+            "GET", "http://rails.test/job_posts/42", timeout=(1, 3)
+        )
+
+
+def test_validate_token_posts_token(client):
+    with patch.object(client.session, "request") as mock_request:
+        client.validate_token("abc")
+        mock_request.assert_called_once_with(
+            "POST",
+            "http://rails.test/validate_token",
+            json={"access_token": "abc"},
+            timeout=(1, 2),
+        )
+
+
+def test_request_errors_are_counted(client):
+    with patch.object(client.session, "request") as mock_request:
+        mock_request.side_effect = requests.exceptions.ConnectionError("down")
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get_job_post("42")
+    assert client.stats()["errors"] == 1
+
+
+def test_session_is_pooled(client):
+    adapter = client.session.get_adapter("https://rails.test")
+    assert adapter is client.adapter
+    assert adapter.max_retries.total == 2
+    assert client.stats() == {
+        "requests": 0,
+        "errors": 0,
+        "connections_opened": 0,
+        "connections_reused": 0,
+        "coalesced": 0,
+    }
@@ -0,0 +1,145 @@
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from webapp import scheduler
+from webapp.scheduler import NotificationScheduler, scheduled_notification
+
+FOLLOW_UP = {
+    "user_email": "user@example.com",
+    "jobId": "job_1",
+    "status": "applied",
+    "followUpDate": "2030-01-01T09:00:00Z",
+}
+
+
+@pytest.fixture
+def mock_mongo():
+    with patch.object(scheduler, "mongo") as mock_mongo:
+        yield mock_mongo
+
+
+@pytest.fixture
+def mock_interactions():
+    with patch.object(scheduler, "JobInteraction") as mock_interactions:
+        mock_interactions.follow_up_versions.return_value = {}
+        yield mock_interactions
+
+
+@pytest.fixture
+def mock_leasing():
+    with patch.object(scheduler, "leasing") as mock_leasing:
+        yield mock_leasing
+
+
+def test_scheduled_notification():
+    due_at = datetime(2030, 1, 1, 9, 0)
+
+    notification = scheduled_notification("user_1", "job_1", FOLLOW_UP, due_at)
+
+    assert notification["_id"] == "user_1:job_1"
+    assert notification["payload"]["jobId"] == "job_1"
+    assert notification["payload"]["user_email"] == "user@example.com"
+    assert notification["status"] == "scheduled"
+    assert notification["next_attempt_at"] == due_at
+
+
+def test_dispatch_batch_publishes_and_marks_sent(
+    mock_mongo, mock_leasing, mock_interactions
+):
+    due_at = datetime(2030, 1, 1, 9, 0)
+    notifications = [scheduled_notification("user_1", "job_1", FOLLOW_UP, due_at)]
+    mock_leasing.claim_due.return_value = notifications
+    publisher = MagicMock()
+
+    assert NotificationScheduler(publisher).dispatch_batch() == 1
+
+    queue_name, body = publisher.publish.call_args.args
+    assert queue_name == "followup_notifications"
+    assert json.loads(body) == notifications[0]["payload"]
+    collection = mock_mongo.db.scheduled_notifications
+    mock_leasing.claim_due.assert_called_once_with(collection, "scheduled", 100, 60)
+    mock_leasing.complete.assert_called_once_with(collection, notifications)
+
+
+def test_dispatch_batch_backs_off_failures_and_sends_the_rest(
+    mock_mongo, mock_leasing, mock_interactions
+):
+    due_at = datetime(2030, 1, 1, 9, 0)
+    notifications = [
+        scheduled_notification("user_1", f"job_{n}", FOLLOW_UP, due_at)
+        for n in range(3)
+    ]
+    mock_leasing.claim_due.return_value = notifications
+    publisher = MagicMock()
+    publisher.publish.side_effect = [None, ConnectionError("down"), None]
+    dispatcher = NotificationScheduler(publisher, max_backoff=60)
+
+    assert dispatcher.dispatch_batch() == 3
+
+    collection = mock_mongo.db.scheduled_notifications
+    mock_leasing.retry_later.assert_called_once_with(collection, notifications[1], 60)
+    mock_leasing.complete.assert_called_once_with(
+        collection, [notifications[0], notifications[2]]
+    )
+    assert dispatcher.dispatched == 2
+    assert dispatcher.failed == 1
+
+
+def test_dispatch_batch_without_due_notifications(
+    mock_mongo, mock_leasing, mock_interactions
+):
+    mock_leasing.claim_due.return_value = []
+
+    assert NotificationScheduler(MagicMock()).dispatch_batch() == 0
+    mock_leasing.complete.assert_not_called()
+
+
+def test_dispatch_batch_skips_superseded_and_notified_versions(
+    mock_mongo, mock_leasing, mock_interactions
+):
+    due_at = datetime(2030, 1, 1, 9, 0)
+    notifications = [
+        {
+            **scheduled_notification("user_1", f"job_{n}", FOLLOW_UP, due_at),
+            "version": 2,
+        }
+        for n in range(3)
+    ]
+    current, superseded, notified = notifications
+    mock_leasing.claim_due.return_value = notifications
+    mock_interactions.follow_up_versions.return_value = {
+        ("user_1", "job_0"): (2, 1),
+        ("user_1", "job_1"): (3, 1),
+        ("user_1", "job_2"): (2, 2),
+    }
+    publisher = MagicMock()
+    dispatcher = NotificationScheduler(publisher)
+
+    assert dispatcher.dispatch_batch() == 3
+
+    publisher.publish.assert_called_once()
+    mock_interactions.mark_follow_up_notified.assert_called_once_with(
+        "user_1", "job_0", 2
+    )
+    collection = mock_mongo.db.scheduled_notifications
+    mock_leasing.complete.assert_called_once_with(collection, [current])
+    mock_leasing.discard.assert_called_once_with(collection, [superseded, notified])
+    assert dispatcher.stats()["skipped"] == 2
+
+
+def test_dispatch_batch_sends_unversioned_notifications(
+    mock_mongo, mock_leasing, mock_interactions
+):
+    due_at = datetime(2030, 1, 1, 9, 0)
+    mock_leasing.claim_due.return_value = [
+        scheduled_notification("user_1", "job_1", FOLLOW_UP, due_at)
+    ]
+    publisher = MagicMock()
+
+    assert NotificationScheduler(publisher).dispatch_batch() == 1
+
+    publisher.publish.assert_called_once()
+    mock_interactions.mark_follow_up_notified.assert_not_called()
@@ -0,0 +1,99 @@
+import socket
+
+import pytest
+from flask import Flask
+from flask_mail import Mail, Message
+
+from webapp.smtp_pool import SMTPConnectionPool
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    """Collects delivered messages and the SMTP sessions they arrived on."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        self.sessions.add(id(session))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(
+        handler, hostname="127.0.0.1", port=port
+    )
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture
+def app(smtp_server):
+    controller, _ = smtp_server
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER=controller.hostname,
+        MAIL_PORT=controller.port,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_DEFAULT_SENDER="noreply@example.com",
+    )
+    with app.app_context():
+        yield app
+
+
+def message(n):
+    msg = Message(subject=f"Message {n}", recipients=["user@example.com"])
+    msg.body = "Follow-up"
+    return msg
+
+
+def test_reuses_a_session_up_to_the_message_cap(app, smtp_server):
+    _, handler = smtp_server
+    pool = SMTPConnectionPool(Mail(app), max_messages=3)
+
+    for n in range(7):
+        pool.send(message(n))
+    pool.close()
+
+    stats = pool.stats()
+    assert len(handler.messages) == 7
+    assert len(handler.sessions) == 3
+    assert stats["connections_opened"] == 3
+    assert stats["sent"] == 7
+    assert sum(stats["latency_ms"].values()) == 7
+    assert stats["open"] == 0
+
+
+def test_reconnects_after_server_disconnect(app, smtp_server):
+    _, handler = smtp_server
+    pool = SMTPConnectionPool(Mail(app))
+    pool.send(message(1))
+
+    # The server hangs up on the idle session
+    pool._local.session.connection.host.close()
+    pool.send(message(2))
+
+    assert len(handler.messages) == 2
+    assert pool.stats()["reconnects"] == 1
+    assert pool.stats()["failed"] == 0
+
+
+def test_replaces_idle_sessions(app, smtp_server):
+    _, handler = smtp_server
+    pool = SMTPConnectionPool(Mail(app), max_idle=0)
+
+    pool.send(message(1))
+    pool.send(message(2))
+
+    assert pool.stats()["connections_opened"] == 2
+    assert len(handler.sessions) == 2
@@ -0,0 +1,226 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from webapp.view_counter import ViewCountBuffer
+
+
+@pytest.fixture
+def buffer():
+    return ViewCountBuffer(flush_interval=60, max_buffer_size=2, flush_batch_size=2)
+
+
+@pytest.fixture
+def mock_client():
+    with patch("webapp.view_counter.get_rails_client") as mock_get_client:
+        yield mock_get_client.return_value
+
+
+@pytest.fixture
+def mock_cache():
+    with patch("webapp.view_counter.get_job_post_cache") as mock_get_cache:
+        mock_get_cache.return_value.peek.return_value = None
+        yield mock_get_cache.return_value
+
+
+def http_error(status):
+    response = MagicMock(status_code=status)
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+def test_record_aggregates_views(buffer):
+    assert buffer.record("a") == 1
+    assert buffer.record("a") == 2
+    assert buffer.pending("a") == 2
+    assert buffer.stats()["pending_views"] == 2
+
+
+def test_record_wakes_flusher_when_buffer_is_full(buffer):
+    buffer.record("a")
+    assert not buffer._wake.is_set()
+    buffer.record("b")
+    assert buffer._wake.is_set()
+
+
+def test_flush_sends_batches(buffer, mock_client, mock_cache):
+    for job_id in ["a", "a", "b", "c"]:
+        buffer.record(job_id)
+
+    buffer.flush()
+
+    sent = [call.args[0] for call in mock_client.increment_view_counts.call_args_list]
+    assert sent == [{"a": 2, "b": 1}, {"c": 1}]
+    assert buffer.stats()["pending_jobs"] == 0
+    assert buffer.stats()["flushed"] == 4
+
+
+def test_failed_flush_keeps_increments(buffer, mock_client, mock_cache):
+    buffer.record("a")
+    mock_client.increment_view_counts.side_effect = requests.exceptions.ConnectionError(
+        "down"
+    )
+    buffer.flush()
+    buffer.record("a")
+
+    assert buffer.pending("a") == 2
+    assert buffer.stats()["flush_failures"] == 1
+
+
+def test_stop_spills_undelivered_views(buffer, mock_client, mock_cache):
+    mock_client.increment_view_counts.side_effect = requests.exceptions.ConnectionError(
+        "down"
+    )
+    buffer.record("a")
+
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        buffer.stop()
+        operations = mock_mongo.db.view_count_backlog.bulk_write.call_args.args[0]
+
+    # The failed shutdown flush is kept as a batch, under its idempotency key
+    assert len(operations) == 1
+    assert operations[0]._doc == {"$setOnInsert": {"batch": [("a", 1)]}}
+
+
+def test_failed_batch_is_retried_with_the_same_key(buffer, mock_client, mock_cache):
+    buffer.record("a")
+    mock_client.increment_view_counts.side_effect = requests.exceptions.ReadTimeout(
+        "slow"
+    )
+    buffer.flush()
+    mock_client.increment_view_counts.side_effect = None
+    buffer.record("b")
+    buffer.flush()
+
+    calls = mock_client.increment_view_counts.call_args_list
+    assert [call.args[0] for call in calls] == [{"a": 1}, {"a": 1}, {"b": 1}]
+    keys = [call.kwargs["idempotency_key"] for call in calls]
+    assert keys[0] == keys[1] != keys[2]
+    assert buffer.stats()["pending_views"] == 0
+
+
+def test_stop_without_flush_on_shutdown_still_spills(mock_client, mock_cache):
+    buffer = ViewCountBuffer(flush_interval=60, flush_on_shutdown=False)
+    buffer.record("a")
+
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        buffer.stop()
+        operations = mock_mongo.db.view_count_backlog.bulk_write.call_args.args[0]
+
+    mock_client.increment_view_counts.assert_not_called()
+    assert operations[0]._doc == {"$inc": {"count": 1}}
+
+
+def test_failed_batches_are_spilled_and_loaded_with_their_keys(
+    buffer, mock_client, mock_cache
+):
+    mock_client.increment_view_counts.side_effect = requests.exceptions.ReadTimeout(
+        "slow"
+    )
+    buffer.record("a")
+    buffer.flush()
+    key = mock_client.increment_view_counts.call_args.kwargs["idempotency_key"]
+
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        buffer.stop()
+        operations = mock_mongo.db.view_count_backlog.bulk_write.call_args.args[0]
+    assert operations[0]._filter == {"_id": key}
+    assert operations[0]._doc == {"$setOnInsert": {"batch": [("a", 1)]}}
+
+    restarted = ViewCountBuffer()
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        mock_mongo.db.view_count_backlog.find_one_and_delete.side_effect = [
+            {"_id": key, "batch": [["a", 1]]},
+            None,
+        ]
+        restarted._load_backlog()
+    mock_client.increment_view_counts.side_effect = None
+    restarted.flush()
+
+    mock_client.increment_view_counts.assert_called_with({"a": 1}, idempotency_key=key)
+
+
+def test_flushed_views_are_added_to_cached_job_posts(buffer, mock_client, mock_cache):
+    mock_cache.peek.side_effect = lambda job_id: (
+        {"view_count": 10} if job_id == "a" else None
+    )
+    buffer.record("a")
+    buffer.record("a")
+    buffer.record("b")
+
+    buffer.flush()
+
+    mock_cache.update.assert_called_once_with("a", {"view_count": 12})
+    assert buffer.pending("a") == 0
+
+
+def test_rejected_batch_is_set_aside_as_dead(buffer, mock_client, mock_cache):
+    mock_client.increment_view_counts.side_effect = [http_error(422), None]
+    for job_id in ["a", "b", "c"]:
+        buffer.record(job_id)
+
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        buffer.flush()
+        query, update = mock_mongo.db.view_count_backlog.update_one.call_args.args
+
+    # The batch after the rejected one still goes out
+    assert mock_client.increment_view_counts.call_count == 2
+    key = mock_client.increment_view_counts.call_args_list[0].kwargs["idempotency_key"]
+    assert query == {"_id": key}
+    assert update["$setOnInsert"]["dead"] is True
+    assert update["$setOnInsert"]["batch"] == [("a", 1), ("b", 1)]
+    stats = buffer.stats()
+    assert stats["pending_views"] == 0
+    assert stats["unsent_batches"] == 0
+    assert stats["dead_batches"] == 1
+
+
+def test_failed_batch_does_not_hold_up_later_ones(buffer, mock_client, mock_cache):
+    mock_client.increment_view_counts.side_effect = http_error(503)
+    buffer.record("a")
+    buffer.flush()
+    buffer.record("b")
+    mock_client.increment_view_counts.side_effect = [http_error(503), None]
+    buffer.record("b")
+    buffer.flush()
+
+    mock_client.increment_view_counts.side_effect = None
+    buffer.flush()
+
+    sent = [call.args[0] for call in mock_client.increment_view_counts.call_args_list]
+    # The failed batch is tried again after the newer one, which gets through
+    assert sent == [{"a": 1}, {"a": 1}, {"b": 2}, {"a": 1}]
+    assert buffer.stats()["pending_views"] == 0
+
+
+def test_unsent_batches_past_the_cap_are_spilled_and_reloaded(mock_client, mock_cache):
+    buffer = ViewCountBuffer(flush_batch_size=1, max_unsent_batches=2)
+    mock_client.increment_view_counts.side_effect = requests.exceptions.ConnectionError(
+        "down"
+    )
+    for job_id in ["a", "b", "c"]:
+        buffer.record(job_id)
+
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        buffer.flush()
+        operations = mock_mongo.db.view_count_backlog.bulk_write.call_args.args[0]
+
+    assert [operation._doc for operation in operations] == [
+        {"$setOnInsert": {"batch": [("b", 1)]}}
+    ]
+    assert buffer.stats()["unsent_batches"] == 2
+    assert buffer.pending("a") == 1
+    assert buffer.pending("b") == 0
+
+    mock_client.increment_view_counts.side_effect = None
+    with patch("webapp.view_counter.mongo") as mock_mongo:
+        mock_mongo.db.view_count_backlog.find_one_and_delete.side_effect = [
+            {"_id": operations[0]._filter["_id"], "batch": [["b", 1]]},
+            None,
+        ]
+        buffer.flush()
+        buffer.flush()
+
+    sent = [call.args[0] for call in mock_client.increment_view_counts.call_args_list]
+    assert sent[-3:] == [{"c": 1}, {"a": 1}, {"b": 1}]
+    assert buffer.stats()["pending_views"] == 0
@@ -57,4 +57,10 @@ def create_app():
         # Import tasks after Celery is initialized
         from webapp.tasks.jobs import send_followup_notification
 
+        # Provision MongoDB indexes without blocking startup
+        if app.config["ENSURE_INDEXES_ON_STARTUP"]:
+            from webapp.models.indexes import ensure_indexes_in_background
+
+            ensure_indexes_in_background()
+
     return app, celery
@@ -0,0 +1,166 @@
+"""Consumer for the ``job_applications`` queue.
+
+Every follow-up saved with the "applied" status announces the application on
+``job_applications``. This consumer drains the queue in micro-batches and
+keeps application counters per job and per user in the
+``application_counters`` collection::
+
+    python -m webapp.application_consumer
+
+Each batch first upserts one ``job_applications`` record per ``(user_id,
+job_id)``, so redelivered messages and repeated "applied" saves are recorded
+once. The counters of the jobs and users in the batch are then recounted from
+those records and raised with ``$max``, which makes retrying a batch that
+partly failed harmless. Messages are acked only once both writes have
+succeeded. Reading a job's or a user's total is a single ``_id`` lookup.
+"""
+
+import json
+import logging
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from webapp import mongo
+from webapp.concurrent_consumer import BatchingConsumer
+from webapp.config import get_config
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = "job_applications"
+
+
+def counter_id(scope, key):
+    """The ``_id`` of the ``scope`` ("job" or "user") counter for ``key``."""
+    return f"{scope}:{key}"
+
+
+def application_id(user_id, job_id):
+    """The ``_id`` of the ``job_applications`` record of a user and a job."""
+    return f"{user_id}:{job_id}"
+
+
+def count_applications(field, keys):
+    """Return ``{key: applications}`` for each of ``keys`` of ``field``.
+
+    ``field`` is "job_id" or "user_id"; the counts come from the application
+    records, so they never include a message twice.
+    """
+    pipeline = [
+        {"$match": {field: {"$in": list(keys)}}},
+        {"$group": {"_id": f"${field}", "applications": {"$sum": 1}}},
+    ]
+    return {
+        row["_id"]: row["applications"]
+        for row in mongo.db.job_applications.aggregate(pipeline)
+    }
+
+
+def handle_application_batch(bodies):
+    """Record a batch of applications and refresh the counters they touch.
+
+    Malformed messages fail on their own; if either write fails, every message
+    in the batch does, so none is acked before it has been counted. Returns
+    one entry per message, as ``BatchingConsumer`` expects.
+    """
+    results = [None] * len(bodies)
+    applications = {}
+    for position, body in enumerate(bodies):
+        try:
+            application = json.loads(body)
+            user_id, job_id = application["user_id"], application["job_id"]
+            applications[application_id(user_id, job_id)] = (user_id, job_id)
+        except (ValueError, KeyError, TypeError) as e:
+            results[position] = e
+
+    if not applications:
+        return results
+
+    now = datetime.utcnow()
+    try:
+        mongo.db.job_applications.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": _id},
+                    {
+                        "$setOnInsert": {
+                            "user_id": user_id,
+                            "job_id": job_id,
+                            "applied_at": now,
+                        }
+                    },
+                    upsert=True,
+                )
+                for _id, (user_id, job_id) in applications.items()
+            ],
+            ordered=False,
+        )
+        counts = {
+            ("job", key): count
+            for key, count in count_applications(
+                "job_id", {job_id for _, job_id in applications.values()}
+            ).items()
+        }
+        counts.update(
+            (("user", key), count)
+            for key, count in count_applications(
+                "user_id", {user_id for user_id, _ in applications.values()}
+            ).items()
+        )
+        # Counts only grow, so $max keeps concurrent recounts from going back
+        mongo.db.application_counters.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": counter_id(scope, key)},
+                    {
+                        "$max": {"applications": count},
+                        "$set": {"updated_at": now},
+                        "$setOnInsert": {"scope": scope, "key": key},
+                    },
+                    upsert=True,
+                )
+                for (scope, key), count in counts.items()
+            ],
+            ordered=False,
+        )
+    except Exception as e:
+        return [result or e for result in results]
+
+    logger.info(
+        "Recorded %s applications and refreshed %s counters",
+        len(applications),
+        len(counts),
+    )
+    return results
+
+
+def start_consumer():
+    config = get_config()
+    consumer = BatchingConsumer(
+        config.RABBITMQ_URL,
+        QUEUE_NAME,
+        handle_application_batch,
+        max_batch=config.APPLICATIONS_BATCH_SIZE,
+        max_wait=config.APPLICATIONS_BATCH_WAIT_MS / 1000,
+        prefetch=config.CONSUMER_PREFETCH,
+        workers=config.CONSUMER_WORKERS,
+        stats_interval=config.CONSUMER_STATS_INTERVAL,
+        retry_delays=config.CONSUMER_RETRY_DELAYS,
+        max_attempts=config.CONSUMER_MAX_ATTEMPTS,
+    )
+    consumer.run()
+
+
+def main():
+    from webapp import create_app
+
+    create_app()
+    try:
+        start_consumer()
+    except KeyboardInterrupt:
+        logger.info("Application consumer stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
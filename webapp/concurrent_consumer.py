@@ -0,0 +1,305 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+# Header counting how many times a message has been handled and failed
+ATTEMPTS_HEADER = "x-attempts"
+
+
+def retry_queue_name(queue_name, delay):
+    return f"{queue_name}.retry.{delay}s"
+
+
+def dead_letter_queue_name(queue_name):
+    return f"{queue_name}.dead"
+
+
+def declare_retry_queues(channel, queue_name, retry_delays):
+    """Declare ``queue_name`` with its per-delay retry queues and dead-letter queue.
+
+    A retry queue holds each message for its delay (``x-message-ttl``), then
+    the broker dead-letters it back to ``queue_name`` through the default
+    exchange. Nothing consumes the retry queues, so waiting costs the
+    consumer nothing.
+    """
+    channel.queue_declare(queue=queue_name)
+    for delay in retry_delays:
+        channel.queue_declare(
+            queue=retry_queue_name(queue_name, delay),
+            arguments={
+                "x-message-ttl": delay * 1000,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            },
+        )
+    channel.queue_declare(queue=dead_letter_queue_name(queue_name))
+
+
+class ConcurrentConsumer:
+    """RabbitMQ consumer that processes messages on a bounded thread pool.
+
+    The broker hands over at most ``prefetch`` unacknowledged messages, which
+    also bounds how many are queued or running on the ``workers`` threads.
+    ``handler(body)`` runs on a worker thread; the message is acked only
+    once it returns. pika channels are not thread-safe, so acks are handed
+    back to the connection thread with ``add_callback_threadsafe``. Messages
+    still unacked when the process dies are redelivered by the broker.
+
+    A message whose handler raises is republished to the retry queue for its
+    attempt (see ``declare_retry_queues``), waiting ``retry_delays[0]``
+    seconds after the first failure, ``retry_delays[1]`` after the second and
+    so on, and the original is acked once the broker has confirmed the copy.
+    After ``max_attempts`` failures it goes to the dead-letter queue instead,
+    from where ``webapp.dead_letters`` can replay it.
+    """
+
+    def __init__(
+        self,
+        url,
+        queue_name,
+        handler,
+        prefetch=32,
+        workers=8,
+        stats_interval=60,
+        rate_window=60,
+        retry_delays=(5, 30, 120, 600),
+        max_attempts=5,
+    ):
+        self.parameters = pika.URLParameters(url)
+        self.queue_name = queue_name
+        self.handler = handler
+        self.prefetch = prefetch
+        self.workers = workers
+        self.stats_interval = stats_interval
+        self.rate_window = rate_window
+        self.retry_delays = tuple(retry_delays)
+        self.max_attempts = max_attempts
+        self.connection = None
+        self.channel = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._completed_at = deque()
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    def run(self):
+        """Consume until ``stop`` is called or the connection closes."""
+        self.connection = pika.BlockingConnection(self.parameters)
+        self.channel = self.connection.channel()
+        # Failed messages are only acked once their republication is confirmed
+        self.channel.confirm_delivery()
+        declare_retry_queues(self.channel, self.queue_name, self.retry_delays)
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        self.channel.basic_consume(
+            queue=self.queue_name, on_message_callback=self._on_message
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f"{self.queue_name}-worker"
+        )
+        if self.stats_interval:
+            self.connection.call_later(self.stats_interval, self._log_stats)
+
+        logger.info(
+            "Consuming %s with prefetch %s on %s workers",
+            self.queue_name,
+            self.prefetch,
+            self.workers,
+        )
+        try:
+            self.channel.start_consuming()
+        finally:
+            # Let running handlers finish; their acks cannot be sent any more,
+            # so the broker redelivers those messages.
+            self._executor.shutdown(wait=True)
+            if self.connection.is_open:
+                self.connection.close()
+
+    def stop(self):
+        """Stop consuming; safe to call from any thread."""
+        self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return {
+                "in_flight": self.in_flight,
+                "processed": self.processed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dead_lettered": self.dead_lettered,
+                "per_second": len(self._completed_at) / self.rate_window,
+            }
+
+    def _on_message(self, channel, method, properties, body):
+        with self._lock:
+            self.in_flight += 1
+        self._executor.submit(self._process, method, properties, body)
+
+    def _process(self, method, properties, body):
+        try:
+            self.handler(body)
+        except Exception as e:
+            logger.error("Failed to process message from %s: %s", self.queue_name, e)
+            self._settle_failure(method, properties, body, e)
+            with self._lock:
+                self.failed += 1
+        else:
+            self._settle(method, self.channel.basic_ack)
+            with self._lock:
+                self.processed += 1
+                self._completed_at.append(time.monotonic())
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _settle(self, method, settle, **kwargs):
+        callback = functools.partial(settle, delivery_tag=method.delivery_tag, **kwargs)
+        try:
+            self.connection.add_callback_threadsafe(callback)
+        except pika.exceptions.ConnectionWrongStateError:
+            logger.warning("Connection closed before message could be settled")
+
+    def _settle_failure(self, method, properties, body, error):
+        callback = functools.partial(
+            self._retry_or_dead_letter, method, properties, body, error
+        )
+        try:
+            self.connection.add_callback_threadsafe(callback)
+        except pika.exceptions.ConnectionWrongStateError:
+            logger.warning("Connection closed before message could be retried")
+
+    def _retry_or_dead_letter(self, method, properties, body, error):
+        """Republish a failed message for a later attempt, then ack the original.
+
+        Runs on the connection thread. The channel is in confirm mode, so the
+        original is only acked after the broker confirmed the copy; if the
+        broker rejects it, the original is requeued instead. If the process
+        dies in between, the broker redelivers the original, so the message
+        is never lost.
+        """
+        headers = dict(properties.headers or {})
+        attempts = headers.get(ATTEMPTS_HEADER, 0) + 1
+        headers[ATTEMPTS_HEADER] = attempts
+        headers["x-last-error"] = str(error)[:500]
+        if attempts < self.max_attempts and self.retry_delays:
+            delay = self.retry_delays[min(attempts, len(self.retry_delays)) - 1]
+            target = retry_queue_name(self.queue_name, delay)
+        else:
+            target = dead_letter_queue_name(self.queue_name)
+
+        try:
+            self.channel.basic_publish(
+                exchange="",
+                routing_key=target,
+                body=body,
+                properties=pika.BasicProperties(
+                    headers=headers,
+                    content_type=properties.content_type,
+                    delivery_mode=properties.delivery_mode,
+                ),
+                mandatory=True,
+            )
+        except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+            logger.error("Broker did not accept retry to %s: %s", target, e)
+            self.channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        self.channel.basic_ack(delivery_tag=method.delivery_tag)
+        with self._lock:
+            if target == dead_letter_queue_name(self.queue_name):
+                self.dead_lettered += 1
+            else:
+                self.retried += 1
+
+    def _trim(self, now):
+        while self._completed_at and self._completed_at[0] < now - self.rate_window:
+            self._completed_at.popleft()
+
+    def _log_stats(self):
+        logger.info("Consumer %s stats: %s", self.queue_name, self.stats())
+        self.connection.call_later(self.stats_interval, self._log_stats)
+
+
+class BatchingConsumer(ConcurrentConsumer):
+    """ConcurrentConsumer that hands messages to its handler in micro-batches.
+
+    Messages are collected until ``max_batch`` have arrived or ``max_wait``
+    seconds have passed since the first one, then ``handler(bodies)`` runs
+    on a worker thread. It returns one entry per body: None when that
+    message was handled, or the exception it failed with. Each message is
+    then acked or retried on its own, as in ConcurrentConsumer. Batches
+    are collected on the connection thread, so the buffer needs no locking.
+    """
+
+    def __init__(self, url, queue_name, handler, max_batch=50, max_wait=0.2, **kwargs):
+        super().__init__(url, queue_name, handler, **kwargs)
+        # A batch can never fill up if the broker stops short of it
+        self.prefetch = max(self.prefetch, max_batch)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._batch = []
+        self._timer = None
+        self.batches = 0
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["batches"] = self.batches
+            stats["avg_batch_size"] = (
+                (self.processed + self.failed) / self.batches if self.batches else 0
+            )
+        return stats
+
+    def _on_message(self, channel, method, properties, body):
+        with self._lock:
+            self.in_flight += 1
+        self._batch.append((method, properties, body))
+        if len(self._batch) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self.connection.call_later(self.max_wait, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self.connection.remove_timeout(self._timer)
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            self._executor.submit(self._process_batch, batch)
+
+    def _process_batch(self, batch):
+        try:
+            errors = self.handler([body for _, _, body in batch])
+        except Exception as e:
+            errors = [e] * len(batch)
+
+        for (method, properties, body), error in zip(batch, errors):
+            if error is None:
+                self._settle(method, self.channel.basic_ack)
+            else:
+                logger.error(
+                    "Failed to process message from %s: %s", self.queue_name, error
+                )
+                self._settle_failure(method, properties, body, error)
+        failed = sum(error is not None for error in errors)
+        now = time.monotonic()
+        with self._lock:
+            self.batches += 1
+            self.in_flight -= len(batch)
+            self.failed += failed
+            self.processed += len(batch) - failed
+            self._completed_at.extend([now] * (len(batch) - failed))
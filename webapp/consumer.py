@@ -1,14 +1,19 @@
+import atexit
 import json
+import logging
 import os
-import re
 
-import pika
 import requests
 from dotenv import load_dotenv
 from flask import Flask, current_app
 from flask_mail import Mail, Message
 
+from webapp.concurrent_consumer import BatchingConsumer, ConcurrentConsumer
 from webapp.config import get_config
+from webapp.job_post_cache import STATIC_FIELDS, get_job_post_cache
+from webapp.job_snapshot import is_fresh, job_snapshot
+from webapp.smtp_pool import SMTPConnectionPool
+from webapp.utils.dates import parse_datetime
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,39 +35,30 @@ app.config.update(
 
 mail = Mail(app)
 
-API_BASE_URL = config.RAILS_API_URL
-BASE_URL = config.BASE_URL
+# Follow-up emails are sent over long-lived SMTP sessions
+smtp_pool = SMTPConnectionPool(
+    mail,
+    max_messages=config.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    max_idle=config.SMTP_MAX_IDLE,
+)
+atexit.register(smtp_pool.close)
+
 
+def job_details(job_data):
+    """Return the ``(title, link)`` of a job post as returned by Rails."""
+    return snapshot_details(job_snapshot(job_data))
 
-def slugify(job_title, company_name):
-    """Convert job title and company name to a slug."""
-    # Combine title and company name
-    text = f"{job_title} {company_name}"
 
-    # Create a slug
-    text = text.lower()
-    text = re.sub(r"\s+", "-", text)
-    text = re.sub(r"[^\w\-]", "", text)
-    text = re.sub(r"\-\-+", "-", text)
-    return text.strip("-")
+def snapshot_details(snapshot):
+    """Return the ``(title, link)`` recorded in a follow-up's job snapshot."""
+    return snapshot.get("title"), snapshot.get("link")
 
 
 def get_job_details(job_id):
     """Fetch job details based on job ID from the external Rails API."""
     try:
-        response = requests.get(f"{API_BASE_URL}/job_posts/{job_id}", timeout=10)
-        response.raise_for_status()  # This will raise an HTTPError for bad responses
-
-        job_data = response.json()
-        job_title = job_data.get("title")
-        company_name = job_data.get("company_title")
-
-        # Create the slugified job title with the company name
-        slugified_title = slugify(job_title, company_name)
-
-        full_job_link = f"{BASE_URL}/job-posts#{slugified_title}"
-
-        return job_title, full_job_link
+        # Title and company are long-lived, so this is usually served from cache
+        return job_details(get_job_post_cache().get(job_id, STATIC_FIELDS))
     except requests.exceptions.RequestException as e:
         current_app.logger.error(
             f"Failed to fetch job details for job ID {job_id}: {e}"
@@ -70,12 +66,73 @@ def get_job_details(job_id):
         return None, None
 
 
-def compose_followup_message(followup_data):
-    """Compose the follow-up message based on the follow-up data."""
+def get_many_job_details(job_ids):
+    """Return ``{job_id: (title, link)}``, fetching each distinct job only once.
+
+    Jobs Rails could not return in time are left out.
+    """
+    unique_ids = list(dict.fromkeys(job_ids))
+    job_posts = get_job_post_cache().get_many(unique_ids, STATIC_FIELDS)
+    missing = len(unique_ids) - len(job_posts)
+    if missing:
+        current_app.logger.error(f"Failed to fetch job details for {missing} jobs")
+    return {job_id: job_details(data) for job_id, data in job_posts.items()}
+
+
+def get_followup_job_details(followup_data):
+    """Return the ``(title, link)`` to render ``followup_data`` with.
+
+    The follow-up's job snapshot is used while it is younger than
+    ``JOB_SNAPSHOT_MAX_AGE``; otherwise the job is fetched again, falling back
+    to the old snapshot if Rails cannot answer.
+    """
+    snapshot = followup_data.get("jobSnapshot")
+    if snapshot and is_fresh(snapshot, config.JOB_SNAPSHOT_MAX_AGE):
+        return snapshot_details(snapshot)
+    details = get_job_details(followup_data["jobId"])
+    if details[0] is None and snapshot:
+        return snapshot_details(snapshot)
+    return details
+
+
+def get_many_followup_job_details(followups):
+    """Return ``{job_id: (title, link)}`` for many follow-ups.
+
+    As ``get_followup_job_details``, but jobs whose snapshots are missing or
+    too old are fetched together, once per distinct job.
+    """
+    details, stale = {}, {}
+    for followup_data in followups:
+        snapshot = followup_data.get("jobSnapshot")
+        if snapshot and is_fresh(snapshot, config.JOB_SNAPSHOT_MAX_AGE):
+            details[followup_data["jobId"]] = snapshot_details(snapshot)
+        else:
+            # Keep any snapshot seen for the job as a fallback
+            job_id = followup_data["jobId"]
+            stale[job_id] = snapshot or stale.get(job_id)
+
+    stale = {job_id: s for job_id, s in stale.items() if job_id not in details}
+    if stale:
+        fetched = get_many_job_details(stale)
+        for job_id, snapshot in stale.items():
+            if job_id in fetched:
+                details[job_id] = fetched[job_id]
+            elif snapshot:
+                details[job_id] = snapshot_details(snapshot)
+    return details
+
+
+def compose_followup_message(followup_data, details=None):
+    """Compose the follow-up message based on the follow-up data.
+
+    ``details`` is the job's ``(title, link)`` when the caller already has it.
+    """
     message_parts = []
 
-    # Fetch job title and link using the job ID
-    job_title, job_link = get_job_details(followup_data["jobId"])
+    # Render from the job snapshot, fetching the job only if it is too old
+    if details is None:
+        details = get_followup_job_details(followup_data)
+    job_title, job_link = details
     if job_title and job_link:
         message_parts.append(f"Job Title: {job_title}")
         message_parts.append(f"Job Link: {job_link}")
@@ -93,8 +150,8 @@ def compose_followup_message(followup_data):
 
     # Include the follow-up date if available
     if followup_data.get("followUpDate"):
-        # Format the date in a readable way
-        follow_up_date = followup_data["followUpDate"]
+        # Messages carry the date as an ISO string; format it in a readable way
+        follow_up_date = parse_datetime(followup_data["followUpDate"])
         readable_date = follow_up_date.strftime("%B %d, %Y, %I:%M %p UTC")
 
         message_parts.append(f"Follow-Up Date: {readable_date}")
@@ -103,40 +160,172 @@ def compose_followup_message(followup_data):
     return "\n".join(message_parts)
 
 
-def callback(ch, method, properties, body):
-    """Callback function to handle incoming messages."""
-    followup_data = json.loads(body)
-    user_email = followup_data["user_email"]
+def build_followup_email(followup_data, details=None):
+    """Build the follow-up notification email for ``followup_data``."""
+    msg = Message(
+        subject="Follow-Up Notification", recipients=[followup_data["user_email"]]
+    )
+    msg.body = compose_followup_message(followup_data, details)
+    return msg
 
-    message = compose_followup_message(followup_data)
 
-    # Send email using Flask-Mail
-    msg = Message(subject="Follow-Up Notification", recipients=[user_email])
-    msg.body = message
+def send_email(msg):
+    """Send ``msg`` over a pooled SMTP session, or a fresh one if pooling is off."""
+    if config.SMTP_POOL_ENABLED:
+        smtp_pool.send(msg)
+    else:
+        mail.send(msg)
 
-    try:
-        with app.app_context():  # Ensure app context is available for sending email
-            mail.send(msg)
-        current_app.logger.info(f"Follow-up notification sent to {user_email}")
-    except Exception as e:
-        current_app.logger.error(f"Failed to send notification: {e}")
 
+def handle_followup(body):
+    """Send the notification for one message; raises if it could not be sent.
+
+    Runs on a ConcurrentConsumer worker thread, so it sets up its own app
+    context.
+    """
+    with app.app_context():
+        followup_data = json.loads(body)
+        send_email(build_followup_email(followup_data))
+        current_app.logger.info(
+            f"Follow-up notification sent to {followup_data['user_email']}"
+        )
 
-def start_consumer():
-    """Start the Pika consumer."""
-    connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-    channel = connection.channel()
 
-    channel.queue_declare(queue="followup_notifications")  # Ensure the queue exists
+def handle_followup_batch(bodies):
+    """Send the notifications for a batch of messages.
 
-    channel.basic_consume(
-        queue="followup_notifications", on_message_callback=callback, auto_ack=True
+    Job details are fetched once per distinct job in the batch. Returns one
+    entry per message: None once its email was sent, or the exception that
+    stopped it.
+    """
+    with app.app_context():
+        results, followups = _parse_batch(bodies)
+        details = get_many_followup_job_details(followups.values())
+        current_app.logger.info(
+            f"Rendering {len(followups)} follow-ups for {len(details)} distinct jobs"
+        )
+        for position, followup_data in followups.items():
+            try:
+                send_email(
+                    build_followup_email(
+                        followup_data, details.get(followup_data["jobId"], (None, None))
+                    )
+                )
+            except Exception as e:
+                results[position] = e
+        return results
+
+
+def build_digest_email(followups, details):
+    """Build one email covering several follow-ups for the same user."""
+    msg = Message(
+        subject=f"Follow-Up Digest: {len(followups)} jobs",
+        recipients=[followups[0]["user_email"]],
     )
+    sections = [
+        compose_followup_message(
+            followup_data, details.get(followup_data["jobId"], (None, None))
+        )
+        for followup_data in followups
+    ]
+    header = f"You have {len(followups)} follow-ups due:"
+    msg.body = "\n\n".join([header, "\n\n---\n\n".join(sections)])
+    return msg
+
+
+def handle_followup_digest(bodies):
+    """Send one email per recipient for a batch of messages.
+
+    A recipient with a single follow-up gets the usual notification; one with
+    several gets a digest of all of them. Returns one entry per message, as
+    ``handle_followup_batch`` does.
+    """
+    with app.app_context():
+        results, followups = _parse_batch(bodies)
+        details = get_many_followup_job_details(followups.values())
+
+        by_recipient = {}
+        for position, followup_data in followups.items():
+            by_recipient.setdefault(followup_data["user_email"], []).append(position)
+
+        for positions in by_recipient.values():
+            user_followups = [followups[position] for position in positions]
+            try:
+                if len(user_followups) == 1:
+                    followup_data = user_followups[0]
+                    msg = build_followup_email(
+                        followup_data, details.get(followup_data["jobId"], (None, None))
+                    )
+                else:
+                    msg = build_digest_email(user_followups, details)
+                send_email(msg)
+            except Exception as e:
+                for position in positions:
+                    results[position] = e
+
+        current_app.logger.info(
+            f"Sent {len(by_recipient)} emails for {len(followups)} follow-ups"
+        )
+        return results
+
+
+def _parse_batch(bodies):
+    """Return ``(results, followups)`` for a batch of raw messages.
+
+    ``followups`` maps each message's position to its decoded data; messages
+    that are not valid JSON get their error in ``results`` straight away.
+    """
+    results = [None] * len(bodies)
+    followups = {}
+    for position, body in enumerate(bodies):
+        try:
+            followups[position] = json.loads(body)
+        except ValueError as e:
+            results[position] = e
+    return results, followups
+
 
-    with app.app_context():  # Start app context for logging
-        app.logger.info("Waiting for messages. To exit press CTRL+C")
-        channel.start_consuming()
+def start_consumer():
+    """Start the Pika consumer."""
+    options = {
+        "prefetch": config.CONSUMER_PREFETCH,
+        "workers": config.CONSUMER_WORKERS,
+        "stats_interval": config.CONSUMER_STATS_INTERVAL,
+        "retry_delays": config.CONSUMER_RETRY_DELAYS,
+        "max_attempts": config.CONSUMER_MAX_ATTEMPTS,
+    }
+    if config.CONSUMER_MODE == "concurrent":
+        consumer = ConcurrentConsumer(
+            config.RABBITMQ_URL, "followup_notifications", handle_followup, **options
+        )
+    elif config.CONSUMER_MODE == "digest":
+        # Hold messages for the digest window, then send one email per user
+        consumer = BatchingConsumer(
+            config.RABBITMQ_URL,
+            "followup_notifications",
+            handle_followup_digest,
+            max_batch=config.DIGEST_MAX_MESSAGES,
+            max_wait=config.DIGEST_WINDOW_SECONDS,
+            **options,
+        )
+    elif config.CONSUMER_MODE == "batched":
+        consumer = BatchingConsumer(
+            config.RABBITMQ_URL,
+            "followup_notifications",
+            handle_followup_batch,
+            max_batch=config.CONSUMER_BATCH_SIZE,
+            max_wait=config.CONSUMER_BATCH_WAIT_MS / 1000,
+            **options,
+        )
+    else:
+        # One message at a time
+        options.update(prefetch=1, workers=1)
+        consumer = ConcurrentConsumer(
+            config.RABBITMQ_URL, "followup_notifications", handle_followup, **options
+        )
+    consumer.run()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     start_consumer()
@@ -0,0 +1,96 @@
+"""Inspect and replay dead-lettered messages.
+
+Messages that failed every retry end up in ``<queue>.dead`` (see
+``webapp.concurrent_consumer``). Once the cause is fixed they can be put back
+on their queue with a fresh attempt count::
+
+    python -m webapp.dead_letters stats followup_notifications
+    python -m webapp.dead_letters replay followup_notifications --limit 100
+"""
+
+import argparse
+import json
+import logging
+
+import pika
+
+from webapp.concurrent_consumer import (
+    ATTEMPTS_HEADER,
+    dead_letter_queue_name,
+    declare_retry_queues,
+    retry_queue_name,
+)
+from webapp.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def queue_depths(channel, queue_name, retry_delays):
+    """Return the number of ready messages in a queue, its retry queues and DLQ."""
+    names = [
+        queue_name,
+        *(retry_queue_name(queue_name, delay) for delay in retry_delays),
+        dead_letter_queue_name(queue_name),
+    ]
+    return {
+        name: channel.queue_declare(queue=name, passive=True).method.message_count
+        for name in names
+    }
+
+
+def replay(channel, queue_name, limit=None):
+    """Move up to ``limit`` dead-lettered messages back onto ``queue_name``.
+
+    Each message is acked off the dead-letter queue only after the broker
+    confirmed its republication. Returns how many were replayed.
+    """
+    channel.confirm_delivery()
+    dead_letter_queue = dead_letter_queue_name(queue_name)
+    replayed = 0
+    while limit is None or replayed < limit:
+        method, properties, body = channel.basic_get(queue=dead_letter_queue)
+        if method is None:
+            break
+        headers = dict(properties.headers or {})
+        headers.pop(ATTEMPTS_HEADER, None)
+        channel.basic_publish(
+            exchange="",
+            routing_key=queue_name,
+            body=body,
+            properties=pika.BasicProperties(
+                headers=headers,
+                content_type=properties.content_type,
+                delivery_mode=properties.delivery_mode,
+            ),
+        )
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+    logger.info("Replayed %s messages from %s", replayed, dead_letter_queue)
+    return replayed
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("command", choices=("stats", "replay"))
+    arg_parser.add_argument("queue", help="the queue the messages belong to")
+    arg_parser.add_argument(
+        "--limit", type=int, default=None, help="replay at most this many messages"
+    )
+    args = arg_parser.parse_args(argv)
+
+    config = get_config()
+    connection = pika.BlockingConnection(pika.URLParameters(config.RABBITMQ_URL))
+    try:
+        channel = connection.channel()
+        declare_retry_queues(channel, args.queue, config.CONSUMER_RETRY_DELAYS)
+        if args.command == "replay":
+            replay(channel, args.queue, limit=args.limit)
+        depths = queue_depths(channel, args.queue, config.CONSUMER_RETRY_DELAYS)
+        print(json.dumps(depths, indent=2))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
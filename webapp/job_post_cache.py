@@ -0,0 +1,214 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+
+import requests
+
+from webapp.config import get_config
+from webapp.rails_client import get_rails_client
+from webapp.utils.cache import MISSING, TTLCache
+from webapp.utils.process_local import ProcessLocal
+
+# Fields callers ask to be fresh: descriptive data changes rarely, counters often
+STATIC_FIELDS = ("title", "company_title")
+COUNT_FIELDS = ("view_count", "last_viewed")
+
+
+class _Entry:
+    __slots__ = ("data", "fetched_at", "field_fetched_at")
+
+    def __init__(self, data, fetched_at, field_fetched_at=None):
+        self.data = data
+        self.fetched_at = fetched_at
+        # Fields refreshed after the full fetch (see ``JobPostCache.update``)
+        self.field_fetched_at = field_fetched_at or {}
+
+    def age(self, field, now):
+        return now - self.field_fetched_at.get(field, self.fetched_at)
+
+
+class JobPostCache:
+    """Cache of Rails job posts with per-field TTLs and stale-while-revalidate.
+
+    ``get`` returns a fresh entry straight from memory. An entry whose
+    requested fields are stale, but still inside ``stale_ttl``, is served
+    immediately while a background refresh runs. Misses wait for Rails no
+    longer than ``miss_budget`` seconds; the fetch carries on in the
+    background and fills the cache for the next caller.
+    """
+
+    def __init__(
+        self,
+        maxsize=5000,
+        field_ttls=None,
+        default_ttl=30,
+        stale_ttl=300,
+        miss_budget=1.5,
+        refresh_workers=8,
+    ):
+        self.field_ttls = field_ttls or {}
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.miss_budget = miss_budget
+        max_ttl = max([default_ttl, *self.field_ttls.values()])
+        self._entries = TTLCache(maxsize=maxsize, ttl=max_ttl + stale_ttl)
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="job-post-refresh"
+        )
+        self._lock = threading.Lock()
+        self._refreshing = {}
+        self.stale_served = 0
+        self.budget_exceeded = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            maxsize=config.JOB_POST_CACHE_MAXSIZE,
+            field_ttls=config.JOB_POST_FIELD_TTLS,
+            default_ttl=config.JOB_POST_DEFAULT_TTL,
+            stale_ttl=config.JOB_POST_STALE_TTL,
+            miss_budget=config.JOB_POST_MISS_BUDGET,
+            refresh_workers=config.JOB_POST_REFRESH_WORKERS,
+        )
+
+    def get(self, job_id, fields=COUNT_FIELDS):
+        """Return the job post for ``job_id`` with ``fields`` fresh enough to use.
+
+        Raises ``requests.exceptions.RequestException`` when there is no usable
+        entry and Rails cannot answer within the miss budget.
+        """
+        data, future = self._lookup(job_id, fields)
+        if future is None:
+            return data
+
+        try:
+            return future.result(timeout=self.miss_budget)
+        except FutureTimeoutError as e:
+            with self._lock:
+                self.budget_exceeded += 1
+            if data is not None:
+                return data
+            raise requests.exceptions.Timeout(
+                f"Job post {job_id} not fetched within {self.miss_budget}s"
+            ) from e
+        except requests.exceptions.RequestException:
+            # Rails is failing: an expired entry beats no entry at all
+            if data is not None:
+                return data
+            raise
+
+    def get_many(self, job_ids, fields=COUNT_FIELDS):
+        """Return ``{job_id: job_post}`` for many jobs, fetching misses concurrently.
+
+        All misses share one ``miss_budget``; jobs Rails could not return in
+        time (and has no expired entry for) are left out of the result.
+        """
+        results = {}
+        pending = {}
+        for job_id in dict.fromkeys(job_ids):
+            data, future = self._lookup(job_id, fields)
+            if future is None:
+                results[job_id] = data
+            else:
+                pending[job_id] = (data, future)
+
+        if pending:
+            done, not_done = wait(
+                [future for _, future in pending.values()], timeout=self.miss_budget
+            )
+            if not_done:
+                with self._lock:
+                    self.budget_exceeded += 1
+            for job_id, (data, future) in pending.items():
+                if future in done and future.exception() is None:
+                    results[job_id] = future.result()
+                elif data is not None:
+                    results[job_id] = data
+        return results
+
+    def peek(self, job_id):
+        """Return whatever is cached for ``job_id`` (or None) without fetching."""
+        entry = self._entries.get(job_id)
+        return None if entry is MISSING else entry.data
+
+    def update(self, job_id, data):
+        """Merge fields Rails returned elsewhere (e.g. a view increment)."""
+        now = time.monotonic()
+        entry = self._entries.get(job_id)
+        if entry is MISSING:
+            return
+        field_fetched_at = {**entry.field_fetched_at, **{field: now for field in data}}
+        self._entries.set(
+            job_id, _Entry({**entry.data, **data}, entry.fetched_at, field_fetched_at)
+        )
+
+    def invalidate(self, job_id):
+        self._entries.pop(job_id)
+
+    def stats(self):
+        stats = self._entries.stats()
+        with self._lock:
+            stats.update(
+                {
+                    "stale_served": self.stale_served,
+                    "budget_exceeded": self.budget_exceeded,
+                    "refreshing": len(self._refreshing),
+                }
+            )
+        return stats
+
+    def _lookup(self, job_id, fields):
+        """Return ``(data, None)`` when the cache can answer on its own.
+
+        Otherwise return ``(expired_data_or_None, future)`` for a fetch that
+        the caller should wait on.
+        """
+        entry = self._entries.get(job_id)
+        if entry is MISSING:
+            return None, self._refresh(job_id)
+
+        ttl = self._ttl(fields)
+        age = self._age(entry, fields)
+        if age <= ttl:
+            return entry.data, None
+        if age <= ttl + self.stale_ttl:
+            with self._lock:
+                self.stale_served += 1
+            self._refresh(job_id)
+            return entry.data, None
+        return entry.data, self._refresh(job_id)
+
+    def _ttl(self, fields):
+        return min(self.field_ttls.get(field, self.default_ttl) for field in fields)
+
+    def _age(self, entry, fields):
+        now = time.monotonic()
+        return max(entry.age(field, now) for field in fields)
+
+    def _refresh(self, job_id):
+        """Start (or join) a background fetch of ``job_id`` and return its future."""
+        with self._lock:
+            future = self._refreshing.get(job_id)
+            if future is None:
+                future = self._executor.submit(self._fetch, job_id)
+                self._refreshing[job_id] = future
+        return future
+
+    def _fetch(self, job_id):
+        try:
+            data = get_rails_client().get_job_post(job_id)
+            self._entries.set(job_id, _Entry(data, time.monotonic()))
+            return data
+        finally:
+            with self._lock:
+                self._refreshing.pop(job_id, None)
+
+
+_cache = ProcessLocal(lambda: JobPostCache.from_config(get_config()))
+
+
+def get_job_post_cache():
+    """Return the process-wide JobPostCache, recreating it after a fork."""
+    return _cache.get()
@@ -0,0 +1,61 @@
+"""Compact job snapshots carried by follow-ups.
+
+Follow-up routes capture the job's title, company and link when a follow-up is
+saved, and the snapshot travels with the stored follow-up and the published
+notification, so the consumer can render emails without calling Rails at
+send time.
+"""
+
+import re
+from datetime import datetime
+
+import requests
+
+from webapp.config import get_config
+from webapp.job_post_cache import STATIC_FIELDS, get_job_post_cache
+from webapp.utils.dates import format_datetime, parse_datetime
+
+config = get_config()
+
+
+def slugify(job_title, company_name):
+    """Convert job title and company name to a slug."""
+    # Combine title and company name
+    text = f"{job_title} {company_name}"
+
+    # Create a slug
+    text = text.lower()
+    text = re.sub(r"\s+", "-", text)
+    text = re.sub(r"[^\w\-]", "", text)
+    text = re.sub(r"\-\-+", "-", text)
+    return text.strip("-")
+
+
+def job_snapshot(job_data):
+    """Build the snapshot of a job post as returned by Rails."""
+    title = job_data.get("title")
+    company = job_data.get("company_title")
+    return {
+        "title": title,
+        "company": company,
+        "link": f"{config.BASE_URL}/job-posts#{slugify(title, company)}",
+        "capturedAt": format_datetime(datetime.utcnow()),
+    }
+
+
+def capture_snapshot(job_id):
+    """Snapshot ``job_id``, or return None if Rails cannot provide it in time."""
+    try:
+        # Title and company are long-lived, so this is usually served from cache
+        return job_snapshot(get_job_post_cache().get(job_id, STATIC_FIELDS))
+    except requests.exceptions.RequestException:
+        return None
+
+
+def is_fresh(snapshot, max_age):
+    """Whether ``snapshot`` was captured less than ``max_age`` seconds ago."""
+    try:
+        captured_at = parse_datetime(snapshot["capturedAt"])
+    except (KeyError, ValueError):
+        return False
+    return (datetime.utcnow() - captured_at).total_seconds() < max_age
@@ -0,0 +1,165 @@
+"""Rewrite ISO string timestamps in ``job_interactions`` as BSON datetimes.
+
+Converts ``updated_at`` and ``follow_up_data.followUpDate``. Run it with::
+
+    python -m webapp.migrations.native_datetimes [--batch-size 500]
+        [--max-ops-per-sec 1000] [--restart]
+
+Documents are read in ``_id`` order, one keyset-bounded batch at a time, so
+the scan never holds a server cursor open while it sleeps. After every batch
+the last ``_id`` is checkpointed in the ``migrations`` collection; stopping
+and re-running the command resumes from there. Each update is conditional on
+the values it read, so a document rewritten by the app in the meantime (which
+already stores datetimes) is left alone.
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from webapp import mongo
+from webapp.utils.dates import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "native_datetimes"
+FOLLOW_UP_DATE = "follow_up_data.followUpDate"
+
+
+def convert(document):
+    """Return the ``$set`` that migrates ``document``, or None if it is current."""
+    update = {}
+    if isinstance(document.get("updated_at"), str):
+        try:
+            update["updated_at"] = parse_datetime(document["updated_at"])
+        except ValueError:
+            logger.warning("Unparseable updated_at on %s", document["_id"])
+
+    follow_up_date = (document.get("follow_up_data") or {}).get("followUpDate")
+    if isinstance(follow_up_date, str):
+        try:
+            update[FOLLOW_UP_DATE] = parse_datetime(follow_up_date)
+        except ValueError:
+            logger.warning("Unparseable followUpDate on %s", document["_id"])
+    return update or None
+
+
+class Throttle:
+    """Sleep just enough to keep the average rate at ``max_per_sec``."""
+
+    def __init__(self, max_per_sec, clock=time.monotonic, sleep=time.sleep):
+        self.max_per_sec = max_per_sec
+        self._clock = clock
+        self._sleep = sleep
+        self._started = clock()
+        self._count = 0
+
+    def wait(self, count):
+        self._count += count
+        if not self.max_per_sec:
+            return
+        ahead = self._count / self.max_per_sec - (self._clock() - self._started)
+        if ahead > 0:
+            self._sleep(ahead)
+
+
+def load_checkpoint(restart=False):
+    if restart:
+        mongo.db.migrations.delete_one({"_id": MIGRATION_ID})
+        return {}
+    return mongo.db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+
+
+def save_checkpoint(last_id, scanned, migrated, done=False):
+    mongo.db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {
+            "$set": {
+                "last_id": last_id,
+                "scanned": scanned,
+                "migrated": migrated,
+                "done": done,
+                "checkpointed_at": datetime.utcnow(),
+            }
+        },
+        upsert=True,
+    )
+
+
+def migrate(batch_size=500, max_ops_per_sec=1000, restart=False, throttle=None):
+    """Migrate every remaining document; returns ``(scanned, migrated)``."""
+    checkpoint = load_checkpoint(restart)
+    if checkpoint.get("done"):
+        logger.info("Migration %s already completed", MIGRATION_ID)
+        return checkpoint["scanned"], checkpoint["migrated"]
+
+    last_id = checkpoint.get("last_id")
+    scanned = checkpoint.get("scanned", 0)
+    migrated = checkpoint.get("migrated", 0)
+    throttle = throttle or Throttle(max_ops_per_sec)
+    collection = mongo.db.job_interactions
+
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        documents = list(
+            collection.find(query, {"updated_at": 1, "follow_up_data.followUpDate": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not documents:
+            break
+
+        requests = []
+        for document in documents:
+            update = convert(document)
+            if update is None:
+                continue
+            # Only rewrite the values we read, in case the app changed them
+            expected = {"_id": document["_id"]}
+            if "updated_at" in update:
+                expected["updated_at"] = document["updated_at"]
+            if FOLLOW_UP_DATE in update:
+                expected[FOLLOW_UP_DATE] = document["follow_up_data"]["followUpDate"]
+            requests.append(UpdateOne(expected, {"$set": update}))
+
+        if requests:
+            result = collection.bulk_write(requests, ordered=False)
+            migrated += result.modified_count
+        scanned += len(documents)
+        last_id = documents[-1]["_id"]
+        save_checkpoint(last_id, scanned, migrated)
+        logger.info("Scanned %s documents, migrated %s", scanned, migrated)
+        throttle.wait(len(documents))
+
+    save_checkpoint(last_id, scanned, migrated, done=True)
+    logger.info("Migration %s done: %s of %s migrated", MIGRATION_ID, migrated, scanned)
+    return scanned, migrated
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--batch-size", type=int, default=500)
+    arg_parser.add_argument(
+        "--max-ops-per-sec",
+        type=float,
+        default=1000,
+        help="documents scanned per second; 0 disables throttling",
+    )
+    arg_parser.add_argument(
+        "--restart", action="store_true", help="ignore any saved checkpoint"
+    )
+    args = arg_parser.parse_args(argv)
+
+    from webapp import create_app
+
+    flask_app, _ = create_app()
+    with flask_app.app_context():
+        migrate(args.batch_size, args.max_ops_per_sec, args.restart)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
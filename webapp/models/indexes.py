@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from webapp import mongo
+from webapp.config import get_config
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+# Newest-first per-user listings, shaped for (user_id, updated_at, _id) keyset
+# pagination. Partial filters keep each index to the documents it lists.
+_LISTING_KEYS = [
+    ("user_id", ASCENDING),
+    ("updated_at", DESCENDING),
+    ("_id", DESCENDING),
+]
+
+JOB_INTERACTION_INDEXES = [
+    # Every route looks interactions up by (user_id, job_id)
+    IndexModel([("user_id", ASCENDING), ("job_id", ASCENDING)], unique=True),
+    IndexModel(
+        _LISTING_KEYS,
+        name="pinned_by_user",
+        partialFilterExpression={"is_pinned": True},
+    ),
+    IndexModel(
+        _LISTING_KEYS,
+        name="saved_by_user",
+        partialFilterExpression={"is_saved": True},
+    ),
+    IndexModel(
+        _LISTING_KEYS,
+        name="follow_ups_by_user",
+        partialFilterExpression={"has_follow_up": True},
+    ),
+    # The outbox relay looks for interactions with staged events
+    IndexModel([("staged_token", ASCENDING)], name="staged", sparse=True),
+    # Delta sync scans every change for a user past an (updated_at, _id) cursor
+    IndexModel(
+        [("user_id", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+        name="changes_by_user",
+    ),
+]
+
+OUTBOX_INDEXES = [
+    # The relay polls for due pending events in next_attempt_at order
+    IndexModel(
+        [("next_attempt_at", ASCENDING), ("_id", ASCENDING)],
+        name="pending_by_due",
+        partialFilterExpression={"status": "pending"},
+    ),
+    IndexModel([("claim", ASCENDING)], name="by_claim", sparse=True),
+    # Relayed events are kept for a while for debugging, then expire
+    IndexModel(
+        [("sent_at", ASCENDING)],
+        name="sent_expiry",
+        expireAfterSeconds=config.OUTBOX_RETENTION,
+        partialFilterExpression={"status": "sent"},
+    ),
+]
+
+SCHEDULED_NOTIFICATION_INDEXES = [
+    # The scheduler polls for due notifications in next_attempt_at order
+    IndexModel(
+        [("next_attempt_at", ASCENDING), ("_id", ASCENDING)],
+        name="scheduled_by_due",
+        partialFilterExpression={"status": "scheduled"},
+    ),
+    IndexModel([("claim", ASCENDING)], name="by_claim", sparse=True),
+    IndexModel(
+        [("sent_at", ASCENDING)],
+        name="sent_expiry",
+        expireAfterSeconds=config.SCHEDULER_RETENTION,
+        partialFilterExpression={"status": "sent"},
+    ),
+]
+
+JOB_APPLICATION_INDEXES = [
+    # Application counters are recounted per job and per user
+    IndexModel([("job_id", ASCENDING)], name="by_job"),
+    IndexModel([("user_id", ASCENDING)], name="by_user"),
+]
+
+# Collection name -> indexes it must have
+INDEXES = {
+    "job_interactions": JOB_INTERACTION_INDEXES,
+    "outbox": OUTBOX_INDEXES,
+    "scheduled_notifications": SCHEDULED_NOTIFICATION_INDEXES,
+    "job_applications": JOB_APPLICATION_INDEXES,
+}
+
+
+def ensure_indexes():
+    """Create every declared index; existing identical indexes are left alone."""
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created = mongo.db[collection_name].create_indexes(indexes)
+            logger.info("Ensured indexes on %s: %s", collection_name, created)
+        except Exception as e:
+            logger.error("Error creating indexes on %s: %s", collection_name, e)
+
+
+def index_report():
+    """Report declared indexes that are missing and existing ones never used.
+
+    Usage comes from ``$indexStats`` and only covers accesses since each
+    mongod last restarted.
+    """
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        collection = mongo.db[collection_name]
+        expected = [index.document["name"] for index in indexes]
+        existing = collection.index_information()
+        usage = {
+            stats["name"]: stats["accesses"]["ops"]
+            for stats in collection.aggregate([{"$indexStats": {}}])
+        }
+        report[collection_name] = {
+            "missing": [name for name in expected if name not in existing],
+            "unused": [
+                name for name, ops in usage.items() if ops == 0 and name != "_id_"
+            ],
+            "usage": usage,
+        }
+    return report
+
+
+_started_pid = None
+_started_lock = threading.Lock()
+
+
+def ensure_indexes_in_background():
+    """Provision indexes from a daemon thread, once per process.
+
+    Runs off the startup path so a slow or unreachable MongoDB never delays
+    workers from serving requests.
+    """
+    global _started_pid
+    with _started_lock:
+        if _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+
+    def run():
+        ensure_indexes()
+        try:
+            for collection_name, report in index_report().items():
+                if report["missing"] or report["unused"]:
+                    logger.warning(
+                        "Indexes on %s missing: %s, unused: %s",
+                        collection_name,
+                        report["missing"],
+                        report["unused"],
+                    )
+        except Exception as e:
+            logger.error("Error reading index stats: %s", e)
+
+    threading.Thread(target=run, name="ensure-indexes", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import json
+
+    from webapp import create_app
+
+    flask_app, _ = create_app()
+    with flask_app.app_context():
+        ensure_indexes()
+        print(json.dumps(index_report(), indent=2))
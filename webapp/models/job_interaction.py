@@ -1,12 +1,67 @@
+import base64
+import json
 from datetime import datetime
 
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from flask import current_app
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from webapp import mongo
+from webapp.config import get_config
+from webapp.utils.dates import format_datetime, parse_datetime
+
+config = get_config()
+
+# Stands in for a ``written_at`` timestamp no write has stamped yet
+EPOCH = datetime(1970, 1, 1)
+
+# Writes stamp ``updated_at`` with the server's clock as they are applied
+SERVER_NOW = "$$NOW"
 
 
 class JobInteraction:
+    __slots__ = (
+        "id",
+        "user_id",
+        "job_id",
+        "is_pinned",
+        "is_saved",
+        "has_follow_up",
+        "updated_at",
+        "_follow_up_data",
+        "_follow_up_loaded",
+    )
+
+    # Boolean flags that can be flipped atomically with ``toggle``
+    TOGGLE_FIELDS = ("is_pinned", "is_saved")
+
+    # Projection for routes that only need the status flags
+    STATUS_FIELDS = ("is_pinned", "is_saved", "has_follow_up")
+
+    # Fields offline clients may set through ``bulk_upsert``
+    BULK_FIELDS = ("is_pinned", "is_saved")
+
+    # Flags with a per-user listing, mapped to the partial index serving it.
+    # Queries are not hinted: the index may still be building after startup.
+    LISTING_INDEXES = {
+        "is_pinned": "pinned_by_user",
+        "is_saved": "saved_by_user",
+        "has_follow_up": "follow_ups_by_user",
+    }
+
+    # Timestamps inside follow_up_data stored as BSON dates, not client strings
+    FOLLOW_UP_DATE_FIELDS = ("followUpDate",)
+
+    # Values a document gets when an atomic operation creates it
+    DEFAULTS = {
+        "is_pinned": False,
+        "is_saved": False,
+        "follow_up_data": None,
+        "has_follow_up": False,
+    }
+
     def __init__(
         self,
         user_id,
@@ -16,6 +71,7 @@ class JobInteraction:
         follow_up_data=None,
         has_follow_up=False,
         id=None,
+        updated_at=None,
     ):
         self.id = id or ObjectId()
         self.user_id = user_id
@@ -24,7 +80,25 @@ class JobInteraction:
         self.is_saved = is_saved
         self.follow_up_data = follow_up_data
         self.has_follow_up = has_follow_up
-        self.updated_at = datetime.utcnow()
+        self.updated_at = updated_at or datetime.utcnow()
+
+    @property
+    def follow_up_data(self):
+        """The follow-up blob, loaded on first access if ``find`` projected it out."""
+        if not self._follow_up_loaded:
+            interaction_data = mongo.db.job_interactions.find_one(
+                {"_id": self.id}, {"follow_up_data": 1}
+            )
+            self._follow_up_data = self._follow_up_from_storage(
+                (interaction_data or {}).get("follow_up_data")
+            )
+            self._follow_up_loaded = True
+        return self._follow_up_data
+
+    @follow_up_data.setter
+    def follow_up_data(self, value):
+        self._follow_up_data = value
+        self._follow_up_loaded = True
 
     def to_dict(self):
         return {
@@ -32,28 +106,71 @@ class JobInteraction:
             "job_id": self.job_id,
             "is_pinned": self.is_pinned,
             "is_saved": self.is_saved,
-            "follow_up_data": self.follow_up_data,
+            "follow_up_data": self._follow_up_to_storage(self.follow_up_data),
             "has_follow_up": self.has_follow_up,
-            "updated_at": self.updated_at.isoformat(),
+            "updated_at": self.updated_at,
             "_id": self.id,
         }
 
     @classmethod
     def from_dict(cls, data):
-        return cls(
+        interaction = cls(
             user_id=data["user_id"],
             job_id=data["job_id"],
             is_pinned=data.get("is_pinned", False),
             is_saved=data.get("is_saved", False),
-            follow_up_data=data.get("follow_up_data"),
+            follow_up_data=cls._follow_up_from_storage(data.get("follow_up_data")),
             has_follow_up=data.get("has_follow_up", False),
             id=data.get("_id"),
+            # Documents not yet migrated still carry ISO strings
+            updated_at=data.get("updated_at") and parse_datetime(data["updated_at"]),
         )
+        # A projected-out follow_up_data is fetched lazily on first access
+        interaction._follow_up_loaded = "follow_up_data" in data
+        return interaction
+
+    @classmethod
+    def _follow_up_to_storage(cls, follow_up_data):
+        """Return a copy of ``follow_up_data`` with its dates as datetimes.
+
+        Values that are not valid ISO 8601 are stored as the client sent them.
+        """
+        if not isinstance(follow_up_data, dict):
+            return follow_up_data
+        stored = dict(follow_up_data)
+        for field in cls.FOLLOW_UP_DATE_FIELDS:
+            if isinstance(stored.get(field), str):
+                try:
+                    stored[field] = parse_datetime(stored[field])
+                except ValueError:
+                    pass
+        return stored
+
+    @classmethod
+    def _follow_up_from_storage(cls, follow_up_data):
+        """Return ``follow_up_data`` with its stored dates as ISO 8601 strings."""
+        if not isinstance(follow_up_data, dict):
+            return follow_up_data
+        return {
+            key: (
+                format_datetime(value)
+                if key in cls.FOLLOW_UP_DATE_FIELDS and isinstance(value, datetime)
+                else value
+            )
+            for key, value in follow_up_data.items()
+        }
+
+    @staticmethod
+    def _projection(fields):
+        """Build a projection for ``fields``; None means the whole document."""
+        if fields is None:
+            return None
+        return {"user_id": 1, "job_id": 1, **{field: 1 for field in fields}}
 
     def save(self):
         """Save the JobInteraction to the database."""
         try:
-            mongo.db.job_interactions.insert_one(self.to_dict())
+            self._write({"_id": self.id}, upsert=True)
             self._log_info(
                 "JobInteraction saved successfully for user_id: %s, job_id: %s",
                 self.user_id,
@@ -66,10 +183,7 @@ class JobInteraction:
     def update(self):
         """Update the JobInteraction in the database."""
         try:
-            mongo.db.job_interactions.update_one(
-                {"user_id": self.user_id, "job_id": self.job_id},
-                {"$set": self.to_dict()},
-            )
+            self._write({"user_id": self.user_id, "job_id": self.job_id})
             self._log_info(
                 "JobInteraction updated successfully for user_id: %s, job_id: %s",
                 self.user_id,
@@ -79,12 +193,380 @@ class JobInteraction:
             self._log_error("Error updating JobInteraction: %s", e)
             raise
 
+    def _write(self, query, upsert=False):
+        """Store every field with an update pipeline, stamped with server time.
+
+        ``updated_at`` comes from ``$$NOW`` like every other write, and is read
+        back onto the instance.
+        """
+        values = {
+            name: {"$literal": value}
+            for name, value in self.to_dict().items()
+            if name not in ("_id", "updated_at")
+        }
+        values["updated_at"] = SERVER_NOW
+        now = datetime.utcnow()
+        values.update({f"written_at.{name}": now for name in self.BULK_FIELDS})
+        interaction_data = mongo.db.job_interactions.find_one_and_update(
+            query,
+            [{"$set": values}],
+            projection={"updated_at": 1},
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+        )
+        if interaction_data is not None:
+            self.updated_at = interaction_data["updated_at"]
+
+    @classmethod
+    def toggle(cls, user_id, job_id, field):
+        """Atomically flip a boolean flag and return its new value.
+
+        A single ``find_one_and_update`` upsert evaluates the flip server-side
+        with an update pipeline, creating the interaction (with the flag set)
+        if it does not exist yet, so concurrent clicks cannot lose an update.
+        """
+        if field not in cls.TOGGLE_FIELDS:
+            raise ValueError(f"Cannot toggle field: {field}")
+
+        pipeline = [
+            {
+                "$set": {
+                    **{
+                        name: {"$ifNull": [f"${name}", default]}
+                        for name, default in cls.DEFAULTS.items()
+                    },
+                    field: {"$not": [{"$ifNull": [f"${field}", False]}]},
+                    "updated_at": SERVER_NOW,
+                    f"written_at.{field}": datetime.utcnow(),
+                }
+            }
+        ]
+        try:
+            interaction_data = cls._find_one_and_upsert(
+                {"user_id": user_id, "job_id": job_id},
+                pipeline,
+                projection={field: 1, "_id": 0},
+            )
+            cls._log_info(
+                "JobInteraction %s toggled for user_id: %s, job_id: %s",
+                field,
+                user_id,
+                job_id,
+            )
+            return interaction_data[field]
+        except Exception as e:
+            cls._log_error("Error toggling JobInteraction: %s", e)
+            raise
+
+    @classmethod
+    def upsert(cls, user_id, job_id, fields=None, events=None, notifications=None):
+        """Atomically set ``fields``, creating the interaction if needed.
+
+        Every write of ``follow_up_data`` bumps its ``version``. ``events``
+        (see ``webapp.outbox``) and ``notifications`` (see
+        ``webapp.scheduler``), stamped with the new version, are staged on the
+        interaction document by the same single-document write, so they exist
+        if and only if the change does. The outbox relay moves them on (see
+        ``drain_staged``). Returns the JobInteraction as stored after the update.
+        """
+        values = cls._defaults()
+        values.update(
+            {name: {"$literal": value} for name, value in (fields or {}).items()}
+        )
+        if fields and "follow_up_data" in fields:
+            values["follow_up_data"] = {
+                "$mergeObjects": [
+                    {"$literal": cls._follow_up_to_storage(fields["follow_up_data"])},
+                    {
+                        "version": {
+                            "$add": [{"$ifNull": ["$follow_up_data.version", 0]}, 1]
+                        }
+                    },
+                ]
+            }
+        values["updated_at"] = SERVER_NOW
+        now = datetime.utcnow()
+        values.update({f"written_at.{name}": now for name in fields or ()})
+        if events:
+            values["staged_events"] = {
+                "$concatArrays": [
+                    {"$ifNull": ["$staged_events", []]},
+                    {"$literal": events},
+                ]
+            }
+        if events or notifications:
+            # Changes with every staging write, so a drain clears only its own
+            values["staged_token"] = ObjectId()
+        update = [{"$set": values}]
+        if notifications:
+            # A stage of its own, to read the version bumped by the first
+            stamped = [
+                {
+                    "$mergeObjects": [
+                        {"$literal": notification},
+                        {"version": "$follow_up_data.version"},
+                    ]
+                }
+                for notification in notifications
+            ]
+            update.append(
+                {
+                    "$set": {
+                        "staged_notifications": {
+                            "$concatArrays": [
+                                {"$ifNull": ["$staged_notifications", []]},
+                                stamped,
+                            ]
+                        }
+                    }
+                }
+            )
+        query = {"user_id": user_id, "job_id": job_id}
+        try:
+            interaction_data = cls._find_one_and_upsert(query, update)
+            cls._log_info(
+                "JobInteraction upserted for user_id: %s, job_id: %s", user_id, job_id
+            )
+            return cls.from_dict(interaction_data)
+        except Exception as e:
+            cls._log_error("Error upserting JobInteraction: %s", e)
+            raise
+
+    @classmethod
+    def bulk_upsert(cls, user_id, operations):
+        """Apply many ``(job_id, {field: (value, written_at)})`` upserts at once.
+
+        Writes are last-writer-wins per field: a value only replaces the
+        stored one if its ``written_at`` is newer than the field's entry in the
+        document's ``written_at`` (stamped by every write of the field), so
+        operations can be replayed in any order. Job IDs must be distinct;
+        merge several operations on a job before calling this.
+
+        Returns one result per operation: ``{"status": "created" | "applied" |
+        "stale" | "error", "fields": [...]}``, where ``fields`` lists the
+        fields that took effect and ``stale`` means newer writes had already
+        set every one of them. Failures carry an ``error`` message instead.
+        """
+        operations = list(operations)
+        job_ids = [job_id for job_id, _ in operations]
+        if len(set(job_ids)) != len(job_ids):
+            raise ValueError("Operations must target distinct jobs")
+
+        requests = [
+            cls._bulk_request(user_id, job_id, fields) for job_id, fields in operations
+        ]
+        results = [{"status": "applied"} for _ in requests]
+        pending = list(range(len(requests)))
+
+        # Concurrent first-time upserts can collide on the unique index; the
+        # documents exist afterwards, so those operations get one retry.
+        for attempt in range(2):
+            try:
+                result = mongo.db.job_interactions.bulk_write(
+                    [requests[i] for i in pending], ordered=False
+                )
+                upserted, errors = result.upserted_ids, []
+            except BulkWriteError as e:
+                upserted = {u["index"]: u["_id"] for u in e.details["upserted"]}
+                errors = e.details["writeErrors"]
+
+            for index in upserted:
+                results[pending[index]] = {"status": "created"}
+            retry = []
+            for error in errors:
+                position = pending[error["index"]]
+                if error["code"] == 11000 and attempt == 0:
+                    retry.append(position)
+                else:
+                    results[position] = {"status": "error", "error": error["errmsg"]}
+            if not retry:
+                break
+            pending = retry
+
+        cls._report_applied_fields(user_id, operations, results)
+        cls._log_info(
+            "Bulk upserted %s JobInteractions for user_id: %s", len(requests), user_id
+        )
+        return results
+
+    @staticmethod
+    def _report_applied_fields(user_id, operations, results):
+        """Add the fields each written operation set, marking it stale if none.
+
+        A field took effect if the document's ``written_at`` entry for it is
+        now the operation's own timestamp (as stored: BSON dates keep
+        milliseconds).
+        """
+        written = [i for i, result in enumerate(results) if result["status"] != "error"]
+        if not written:
+            return
+        cursor = mongo.db.job_interactions.find(
+            {
+                "user_id": user_id,
+                "job_id": {"$in": [operations[i][0] for i in written]},
+            },
+            {"job_id": 1, "written_at": 1, "_id": 0},
+        )
+        stored = {data["job_id"]: data.get("written_at") or {} for data in cursor}
+        for position in written:
+            job_id, fields = operations[position]
+            applied = [
+                name
+                for name, (_, written_at) in fields.items()
+                if stored.get(job_id, {}).get(name)
+                == written_at.replace(microsecond=written_at.microsecond // 1000 * 1000)
+            ]
+            results[position]["fields"] = applied
+            if fields and not applied and results[position]["status"] == "applied":
+                results[position]["status"] = "stale"
+
+    @classmethod
+    def _bulk_request(cls, user_id, job_id, fields):
+        """Build a per-field last-writer-wins upsert as an update pipeline."""
+        update = cls._defaults()
+        newer_fields = []
+        for name, (value, written_at) in fields.items():
+            newer = {"$gt": [written_at, {"$ifNull": [f"$written_at.{name}", EPOCH]}]}
+            newer_fields.append(newer)
+            update[name] = {"$cond": [newer, {"$literal": value}, update[name]]}
+            update[f"written_at.{name}"] = {
+                "$cond": [newer, written_at, f"$written_at.{name}"]
+            }
+        # Only a write that changes something moves the document in delta sync
+        unchanged = {"$ifNull": ["$updated_at", SERVER_NOW]}
+        update["updated_at"] = (
+            {"$cond": [{"$or": newer_fields}, SERVER_NOW, unchanged]}
+            if newer_fields
+            else unchanged
+        )
+        return UpdateOne(
+            {"user_id": user_id, "job_id": job_id}, [{"$set": update}], upsert=True
+        )
+
+    @classmethod
+    def _defaults(cls):
+        """Pipeline ``$set`` values keeping each field or filling in its default."""
+        return {
+            name: {"$ifNull": [f"${name}", default]}
+            for name, default in cls.DEFAULTS.items()
+        }
+
+    @classmethod
+    def drain_staged(cls, limit=100):
+        """Move events and notifications staged by ``upsert`` on.
+
+        Events go into the outbox and notifications are scheduled. Events keep
+        their ``_id`` and notifications their version, so moving them twice
+        (by a relay that crashed before clearing them, or by two relays at
+        once) has no further effect. Returns how many interactions had staged
+        writes.
+        """
+        documents = list(
+            mongo.db.job_interactions.find(
+                {"staged_token": {"$exists": True}},
+                {"staged_events": 1, "staged_notifications": 1, "staged_token": 1},
+            ).limit(limit)
+        )
+        for document in documents:
+            events = document.get("staged_events") or []
+            notifications = document.get("staged_notifications") or []
+            if events:
+                mongo.db.outbox.bulk_write(
+                    [
+                        UpdateOne(
+                            {"_id": event["_id"]},
+                            {
+                                "$setOnInsert": {
+                                    k: v for k, v in event.items() if k != "_id"
+                                }
+                            },
+                            upsert=True,
+                        )
+                        for event in events
+                    ],
+                    ordered=False,
+                )
+            for notification in notifications:
+                cls._schedule_notification(notification, notification.get("version"))
+            cleared = mongo.db.job_interactions.update_one(
+                {"_id": document["_id"], "staged_token": document["staged_token"]},
+                {
+                    "$unset": {
+                        "staged_events": "",
+                        "staged_notifications": "",
+                        "staged_token": "",
+                    }
+                },
+            )
+            if not cleared.matched_count:
+                # Staged again meanwhile: only take out what was moved here
+                mongo.db.job_interactions.update_one(
+                    {"_id": document["_id"]},
+                    {
+                        "$pull": {
+                            "staged_events": {
+                                "_id": {"$in": [e["_id"] for e in events]}
+                            },
+                            "staged_notifications": {"$in": notifications},
+                        }
+                    },
+                )
+        if documents:
+            cls._log_info("Moved staged writes of %s JobInteractions", len(documents))
+        return len(documents)
+
+    @staticmethod
+    def _schedule_notification(notification, version):
+        """Store ``notification`` unless a newer version is already scheduled.
+
+        Notifications are keyed per follow-up, so a reschedule replaces the old
+        one. Concurrent saves can reach this point out of order; the version
+        check keeps an older save from replacing the newer one, whose upsert
+        then fails on the ``_id`` and is dropped.
+        """
+        query = {"_id": notification["_id"]}
+        if version is not None:
+            query["version"] = {"$not": {"$gte": version}}
+        try:
+            mongo.db.scheduled_notifications.replace_one(
+                query,
+                {**notification, "version": version},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass
+
+    @classmethod
+    def _find_one_and_upsert(cls, query, update, projection=None):
+        try:
+            return mongo.db.job_interactions.find_one_and_update(
+                query,
+                update,
+                projection=projection,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Two concurrent upserts raced to insert; the document exists now,
+            # so a retry takes the update path.
+            return mongo.db.job_interactions.find_one_and_update(
+                query,
+                update,
+                projection=projection,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+
     @classmethod
-    def find(cls, user_id, job_id):
-        """Find a JobInteraction by user_id and job_id."""
+    def find(cls, user_id, job_id, fields=None):
+        """Find a JobInteraction by user_id and job_id.
+
+        ``fields`` limits which fields are fetched; flags left out read as
+        False and ``follow_up_data`` is loaded lazily if it is accessed.
+        """
         try:
             interaction_data = mongo.db.job_interactions.find_one(
-                {"user_id": user_id, "job_id": job_id}
+                {"user_id": user_id, "job_id": job_id}, cls._projection(fields)
             )
             if interaction_data:
                 cls._log_info(
@@ -99,6 +581,176 @@ class JobInteraction:
             cls._log_error("Error finding JobInteraction: %s", e)
             raise
 
+    @classmethod
+    def find_many(cls, user_id, job_ids, fields=STATUS_FIELDS):
+        """Find the user's JobInteractions for many jobs with a single query."""
+        try:
+            cursor = mongo.db.job_interactions.find(
+                {"user_id": user_id, "job_id": {"$in": list(job_ids)}},
+                cls._projection(fields),
+            )
+            interactions = {data["job_id"]: cls.from_dict(data) for data in cursor}
+            cls._log_info(
+                "Found %s JobInteractions for user_id: %s among %s jobs",
+                len(interactions),
+                user_id,
+                len(job_ids),
+            )
+            return interactions
+        except Exception as e:
+            cls._log_error("Error finding JobInteractions: %s", e)
+            raise
+
+    @classmethod
+    def follow_up_versions(cls, keys):
+        """Map ``(user_id, job_id)`` keys to ``(version, notified_version)``.
+
+        ``version`` is the current ``follow_up_data`` version and
+        ``notified_version`` the last one a notification went out for; either
+        is None when unset. Interactions that do not exist are left out.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        cursor = mongo.db.job_interactions.find(
+            {"$or": [{"user_id": u, "job_id": j} for u, j in keys]},
+            {
+                "user_id": 1,
+                "job_id": 1,
+                "follow_up_data.version": 1,
+                "follow_up_notified_version": 1,
+            },
+        )
+        return {
+            (data["user_id"], data["job_id"]): (
+                (data.get("follow_up_data") or {}).get("version"),
+                data.get("follow_up_notified_version"),
+            )
+            for data in cursor
+        }
+
+    @classmethod
+    def mark_follow_up_notified(cls, user_id, job_id, version):
+        """Record that the notification for follow-up ``version`` went out."""
+        mongo.db.job_interactions.update_one(
+            {"user_id": user_id, "job_id": job_id},
+            {"$max": {"follow_up_notified_version": version}},
+        )
+
+    @classmethod
+    def list_for_user(cls, user_id, flag, limit=20, cursor=None, fields=STATUS_FIELDS):
+        """List the user's interactions with ``flag`` set, most recently updated first.
+
+        Pages are keyset-paginated on (updated_at, _id): ``cursor`` is the
+        opaque value returned with the previous page, so every page is a
+        bounded range scan of the flag's partial index, however deep it is.
+        Returns ``(interactions, next_cursor)``; ``next_cursor`` is None on the
+        last page. Raises ValueError for an unknown flag or malformed cursor.
+        """
+        if flag not in cls.LISTING_INDEXES:
+            raise ValueError(f"Cannot list by field: {flag}")
+
+        query = {"user_id": user_id, flag: True}
+        if cursor is not None:
+            updated_at, last_id = cls.decode_cursor(cursor)
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$lt": last_id}},
+            ]
+
+        try:
+            documents = list(
+                mongo.db.job_interactions.find(
+                    query, cls._projection((*fields, "updated_at"))
+                )
+                .sort([("updated_at", -1), ("_id", -1)])
+                .limit(limit + 1)
+            )
+            cls._log_info(
+                "Listed %s JobInteractions with %s for user_id: %s",
+                min(len(documents), limit),
+                flag,
+                user_id,
+            )
+        except Exception as e:
+            cls._log_error("Error listing JobInteractions: %s", e)
+            raise
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = cls.encode_cursor(last["updated_at"], last["_id"])
+        return [cls.from_dict(data) for data in documents], next_cursor
+
+    @classmethod
+    def changes_since(cls, user_id, cursor=None, limit=500):
+        """Return the user's interactions changed after ``cursor``, oldest first.
+
+        Cleared flags are included as they are, so a document with every flag
+        False acts as a tombstone for clients mirroring this state. Returns
+        ``(documents, next_cursor, has_more)``, where the documents only carry
+        ``job_id``, the status flags and ``updated_at``; ``next_cursor`` is
+        ``cursor`` itself when nothing changed.
+
+        Writes stamp ``updated_at`` on the server as they are applied, but a
+        write can still commit after another one stamped later. Only changes
+        older than ``SYNC_SETTLE_SECONDS`` by the server's clock are returned,
+        so no write can land behind a cursor once a client has been given it.
+        """
+        settled = {"$subtract": [SERVER_NOW, config.SYNC_SETTLE_SECONDS * 1000]}
+        query = {
+            "user_id": user_id,
+            "$expr": {"$lte": ["$updated_at", settled]},
+        }
+        if cursor is not None:
+            updated_at, last_id = cls.decode_cursor(cursor)
+            query["$or"] = [
+                {"updated_at": {"$gt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$gt": last_id}},
+            ]
+
+        try:
+            documents = list(
+                mongo.db.job_interactions.find(
+                    query,
+                    {"job_id": 1, "updated_at": 1, **{f: 1 for f in cls.STATUS_FIELDS}},
+                )
+                .sort([("updated_at", 1), ("_id", 1)])
+                .limit(limit + 1)
+            )
+            cls._log_info(
+                "Found %s changed JobInteractions for user_id: %s",
+                min(len(documents), limit),
+                user_id,
+            )
+        except Exception as e:
+            cls._log_error("Error finding changed JobInteractions: %s", e)
+            raise
+
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        if documents:
+            last = documents[-1]
+            cursor = cls.encode_cursor(last["updated_at"], last["_id"])
+        return documents, cursor, has_more
+
+    @staticmethod
+    def encode_cursor(updated_at, last_id):
+        """Encode an (updated_at, _id) position as an opaque URL-safe cursor."""
+        if isinstance(updated_at, datetime):
+            updated_at = format_datetime(updated_at)
+        raw = json.dumps([updated_at, str(last_id)]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            updated_at, last_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return parse_datetime(updated_at), ObjectId(last_id)
+        except (ValueError, TypeError, InvalidId) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
     @classmethod
     def create_index(cls):
         """Create a unique index on user_id and job_id."""
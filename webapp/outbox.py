@@ -0,0 +1,174 @@
+"""Transactional outbox for events raised by interaction changes.
+
+Routes never talk to the broker. Events are staged on the interaction
+document by the same single-document write as the change that raised them
+(see ``JobInteraction.upsert``), which is atomic on a standalone server too. A
+relay process moves staged events into the ``outbox`` collection and drains
+it::
+
+    python -m webapp.outbox
+
+Delivery is at-least-once: an event is marked sent only after the broker
+confirmed it, so a relay crashing in between re-sends it.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+
+from webapp import mongo
+from webapp.config import get_config
+from webapp.models.job_interaction import JobInteraction
+from webapp.publisher import RabbitMQPublisher
+from webapp.utils import leasing
+
+logger = logging.getLogger(__name__)
+
+
+def message_event(queue_name, payload):
+    """An event that publishes ``payload`` as JSON to ``queue_name``."""
+    return _event({"kind": "message", "queue": queue_name, "payload": payload})
+
+
+def task_event(task_name, args, eta=None):
+    """An event that sends the Celery task ``task_name``, optionally at ``eta``."""
+    return _event({"kind": "task", "task": task_name, "args": args, "eta": eta})
+
+
+def _event(fields):
+    now = datetime.utcnow()
+    return {
+        # Assigned up front, so moving a staged event twice inserts it once
+        "_id": ObjectId(),
+        **fields,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+    }
+
+
+class OutboxRelay:
+    """Drains pending outbox events to RabbitMQ and Celery in batches.
+
+    Batches are claimed with a lease (see ``webapp.utils.leasing``), so several
+    relays can run side by side. Failed events are retried with exponential
+    backoff, up to ``max_backoff`` seconds.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        celery,
+        batch_size=100,
+        poll_interval=1,
+        lease_seconds=30,
+        max_backoff=300,
+    ):
+        self.publisher = publisher
+        self.celery = celery
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_backoff = max_backoff
+        self._stopped = threading.Event()
+        self.relayed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, config, celery):
+        return cls(
+            RabbitMQPublisher(config.RABBITMQ_URL, pool_size=1, confirm_delivery=True),
+            celery,
+            batch_size=config.OUTBOX_BATCH_SIZE,
+            poll_interval=config.OUTBOX_POLL_INTERVAL,
+            lease_seconds=config.OUTBOX_LEASE_SECONDS,
+            max_backoff=config.OUTBOX_MAX_BACKOFF,
+        )
+
+    def run(self):
+        """Relay until ``stop`` is called, idling between empty polls."""
+        logger.info("Outbox relay started")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    relayed = self.relay_batch()
+                except Exception as e:
+                    logger.error("Unexpected error relaying outbox events: %s", e)
+                    relayed = 0
+                if not relayed:
+                    self._stopped.wait(self.poll_interval)
+        finally:
+            self.publisher.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def relay_batch(self):
+        """Claim and relay one batch of due events; returns how many were sent.
+
+        Events and notifications staged on interactions are moved on first.
+        Events are relayed in creation order. The first failure ends the batch,
+        and the rest of the batch is released for the next poll.
+        """
+        JobInteraction.drain_staged(self.batch_size)
+        events = leasing.claim_due(
+            mongo.db.outbox, "pending", self.batch_size, self.lease_seconds
+        )
+        sent = []
+        for position, event in enumerate(events):
+            try:
+                self._deliver(event)
+            except Exception as e:
+                logger.error("Failed to relay outbox event %s: %s", event["_id"], e)
+                self.failed += 1
+                leasing.retry_later(mongo.db.outbox, event, self.max_backoff)
+                leasing.release(mongo.db.outbox, events[position + 1 :])
+                break
+            sent.append(event)
+
+        if sent:
+            leasing.complete(mongo.db.outbox, sent)
+            self.relayed += len(sent)
+            logger.info("Relayed %s outbox events", len(sent))
+        return len(sent)
+
+    def stats(self):
+        return {
+            "relayed": self.relayed,
+            "failed": self.failed,
+            "pending": mongo.db.outbox.count_documents({"status": "pending"}),
+        }
+
+    def _deliver(self, event):
+        if event["kind"] == "message":
+            self.publisher.publish(event["queue"], json.dumps(event["payload"]))
+        elif event["kind"] == "task":
+            eta = event.get("eta")
+            self.celery.send_task(
+                event["task"],
+                args=event["args"],
+                eta=eta.replace(tzinfo=timezone.utc) if eta else None,
+            )
+        else:
+            raise ValueError(f"Unknown outbox event kind: {event['kind']}")
+
+
+def main():
+    from webapp import create_app
+
+    flask_app, celery = create_app()
+    relay = OutboxRelay.from_config(get_config(), celery)
+    with flask_app.app_context():
+        try:
+            relay.run()
+        except KeyboardInterrupt:
+            relay.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,41 +1,30 @@
 import json
 
-import pika
+from webapp.publisher import get_publisher
 
 
-def publish_followup_notification(followup_data):
-    """Publish the follow-up notification to RabbitMQ."""
-    connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="followup_notifications")  # Declare the queue
-
-    # Prepare the message
-    message = {
+def followup_message(followup_data):
+    """The followup_notifications message for a saved follow-up."""
+    return {
         "user_email": followup_data["user_email"],
         "jobId": followup_data["jobId"],
         "status": followup_data["status"],
         "notes": followup_data.get("notes"),
         "nextStep": followup_data.get("nextStep"),
         "followUpDate": followup_data.get("followUpDate"),
+        "jobSnapshot": followup_data.get("jobSnapshot"),
     }
 
-    # Publish the message
-    channel.basic_publish(
-        exchange="", routing_key="followup_notifications", body=json.dumps(message)
-    )
 
-    connection.close()
+def publish_followup_notification(followup_data):
+    """Publish the follow-up notification to RabbitMQ."""
+    message = followup_message(followup_data)
 
+    # Publish the message over a pooled, long-lived connection
+    get_publisher().publish("followup_notifications", json.dumps(message))
 
-def publish_job_application(job_id, user_id):
-    connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-    channel = connection.channel()
-    channel.queue_declare(queue="job_applications")
 
+def publish_job_application(job_id, user_id):
     message = {"job_id": job_id, "user_id": user_id}
 
-    channel.basic_publish(
-        exchange="", routing_key="job_applications", body=json.dumps(message)
-    )
-    connection.close()
+    get_publisher().publish("job_applications", json.dumps(message))
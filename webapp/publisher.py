@@ -0,0 +1,186 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+import pika
+from pika.exceptions import AMQPError
+
+from webapp.config import get_config
+from webapp.utils.process_local import ProcessLocal
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    """One pooled connection with its channel and the queues it has declared."""
+
+    __slots__ = ("connection", "channel", "declared", "pid")
+
+    def __init__(self, connection, channel):
+        self.connection = connection
+        self.channel = channel
+        self.declared = set()
+        self.pid = os.getpid()
+
+
+class RabbitMQPublisher:
+    """Process-wide pool of long-lived RabbitMQ publishing connections.
+
+    ``BlockingConnection`` is not thread-safe, so each connection is checked
+    out by one thread at a time; up to ``pool_size`` are opened on demand and
+    kept for reuse. Every connection remembers which queues it has declared,
+    so the declaration happens once per connection instead of per message.
+    Idle connections are polled for heartbeats when they are checked out,
+    and a publish that fails on a dropped connection is retried once on a
+    fresh one. Connections inherited across a fork are never reused.
+
+    With ``confirm_delivery`` every channel is in publisher-confirm mode and
+    ``publish`` only returns once the broker has acknowledged the message.
+    """
+
+    def __init__(self, url, pool_size=4, acquire_timeout=5, confirm_delivery=False):
+        self.parameters = pika.URLParameters(url)
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.confirm_delivery = confirm_delivery
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self.published = 0
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.declarations = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.RABBITMQ_URL,
+            pool_size=config.RABBITMQ_PUBLISHER_POOL_SIZE,
+            acquire_timeout=config.RABBITMQ_PUBLISH_TIMEOUT,
+        )
+
+    def publish(self, queue_name, body, properties=None):
+        """Publish ``body`` to ``queue_name`` through the default exchange."""
+        slot = self._acquire()
+        try:
+            try:
+                self._publish(slot, queue_name, body, properties)
+            except AMQPError as e:
+                logger.warning("Publisher connection lost, reconnecting: %s", e)
+                self._close(slot)
+                slot = self._connect()
+                with self._lock:
+                    self.reconnects += 1
+                self._publish(slot, queue_name, body, properties)
+        except Exception:
+            self._discard(slot)
+            raise
+        self._idle.put(slot)
+
+    def close(self):
+        """Close every idle connection owned by this process."""
+        while True:
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(slot)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "published": self.published,
+                "connections_opened": self.connections_opened,
+                "reconnects": self.reconnects,
+                "declarations": self.declarations,
+            }
+
+    def _acquire(self):
+        """Check out an idle connection, opening one if the pool has room."""
+        while True:
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if slot.pid != os.getpid():
+                # The socket is shared with the parent process; just drop it
+                with self._lock:
+                    self._open -= 1
+                continue
+            try:
+                # Answers heartbeats and surfaces a connection the broker closed
+                slot.connection.process_data_events(time_limit=0)
+                return slot
+            except AMQPError:
+                self._discard(slot)
+
+        with self._lock:
+            has_room = self._open < self.pool_size
+            if has_room:
+                self._open += 1
+        if has_room:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty as e:
+            raise TimeoutError(
+                f"No RabbitMQ publisher connection free after {self.acquire_timeout}s"
+            ) from e
+
+    def _connect(self):
+        connection = pika.BlockingConnection(self.parameters)
+        slot = _Slot(connection, connection.channel())
+        if self.confirm_delivery:
+            slot.channel.confirm_delivery()
+        with self._lock:
+            self.connections_opened += 1
+        return slot
+
+    def _publish(self, slot, queue_name, body, properties):
+        if queue_name not in slot.declared:
+            slot.channel.queue_declare(queue=queue_name)
+            slot.declared.add(queue_name)
+            with self._lock:
+                self.declarations += 1
+        slot.channel.basic_publish(
+            exchange="", routing_key=queue_name, body=body, properties=properties
+        )
+        with self._lock:
+            self.published += 1
+
+    def _close(self, slot):
+        try:
+            if slot.connection.is_open:
+                slot.connection.close()
+        except AMQPError as e:
+            logger.debug("Error closing publisher connection: %s", e)
+
+    def _discard(self, slot):
+        self._close(slot)
+        with self._lock:
+            self._open -= 1
+
+
+def _create_publisher():
+    publisher = RabbitMQPublisher.from_config(get_config())
+    atexit.register(publisher.close)
+    return publisher
+
+
+_publisher = ProcessLocal(_create_publisher)
+
+
+def get_publisher():
+    """Return the process-wide RabbitMQPublisher, recreating it after a fork."""
+    return _publisher.get()
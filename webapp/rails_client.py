@@ -0,0 +1,148 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from webapp.config import get_config
+from webapp.utils.process_local import ProcessLocal
+from webapp.utils.singleflight import SingleFlight
+
+
+class RailsClient:
+    """Pooled, keep-alive HTTP client for the Rails API.
+
+    A single ``requests.Session`` is shared by every caller in the process so
+    TCP/TLS connections are reused between requests. Each endpoint has its own
+    read timeout, and failed connections / idempotent requests are retried a
+    bounded number of times with exponential backoff. Concurrent identical
+    reads (token validation, job post lookups) share one in-flight request.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=10,
+        max_retries=2,
+        backoff_factor=0.2,
+        connect_timeout=2,
+        timeouts=None,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.timeouts = timeouts or {}
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.RAILS_API_URL,
+            pool_size=config.RAILS_POOL_SIZE,
+            max_retries=config.RAILS_MAX_RETRIES,
+            backoff_factor=config.RAILS_RETRY_BACKOFF,
+            connect_timeout=config.RAILS_CONNECT_TIMEOUT,
+            timeouts=config.RAILS_TIMEOUTS,
+        )
+
+    def request(self, method, endpoint, path, **kwargs):
+        """Send a request to ``path``, using the timeout configured for ``endpoint``."""
+        kwargs.setdefault(
+            "timeout", (self.connect_timeout, self.timeouts.get(endpoint, 10))
+        )
+        try:
+            return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+
+    def validate_token(self, token):
+        """POST the token to Rails and return the raw response."""
+        return self.flight.do(
+            ("validate_token", token),
+            self.request,
+            "POST",
+            "validate_token",
+            "/validate_token",
+            json={"access_token": token},
+        )
+
+    def get_job_post(self, job_id):
+        """Fetch a job post, raising ``requests.HTTPError`` on a bad status."""
+        return self.flight.do(("job_post", job_id), self._fetch_job_post, job_id)
+
+    def _fetch_job_post(self, job_id):
+        response = self.request("GET", "job_post", f"/job_posts/{job_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def increment_view_count(self, job_id):
+        """Increment a job post's view count and return Rails' view data."""
+        response = self.request(
+            "POST",
+            "increment_view_count",
+            f"/job_posts/{job_id}/increment_view_count",
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def increment_view_counts(self, increments, idempotency_key=None):
+        """Apply aggregated view increments (``{job_id: count}``) in one request.
+
+        ``idempotency_key`` is sent as the ``Idempotency-Key`` header so Rails
+        can ignore a retry of a batch it has already applied.
+        """
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        response = self.request(
+            "POST",
+            "increment_view_counts",
+            "/job_posts/increment_view_counts",
+            json={"view_counts": increments},
+            headers=headers,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        """Return request counters, connections opened vs. reused and coalescing."""
+        opened = requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:  # evicted while iterating
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+
+        return {
+            "requests": requests_sent,
+            "errors": self.errors,
+            "connections_opened": opened,
+            "connections_reused": max(requests_sent - opened, 0),
+            "coalesced": self.flight.coalesced,
+        }
+
+
+_client = ProcessLocal(lambda: RailsClient.from_config(get_config()))
+
+
+def get_rails_client():
+    """Return the process-wide RailsClient, recreating it after a fork."""
+    return _client.get()
@@ -5,10 +5,15 @@ from dateutil import parser
 from flask import Blueprint, current_app, jsonify, request
 
 from webapp.config import get_config
+from webapp.job_post_cache import COUNT_FIELDS, get_job_post_cache
+from webapp.job_snapshot import capture_snapshot
 from webapp.models.job_interaction import JobInteraction
-from webapp.producer import publish_job_application
-from webapp.tasks.jobs import send_followup_notification
+from webapp.outbox import message_event
+from webapp.rails_client import get_rails_client
+from webapp.scheduler import scheduled_notification
 from webapp.utils.auth import token_required
+from webapp.utils.dates import parse_datetime
+from webapp.view_counter import get_view_counter
 
 
 def get_logger():
@@ -17,7 +22,17 @@ def get_logger():
 
 config = get_config()
 job_interaction_routes = Blueprint("job_interaction_routes", __name__)
-RAILS_API_URL = config.RAILS_API_URL
+
+# Page sizes for the keyset-paginated listing endpoints
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Delta sync: changes per response and the bits packed into each flags entry
+SYNC_PAGE_SIZE = 500
+SYNC_FLAG_BITS = {"is_pinned": 1, "is_saved": 2, "has_follow_up": 4}
+
+# Batch operation keys -> JobInteraction fields they set
+BATCH_FIELDS = {"isPinned": "is_pinned", "isSaved": "is_saved"}
 
 
 @job_interaction_routes.route("/<string:job_id>/pin", methods=["POST"])
@@ -25,23 +40,12 @@ RAILS_API_URL = config.RAILS_API_URL
 def toggle_pin(job_id: str) -> tuple:
     logger = get_logger()
     user_id = request.user.get("user_id")
-    interaction = JobInteraction.find(user_id, job_id)
-
-    if interaction:
-        interaction.is_pinned = not interaction.is_pinned
-        interaction.update()
-        logger.info(
-            "Toggled pin for job_id: %s by user_id: %s to %s",
-            job_id,
-            user_id,
-            interaction.is_pinned,
-        )
-    else:
-        interaction = JobInteraction(user_id=user_id, job_id=job_id, is_pinned=True)
-        interaction.save()
-        logger.info("Pinned job_id: %s by user_id: %s", job_id, user_id)
+    is_pinned = JobInteraction.toggle(user_id, job_id, "is_pinned")
+    logger.info(
+        "Toggled pin for job_id: %s by user_id: %s to %s", job_id, user_id, is_pinned
+    )
 
-    return jsonify({"isPinned": interaction.is_pinned}), 200
+    return jsonify({"isPinned": is_pinned}), 200
 
 
 @job_interaction_routes.route("/<string:job_id>/save", methods=["POST"])
@@ -49,23 +53,12 @@ def toggle_pin(job_id: str) -> tuple:
 def toggle_save(job_id: str) -> tuple:
     logger = get_logger()
     user_id = request.user.get("user_id")
-    interaction = JobInteraction.find(user_id, job_id)
+    is_saved = JobInteraction.toggle(user_id, job_id, "is_saved")
+    logger.info(
+        "Toggled save for job_id: %s by user_id: %s to %s", job_id, user_id, is_saved
+    )
 
-    if interaction:
-        interaction.is_saved = not interaction.is_saved
-        interaction.update()
-        logger.info(
-            "Toggled save for job_id: %s by user_id: %s to %s",
-            job_id,
-            user_id,
-            interaction.is_saved,
-        )
-    else:
-        interaction = JobInteraction(user_id=user_id, job_id=job_id, is_saved=True)
-        interaction.save()
-        logger.info("Saved job_id: %s by user_id: %s", job_id, user_id)
-
-    return jsonify({"isSaved": interaction.is_saved}), 200
+    return jsonify({"isSaved": is_saved}), 200
 
 
 @job_interaction_routes.route("/<string:job_id>/follow-ups", methods=["POST"])
@@ -82,41 +75,17 @@ def create_follow_up(job_id: str) -> tuple:
         )
         return jsonify({"message": "No data provided"}), 400
 
-    interaction = JobInteraction.find(user_id, job_id)
-
-    if not interaction:
-        interaction = JobInteraction(
-            user_id=user_id, job_id=job_id, follow_up_data=data, has_follow_up=True
-        )
-        interaction.save()
-        logger.info("Created follow-up for job_id: %s by user_id: %s", job_id, user_id)
-    else:
-        interaction.follow_up_data = data
-        interaction.has_follow_up = True
-        interaction.update()
-        logger.info("Updated follow-up for job_id: %s by user_id: %s", job_id, user_id)
-
+    _attach_job_snapshot(job_id, data)
+    follow_up = dict(data)
     data["user_email"] = user_email
-
-    # Use dateutil.parser to parse the followUpDate
-    follow_up_date = parser.isoparse(data["followUpDate"])
-
-    # Calculate delay using offset-aware datetime
-    delay = (follow_up_date - datetime.now(timezone.utc)).total_seconds()
-
-    if delay > 0:
-        # Schedule the task
-        send_followup_notification.apply_async(args=[data], eta=follow_up_date)
-        logger.info(
-            f"Scheduled follow-up notification for job ID: {data['jobId']} at {follow_up_date}."
-        )
-    else:
-        logger.warning("The follow-up date is in the past. Email will not be sent.")
-
-    if data["status"] == "applied":
-
-        publish_job_application(job_id, user_id)
-        logger.info(f"Sent job application message for job ID: {data['jobId']}.")
+    JobInteraction.upsert(
+        user_id,
+        job_id,
+        {"follow_up_data": follow_up, "has_follow_up": True},
+        events=_follow_up_events(job_id, user_id, data),
+        notifications=_follow_up_notifications(job_id, user_id, data),
+    )
+    logger.info("Saved follow-up for job_id: %s by user_id: %s", job_id, user_id)
     return jsonify(data), 200
 
 
@@ -132,7 +101,9 @@ def update_follow_up(job_id: str) -> tuple:
         logger.warning("No data provided for follow-up update by user_id: %s", user_id)
         return jsonify({"message": "No data provided"}), 400
 
-    interaction = JobInteraction.find(user_id, job_id)
+    interaction = JobInteraction.find(
+        user_id, job_id, fields=JobInteraction.STATUS_FIELDS
+    )
 
     if not interaction:
         logger.warning(
@@ -140,9 +111,7 @@ def update_follow_up(job_id: str) -> tuple:
         )
         return jsonify({"message": "Follow-up not found"}), 404
 
-    interaction.follow_up_data = data
-    interaction.update()
-    logger.info("Updated follow-up for job_id: %s by user_id: %s", job_id, user_id)
+    _attach_job_snapshot(job_id, data)
 
     # Collect follow-up data from the request
     followup_data = {
@@ -151,28 +120,78 @@ def update_follow_up(job_id: str) -> tuple:
         "notes": data.get("notes"),
         "nextStep": data.get("nextStep"),
         "followUpDate": data.get("followUpDate"),
+        "jobSnapshot": data.get("jobSnapshot"),
         "user_email": user_email,
     }
+    JobInteraction.upsert(
+        user_id,
+        job_id,
+        {"follow_up_data": data},
+        events=_follow_up_events(job_id, user_id, followup_data),
+        notifications=_follow_up_notifications(job_id, user_id, followup_data),
+    )
+    logger.info("Updated follow-up for job_id: %s by user_id: %s", job_id, user_id)
+    return jsonify(data), 200
+
+
+def _attach_job_snapshot(job_id: str, data: dict) -> None:
+    """Capture the job's title, company and link into the follow-up ``data``.
+
+    Notifications render from this snapshot instead of calling Rails when
+    they are sent; without one, the consumer fetches the job itself.
+    """
+    data.pop("jobSnapshot", None)
+    snapshot = capture_snapshot(job_id)
+    if snapshot:
+        data["jobSnapshot"] = snapshot
+    else:
+        get_logger().warning("Could not snapshot job details for job_id: %s", job_id)
+
+
+def _follow_up_notifications(job_id: str, user_id: str, followup_data: dict) -> list:
+    """Schedule the follow-up email for the follow-up date.
+
+    The notification is stored in Mongo and dispatched by the scheduler
+    (``python -m webapp.scheduler``) once it falls due.
+    """
+    logger = get_logger()
 
     # Use dateutil.parser to parse the followUpDate
-    follow_up_date = parser.isoparse(data["followUpDate"])
+    follow_up_date = parser.isoparse(followup_data["followUpDate"])
 
     # Calculate delay using offset-aware datetime
     delay = (follow_up_date - datetime.now(timezone.utc)).total_seconds()
 
-    if delay > 0:
-        # Schedule the task
-        send_followup_notification.apply_async(args=[followup_data], eta=follow_up_date)
-        logger.info(
-            f"Scheduled follow-up notification for job ID: {data['jobId']} at {follow_up_date}."
-        )
-    else:
+    if delay <= 0:
         logger.warning("The follow-up date is in the past. Email will not be sent.")
+        return []
+
+    logger.info(
+        f"Scheduled follow-up notification for job ID: {followup_data['jobId']} at {follow_up_date}."
+    )
+    return [
+        scheduled_notification(
+            user_id, job_id, followup_data, parse_datetime(follow_up_date)
+        )
+    ]
 
-    if data["status"] == "applied":
-        publish_job_application(job_id, user_id)
-        logger.info(f"Sent job application message for job ID: {data['jobId']}.")
-    return jsonify(data), 200
+
+def _follow_up_events(job_id: str, user_id: str, followup_data: dict) -> list:
+    """Build the outbox events a saved follow-up raises.
+
+    Applying for the job is announced on the ``job_applications`` queue once
+    the follow-up is committed.
+    """
+    logger = get_logger()
+    events = []
+    if followup_data["status"] == "applied":
+        events.append(
+            message_event("job_applications", {"job_id": job_id, "user_id": user_id})
+        )
+        logger.info(
+            f"Queued job application message for job ID: {followup_data['jobId']}."
+        )
+    return events
 
 
 @job_interaction_routes.route("/<string:job_id>/follow-ups", methods=["GET"])
@@ -180,7 +199,7 @@ def update_follow_up(job_id: str) -> tuple:
 def get_follow_up(job_id: str) -> tuple:
     logger = get_logger()
     user_id = request.user.get("user_id")
-    interaction = JobInteraction.find(user_id, job_id)
+    interaction = JobInteraction.find(user_id, job_id, fields=("follow_up_data",))
 
     if not interaction or not interaction.follow_up_data:
         logger.warning(
@@ -196,12 +215,27 @@ def get_follow_up(job_id: str) -> tuple:
 def track_view(job_id):
     logger = get_logger()
     logger.info("Tracking view for job_id: %s", job_id)
+
+    if config.VIEW_COUNT_MODE == "buffered":
+        # Rails is updated by the background flusher; the count is approximate
+        pending = get_view_counter().record(job_id)
+        try:
+            job_post = get_job_post_cache().get(job_id, COUNT_FIELDS)
+            view_count = (job_post.get("view_count") or 0) + pending
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not fetch view count for job_id %s: %s", job_id, e)
+            view_count = None
+        return {
+            "message": "View tracked successfully",
+            "view_count": view_count,
+            "last_viewed": datetime.now(timezone.utc).isoformat(),
+        }, 200
+
     try:
-        response = requests.post(
-            f"{RAILS_API_URL}/job_posts/{job_id}/increment_view_count"
+        data = get_rails_client().increment_view_count(job_id)
+        get_job_post_cache().update(
+            job_id, {field: data.get(field) for field in COUNT_FIELDS}
         )
-        response.raise_for_status()
-        data = response.json()
         view_count = data.get("view_count")
         last_viewed = data.get("last_viewed")
         logger.info("Updated view count for job_id: %s to %s", job_id, view_count)
@@ -223,7 +257,7 @@ def track_view(job_id):
 def track_interaction(job_id):
     logger = get_logger()
     user_id = request.user.get("user_id")
-    interaction = JobInteraction.find(user_id, job_id)
+    interaction = JobInteraction.find(user_id, job_id, fields=())
 
     if not interaction:
         new_interaction = JobInteraction(user_id=user_id, job_id=job_id)
@@ -235,17 +269,60 @@ def track_interaction(job_id):
     return {"message": "Interaction tracked successfully"}, 200
 
 
+@job_interaction_routes.route("/status", methods=["GET"])
+@token_required
+def get_interaction_statuses():
+    """Return the interaction status of many jobs, e.g. ``/status?ids=1,2,3``."""
+    logger = get_logger()
+    user_id = request.user.get("user_id")
+    job_ids = list(dict.fromkeys(filter(None, request.args.get("ids", "").split(","))))
+
+    if not job_ids:
+        return jsonify({"message": "No job IDs provided"}), 400
+    if len(job_ids) > config.STATUS_BATCH_MAX_IDS:
+        return (
+            jsonify(
+                {"message": f"At most {config.STATUS_BATCH_MAX_IDS} job IDs allowed"}
+            ),
+            400,
+        )
+
+    # Rails misses are fetched concurrently and share one latency budget
+    job_posts = get_job_post_cache().get_many(job_ids, COUNT_FIELDS)
+    interactions = JobInteraction.find_many(user_id, job_ids)
+
+    statuses = {}
+    for job_id in job_ids:
+        interaction = interactions.get(job_id)
+        job_post_data = job_posts.get(job_id)
+        statuses[job_id] = {
+            "isPinned": interaction.is_pinned if interaction else False,
+            "isSaved": interaction.is_saved if interaction else False,
+            "hasFollowUp": interaction.has_follow_up if interaction else False,
+            "viewCount": job_post_data.get("view_count", 0) if job_post_data else None,
+            "lastViewed": job_post_data.get("last_viewed") if job_post_data else None,
+        }
+
+    missing = len(job_ids) - len(job_posts)
+    if missing:
+        logger.warning(
+            "Job post data unavailable for %s of the requested jobs", missing
+        )
+    logger.info("Returned interaction statuses for %s jobs", len(job_ids))
+    return jsonify({"statuses": statuses}), 200
+
+
 @job_interaction_routes.route("/status/<string:job_id>", methods=["GET"])
 @token_required
 def get_interaction_status(job_id):
     logger = get_logger()
     user_id = request.user.get("user_id")
-    interaction = JobInteraction.find(user_id, job_id)
+    interaction = JobInteraction.find(
+        user_id, job_id, fields=JobInteraction.STATUS_FIELDS
+    )
 
     try:
-        response = requests.get(f"{RAILS_API_URL}/job_posts/{job_id}")
-        response.raise_for_status()
-        job_post_data = response.json()
+        job_post_data = get_job_post_cache().get(job_id, COUNT_FIELDS)
         logger.info("Fetched job post data for job_id: %s", job_id)
     except requests.exceptions.RequestException as e:
         logger.error(
@@ -272,3 +349,233 @@ def get_interaction_status(job_id):
 
     logger.info("Returned interaction status for job_id: %s", job_id)
     return jsonify(response), 200
+
+
+def _list_interactions(flag: str) -> tuple:
+    """Return one keyset-paginated page of the user's interactions with ``flag``."""
+    logger = get_logger()
+    user_id = request.user.get("user_id")
+    cursor = request.args.get("cursor")
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"message": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    fields = JobInteraction.STATUS_FIELDS
+    if flag == "has_follow_up":
+        fields = (*fields, "follow_up_data")
+
+    try:
+        interactions, next_cursor = JobInteraction.list_for_user(
+            user_id, flag, limit=limit, cursor=cursor, fields=fields
+        )
+    except ValueError:
+        logger.warning("Invalid listing cursor from user_id: %s", user_id)
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    items = []
+    for interaction in interactions:
+        item = {
+            "jobId": interaction.job_id,
+            "isPinned": interaction.is_pinned,
+            "isSaved": interaction.is_saved,
+            "hasFollowUp": interaction.has_follow_up,
+        }
+        if flag == "has_follow_up":
+            item["followUp"] = interaction.follow_up_data
+        items.append(item)
+
+    return jsonify({"items": items, "nextCursor": next_cursor}), 200
+
+
+@job_interaction_routes.route("/pinned", methods=["GET"])
+@token_required
+def list_pinned() -> tuple:
+    return _list_interactions("is_pinned")
+
+
+@job_interaction_routes.route("/saved", methods=["GET"])
+@token_required
+def list_saved() -> tuple:
+    return _list_interactions("is_saved")
+
+
+@job_interaction_routes.route("/follow-ups", methods=["GET"])
+@token_required
+def list_follow_ups() -> tuple:
+    return _list_interactions("has_follow_up")
+
+
+@job_interaction_routes.route("/sync", methods=["GET"])
+@token_required
+def sync_interactions() -> tuple:
+    """Return the user's interaction changes since ``cursor`` in a compact form.
+
+    ``jobIds`` and ``flags`` are parallel arrays; each flags entry is a
+    bitfield of SYNC_FLAG_BITS, and 0 means every flag was cleared. Clients
+    store ``cursor`` and send it back on the next sync; ``hasMore`` tells them
+    to sync again straight away.
+    """
+    logger = get_logger()
+    user_id = request.user.get("user_id")
+
+    try:
+        documents, cursor, has_more = JobInteraction.changes_since(
+            user_id, cursor=request.args.get("cursor"), limit=SYNC_PAGE_SIZE
+        )
+    except ValueError:
+        logger.warning("Invalid sync cursor from user_id: %s", user_id)
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    job_ids = []
+    flags = []
+    for document in documents:
+        job_ids.append(document["job_id"])
+        flags.append(
+            sum(bit for field, bit in SYNC_FLAG_BITS.items() if document.get(field))
+        )
+
+    logger.info("Synced %s interaction changes for user_id: %s", len(job_ids), user_id)
+    return (
+        jsonify(
+            {"jobIds": job_ids, "flags": flags, "cursor": cursor, "hasMore": has_more}
+        ),
+        200,
+    )
+
+
+def _parse_batch_operation(operation, received_at):
+    """Return ``(job_id, fields, written_at)`` for one batch operation.
+
+    Raises ValueError when the operation is malformed.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+    job_id = operation.get("jobId")
+    if not isinstance(job_id, str) or not job_id:
+        raise ValueError("jobId is required")
+
+    fields = {}
+    for key, field in BATCH_FIELDS.items():
+        if key in operation:
+            if not isinstance(operation[key], bool):
+                raise ValueError(f"{key} must be a boolean")
+            fields[field] = operation[key]
+
+    written_at = received_at
+    if operation.get("clientTimestamp") is not None:
+        try:
+            written_at = parse_datetime(operation["clientTimestamp"])
+        except ValueError as e:
+            raise ValueError("clientTimestamp must be an ISO 8601 string") from e
+        # A client clock running ahead must not outrank every later replay
+        written_at = min(written_at, received_at)
+    return job_id, fields, written_at
+
+
+def _merge_batch_operations(valid):
+    """Fold operations on the same job into one, field by field.
+
+    ``valid`` holds ``(position, (job_id, fields, written_at))`` pairs. Each
+    field keeps the value with the newest ``written_at``, or the later one in
+    the batch on a tie. Returns ``{job_id: {field: (value, written_at,
+    position)}}`` in first-seen order.
+    """
+    merged = {}
+    for position, (job_id, fields, written_at) in valid:
+        job_fields = merged.setdefault(job_id, {})
+        for name, value in fields.items():
+            if name not in job_fields or written_at >= job_fields[name][1]:
+                job_fields[name] = (value, written_at, position)
+    return merged
+
+
+def _batch_result(position, op_fields, merged_fields, result, seen_job):
+    """The result of the operation at ``position`` within its job's merged write.
+
+    The job's first operation reports a created document; the others, like
+    operations on existing documents, are "applied" if they set a field (or
+    had none to set) and "stale" if newer writes won every field.
+    """
+    if result["status"] == "error":
+        return {"status": "error", "error": result["error"]}
+    if result["status"] == "created" and not seen_job:
+        return {"status": "created"}
+    won = [
+        name
+        for name in op_fields
+        if merged_fields[name][2] == position and name in result["fields"]
+    ]
+    return {"status": "applied" if won or not op_fields else "stale"}
+
+
+@job_interaction_routes.route("/batch", methods=["POST"])
+@token_required
+def batch_interactions() -> tuple:
+    """Apply interactions queued by an offline client in one request.
+
+    Takes ``{"operations": [{"jobId", "isPinned"?, "isSaved"?,
+    "clientTimestamp"?}, ...]}``. An operation without flags only records the
+    interaction. Conflicts are resolved last-writer-wins per flag on
+    ``clientTimestamp`` (defaulting to, and capped at, the time of the
+    request); operations on the same job are merged in order first. The
+    response has one result per operation, in order; an operation whose flags
+    newer writes already superseded comes back as "stale".
+    """
+    logger = get_logger()
+    user_id = request.user.get("user_id")
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "No operations provided"}), 400
+    if len(operations) > config.INTERACTION_BATCH_MAX_OPS:
+        return (
+            jsonify(
+                {
+                    "message": f"At most {config.INTERACTION_BATCH_MAX_OPS} "
+                    "operations allowed"
+                }
+            ),
+            400,
+        )
+
+    received_at = datetime.utcnow()
+    results = [None] * len(operations)
+    valid = []
+    for position, operation in enumerate(operations):
+        try:
+            valid.append((position, _parse_batch_operation(operation, received_at)))
+        except ValueError as e:
+            results[position] = {"status": "invalid", "error": str(e)}
+
+    if valid:
+        merged = _merge_batch_operations(valid)
+        written = JobInteraction.bulk_upsert(
+            user_id,
+            [
+                (job_id, {name: (value, at) for name, (value, at, _) in fields.items()})
+                for job_id, fields in merged.items()
+            ],
+        )
+        written = dict(zip(merged, written))
+        seen = set()
+        for position, (job_id, fields, _) in valid:
+            results[position] = _batch_result(
+                position, fields, merged[job_id], written[job_id], job_id in seen
+            )
+            seen.add(job_id)
+
+    for position, operation in enumerate(operations):
+        job_id = operation.get("jobId") if isinstance(operation, dict) else None
+        results[position] = {"jobId": job_id, **results[position]}
+
+    logger.info(
+        "Applied %s of %s batched interactions for user_id: %s",
+        len(valid),
+        len(operations),
+        user_id,
+    )
+    return jsonify({"results": results}), 200
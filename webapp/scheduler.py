@@ -0,0 +1,199 @@
+"""Mongo-backed scheduler for follow-up notifications.
+
+A follow-up due weeks from now is stored as a document in the
+``scheduled_notifications`` collection instead of as a Celery ETA task held in
+worker memory. It is staged on the interaction by the same write as the
+follow-up itself (see ``JobInteraction.upsert``) and moved into the collection
+by the outbox relay. A poller hands due notifications to the
+``followup_notifications`` queue::
+
+    python -m webapp.scheduler
+
+Only one batch is held in memory at a time, however far ahead follow-ups are
+scheduled.
+
+Each follow-up has at most one scheduled notification, keyed by
+``(user_id, job_id)`` and stamped with the ``follow_up_data`` version it was
+scheduled for, so rescheduling replaces the pending notification instead of
+adding another. Before publishing, the scheduler drops notifications whose
+version has been superseded or already notified, which also makes repeated
+dispatches of the same notification harmless. A notification is marked sent
+only after the broker confirmed it.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+
+from webapp import mongo
+from webapp.config import get_config
+from webapp.models.job_interaction import JobInteraction
+from webapp.producer import followup_message
+from webapp.publisher import RabbitMQPublisher
+from webapp.utils import leasing
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = "followup_notifications"
+
+
+def notification_key(user_id, job_id):
+    """The idempotency key of a follow-up's scheduled notification."""
+    return f"{user_id}:{job_id}"
+
+
+def scheduled_notification(user_id, job_id, followup_data, due_at):
+    """A notification for ``followup_data``, due at the naive UTC ``due_at``.
+
+    ``JobInteraction.upsert`` stamps it with the follow-up version.
+    """
+    return {
+        "_id": notification_key(user_id, job_id),
+        "user_id": user_id,
+        "job_id": job_id,
+        "payload": followup_message(followup_data),
+        "due_at": due_at,
+        "status": "scheduled",
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+        "next_attempt_at": due_at,
+    }
+
+
+class NotificationScheduler:
+    """Hands due scheduled notifications to RabbitMQ in batches.
+
+    Batches are claimed with a lease (see ``webapp.utils.leasing``), so several
+    schedulers can run side by side. A notification that fails to publish is
+    retried with exponential backoff, up to ``max_backoff`` seconds, without
+    holding up the rest of its batch.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        batch_size=100,
+        poll_interval=5,
+        lease_seconds=60,
+        max_backoff=300,
+    ):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_backoff = max_backoff
+        self._stopped = threading.Event()
+        self.dispatched = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            RabbitMQPublisher(config.RABBITMQ_URL, pool_size=1, confirm_delivery=True),
+            batch_size=config.SCHEDULER_BATCH_SIZE,
+            poll_interval=config.SCHEDULER_POLL_INTERVAL,
+            lease_seconds=config.SCHEDULER_LEASE_SECONDS,
+            max_backoff=config.SCHEDULER_MAX_BACKOFF,
+        )
+
+    def run(self):
+        """Dispatch until ``stop`` is called, idling once a poll comes up short."""
+        logger.info("Notification scheduler started")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    dispatched = self.dispatch_batch()
+                except Exception as e:
+                    logger.error("Unexpected error dispatching notifications: %s", e)
+                    dispatched = 0
+                if dispatched < self.batch_size:
+                    self._stopped.wait(self.poll_interval)
+        finally:
+            self.publisher.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def dispatch_batch(self):
+        """Claim and publish a batch of due notifications; returns the batch size."""
+        collection = mongo.db.scheduled_notifications
+        notifications = leasing.claim_due(
+            collection, "scheduled", self.batch_size, self.lease_seconds
+        )
+        current = JobInteraction.follow_up_versions(
+            (n["user_id"], n["job_id"]) for n in notifications if n.get("version")
+        )
+        sent, skipped = [], []
+        for notification in notifications:
+            if self._superseded(notification, current):
+                skipped.append(notification)
+                continue
+            try:
+                self.publisher.publish(QUEUE_NAME, json.dumps(notification["payload"]))
+            except Exception as e:
+                logger.error(
+                    "Failed to dispatch notification %s: %s", notification["_id"], e
+                )
+                self.failed += 1
+                leasing.retry_later(collection, notification, self.max_backoff)
+                continue
+            if notification.get("version"):
+                JobInteraction.mark_follow_up_notified(
+                    notification["user_id"],
+                    notification["job_id"],
+                    notification["version"],
+                )
+            sent.append(notification)
+
+        if sent:
+            leasing.complete(collection, sent)
+            self.dispatched += len(sent)
+            logger.info("Dispatched %s scheduled notifications", len(sent))
+        if skipped:
+            leasing.discard(collection, skipped)
+            self.skipped += len(skipped)
+            logger.info("Skipped %s superseded notifications", len(skipped))
+        return len(notifications)
+
+    def stats(self):
+        return {
+            "dispatched": self.dispatched,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "due": mongo.db.scheduled_notifications.count_documents(
+                {"status": "scheduled", "next_attempt_at": {"$lte": datetime.utcnow()}}
+            ),
+        }
+
+    @staticmethod
+    def _superseded(notification, current):
+        """Whether a newer follow-up replaced ``notification`` or it already went out.
+
+        Notifications scheduled before follow-ups were versioned are sent as is.
+        """
+        version = notification.get("version")
+        if not version:
+            return False
+        latest, notified = current.get(
+            (notification["user_id"], notification["job_id"]), (None, None)
+        )
+        return latest != version or (notified or 0) >= version
+
+
+def main():
+    from webapp import create_app
+
+    flask_app, _ = create_app()
+    scheduler = NotificationScheduler.from_config(get_config())
+    with flask_app.app_context():
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,142 @@
+import bisect
+import logging
+import os
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the send latency histogram buckets; the last is open
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Errors that mean the SMTP session is gone rather than the message rejected
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _Session:
+    __slots__ = ("connection", "sent", "last_used")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Long-lived Flask-Mail SMTP sessions, one per sending thread.
+
+    Each thread keeps its ``mail.connect()`` session open and sends message
+    after message over it, so the TCP, TLS and AUTH handshakes happen once per
+    ``max_messages`` emails instead of once per email. A session idle for
+    longer than ``max_idle`` seconds is replaced before use, since servers
+    drop idle clients, and a send that finds the server gone reconnects and
+    retries once. Callers need an app context, as for ``mail.send``.
+    """
+
+    def __init__(self, mail, max_messages=100, max_idle=60):
+        self.mail = mail
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self.reconnects = 0
+        self._latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._latency_total_ms = 0.0
+
+    def send(self, message):
+        """Send ``message`` over this thread's session, opening it if needed."""
+        started = time.monotonic()
+        try:
+            session = self._session()
+            try:
+                session.connection.send(message)
+            except DISCONNECT_ERRORS as e:
+                logger.warning("SMTP session lost, reconnecting: %s", e)
+                self._drop(session)
+                with self._lock:
+                    self.reconnects += 1
+                session = self._session()
+                session.connection.send(message)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+        session.sent += 1
+        session.last_used = time.monotonic()
+        self._observe((session.last_used - started) * 1000)
+        if session.sent >= self.max_messages:
+            self._drop(session)
+
+    def close(self):
+        """Quit every open session; used at shutdown."""
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            self._drop(session)
+
+    def stats(self):
+        with self._lock:
+            observed = sum(self._latency_counts)
+            histogram = {
+                f"le_{bound}ms": count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self._latency_counts)
+            }
+            histogram["le_inf"] = self._latency_counts[-1]
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "open": len(self._sessions),
+                "connections_opened": self.connections_opened,
+                "reconnects": self.reconnects,
+                "latency_ms": histogram,
+                "latency_avg_ms": self._latency_total_ms / observed if observed else 0,
+            }
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is not None and self._local.pid != os.getpid():
+            # Inherited across a fork: the socket belongs to the parent
+            with self._lock:
+                self._sessions.discard(session)
+            session = None
+        elif session is not None and (
+            time.monotonic() - session.last_used > self.max_idle
+        ):
+            self._drop(session)
+            session = None
+
+        if session is None:
+            connection = self.mail.connect()
+            connection.__enter__()
+            session = _Session(connection)
+            self._local.session = session
+            self._local.pid = os.getpid()
+            with self._lock:
+                self._sessions.add(session)
+                self.connections_opened += 1
+        return session
+
+    def _drop(self, session):
+        """Forget ``session`` and quit it; a dead session may fail to quit."""
+        if getattr(self._local, "session", None) is session:
+            self._local.session = None
+        with self._lock:
+            self._sessions.discard(session)
+        try:
+            session.connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError) as e:
+            logger.debug("Error closing SMTP session: %s", e)
+
+    def _observe(self, elapsed_ms):
+        with self._lock:
+            self.sent += 1
+            self._latency_total_ms += elapsed_ms
+            self._latency_counts[
+                bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+            ] += 1
@@ -1,22 +1,108 @@
+import hashlib
 from functools import wraps
 
-import requests
+import jwt
 from flask import jsonify, request
 
 from webapp.config import get_config
+from webapp.rails_client import get_rails_client
+from webapp.utils.cache import MISSING, TTLCache
 
 config = get_config()
 
+# Rails answers these statuses for tokens it has rejected; anything else
+# (e.g. a 5xx) is treated as transient and is not negatively cached.
+REJECTED_STATUS_CODES = (401, 403)
+
+# Validated tokens keyed by their SHA-256 digest so raw tokens never sit in memory
+token_cache = TTLCache(maxsize=config.TOKEN_CACHE_MAXSIZE, ttl=config.TOKEN_CACHE_TTL)
+
+
+def _token_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+_jwks_client = None
+
+
+def _get_jwks_client():
+    global _jwks_client
+    if _jwks_client is None and config.JWT_JWKS_URL:
+        _jwks_client = jwt.PyJWKClient(
+            config.JWT_JWKS_URL, cache_keys=True, lifespan=config.JWT_JWKS_LIFESPAN
+        )
+    return _jwks_client
+
+
+def _get_signing_key(token):
+    """Return the key to verify ``token`` with, or None if it is not known locally."""
+    jwks_client = _get_jwks_client()
+    if jwks_client is not None and jwt.get_unverified_header(token).get("kid"):
+        try:
+            return jwks_client.get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientError:
+            return None
+    return config.JWT_SECRET_KEY
+
+
+def verify_jwt(token):
+    """Verify a signed access token locally and return the user info it carries.
+
+    Returns None when the token cannot be verified here (malformed, expired,
+    signed with an unknown key, ...) so the caller can fall back to Rails.
+    """
+    try:
+        key = _get_signing_key(token)
+        if key is None:
+            return None
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=config.JWT_ALGORITHMS,
+            audience=config.JWT_AUDIENCE,
+            issuer=config.JWT_ISSUER,
+            options={"verify_aud": config.JWT_AUDIENCE is not None},
+        )
+    except jwt.InvalidTokenError:
+        return None
+
+    user_id = claims.get(config.JWT_USER_ID_CLAIM)
+    if user_id is None:
+        return None
+    return {"user_id": user_id, "email": claims.get(config.JWT_EMAIL_CLAIM)}
+
 
 def validate_token(token):
-    response = requests.post(
-        f"{config.RAILS_API_URL}/validate_token", json={"access_token": token}
-    )
+    if config.AUTH_VERIFICATION_MODE == "jwt":
+        user_info = verify_jwt(token)
+        if user_info is not None:
+            return user_info
+
+    return _validate_token_remote(token)
+
+
+def _validate_token_remote(token):
+    key = _token_key(token)
+    cached = token_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    response = get_rails_client().validate_token(token)
 
     if response.status_code == 200:
-        return response.json()
-    else:
-        return None
+        user_info = response.json()
+        token_cache.set(key, user_info)
+        return user_info
+
+    if response.status_code in REJECTED_STATUS_CODES:
+        token_cache.set(key, None, ttl=config.TOKEN_CACHE_NEGATIVE_TTL)
+    return None
+
+
+def token_cache_stats():
+    """Return hit/miss counters for the token validation cache."""
+    return token_cache.stats()
 
 
 def token_required(f):
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+
+from dateutil import parser
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 string (or datetime) into a naive UTC datetime.
+
+    MongoDB stores datetimes as UTC and PyMongo hands them back naive, so
+    values are normalised to that form before they are stored or compared.
+    Raises ValueError for anything that is not a valid ISO 8601 timestamp.
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = parser.isoparse(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid ISO 8601 timestamp: {value!r}") from e
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def format_datetime(value):
+    """Format a naive UTC datetime as an ISO 8601 string with its offset."""
+    return value.replace(tzinfo=timezone.utc).isoformat()
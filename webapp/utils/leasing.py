@@ -0,0 +1,92 @@
+"""Lease-based work claiming for Mongo-backed queues (outbox, schedules).
+
+Queue documents carry ``status``, ``next_attempt_at`` and ``attempts``. A
+worker claims due documents by stamping them with a claim token and pushing
+``next_attempt_at`` one lease into the future, so several workers can poll the
+same collection and a document claimed by a worker that died becomes due
+again once its lease runs out.
+"""
+
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+
+def claim_due(collection, status, batch_size, lease_seconds):
+    """Claim up to ``batch_size`` due documents, oldest due first."""
+    now = datetime.utcnow()
+    due = {"status": status, "next_attempt_at": {"$lte": now}}
+    ids = [
+        document["_id"]
+        for document in collection.find(due, {"_id": 1})
+        .sort([("next_attempt_at", 1), ("_id", 1)])
+        .limit(batch_size)
+    ]
+    if not ids:
+        return []
+
+    # Another worker may claim some of the same documents first; the claim
+    # token tells us which ones we won.
+    claim = ObjectId()
+    collection.update_many(
+        {**due, "_id": {"$in": ids}},
+        {
+            "$set": {
+                "claim": claim,
+                "next_attempt_at": now + timedelta(seconds=lease_seconds),
+            }
+        },
+    )
+    return list(collection.find({"claim": claim}).sort("_id", 1))
+
+
+def complete(collection, documents, status="sent"):
+    """Mark claimed documents done; ``sent_at`` drives their expiry."""
+    if documents:
+        collection.update_many(
+            _claimed(documents),
+            {
+                "$set": {"status": status, "sent_at": datetime.utcnow()},
+                "$unset": {"claim": ""},
+            },
+        )
+
+
+def discard(collection, documents):
+    """Delete claimed documents that turned out to be dead work."""
+    if documents:
+        collection.delete_many(_claimed(documents))
+
+
+def retry_later(collection, document, max_backoff):
+    """Give up a claimed document for now, backing off exponentially."""
+    backoff = min(2 ** document["attempts"], max_backoff)
+    collection.update_one(
+        _claimed([document]),
+        {
+            "$set": {"next_attempt_at": datetime.utcnow() + timedelta(seconds=backoff)},
+            "$inc": {"attempts": 1},
+            "$unset": {"claim": ""},
+        },
+    )
+
+
+def release(collection, documents):
+    """Hand claimed documents back untouched, due straight away."""
+    if documents:
+        collection.update_many(
+            _claimed(documents),
+            {"$set": {"next_attempt_at": datetime.utcnow()}, "$unset": {"claim": ""}},
+        )
+
+
+def _claimed(documents):
+    """Match ``documents`` only while they still carry the claim they came with.
+
+    A document rewritten since it was claimed (a rescheduled notification, for
+    instance) has lost its claim and is left alone.
+    """
+    return {
+        "_id": {"$in": [document["_id"] for document in documents]},
+        "claim": {"$in": list({document["claim"] for document in documents})},
+    }
@@ -0,0 +1,32 @@
+import os
+import threading
+
+
+class ProcessLocal:
+    """A lazily created, process-wide object that is created again after a fork.
+
+    Pre-forking servers (gunicorn, Celery prefork) fork workers after the
+    parent may have built the object; sockets, threads and pools it holds
+    must not be shared with the child, so ``get`` calls ``factory`` once in
+    every process that asks.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def reset(self):
+        """Forget the object, so the next ``get`` creates a new one."""
+        with self._lock:
+            self._value = None
+            self._pid = None
@@ -0,0 +1,343 @@
+import atexit
+import logging
+import threading
+import uuid
+
+import requests
+from pymongo import UpdateOne
+
+from webapp import mongo
+from webapp.config import get_config
+from webapp.job_post_cache import get_job_post_cache
+from webapp.rails_client import get_rails_client
+from webapp.utils.process_local import ProcessLocal
+
+logger = logging.getLogger(__name__)
+
+# Client errors that are worth retrying all the same
+RETRYABLE_STATUSES = (408, 429)
+
+
+class ViewCountBuffer:
+    """Write-behind buffer for job post views.
+
+    ``record`` only bumps an in-process counter; a background thread flushes
+    the aggregated increments to Rails in batches every ``flush_interval``
+    seconds, or sooner once ``max_buffer_size`` distinct jobs are pending.
+    Each batch carries an idempotency key, and a batch that fails is retried
+    unchanged with the same key, so Rails can ignore a retry of a batch it
+    applied before the request timed out. At most ``max_unsent_batches``
+    failed batches are held in memory; the rest wait in the
+    ``view_count_backlog`` collection until Rails accepts views again. On
+    shutdown, pending views are flushed one last time (unless
+    ``flush_on_shutdown`` is off) and whatever is left is spilled to the
+    backlog, which the next worker to start loads back in.
+    """
+
+    def __init__(
+        self,
+        flush_interval=5,
+        max_buffer_size=1000,
+        flush_batch_size=500,
+        flush_on_shutdown=True,
+        max_unsent_batches=100,
+    ):
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+        self.flush_batch_size = flush_batch_size
+        self.flush_on_shutdown = flush_on_shutdown
+        self.max_unsent_batches = max_unsent_batches
+        self._pending = {}
+        # (idempotency_key, increments) batches that failed, oldest first
+        self._unsent = []
+        # Views per job in batches not yet delivered, including those in flight
+        self._unsent_counts = {}
+        # Whether batches were spilled to Mongo to keep ``_unsent`` bounded
+        self._overflowed = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flush_failures = 0
+        self.dead_batches = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            flush_interval=config.VIEW_COUNT_FLUSH_INTERVAL,
+            max_buffer_size=config.VIEW_COUNT_MAX_BUFFER,
+            flush_batch_size=config.VIEW_COUNT_FLUSH_BATCH_SIZE,
+            flush_on_shutdown=config.VIEW_COUNT_FLUSH_ON_SHUTDOWN,
+            max_unsent_batches=config.VIEW_COUNT_MAX_UNSENT_BATCHES,
+        )
+
+    def start(self):
+        """Load any spilled backlog and start the background flusher."""
+        self._overflowed = self._load_backlog(self.max_unsent_batches)
+        self._thread = threading.Thread(
+            target=self._run, name="view-count-flusher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flusher and deliver (or spill) everything still pending."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval)
+        if self.flush_on_shutdown:
+            self.flush()
+        self._spill_backlog()
+
+    def record(self, job_id):
+        """Count one view of ``job_id`` and return its not-yet-flushed views."""
+        with self._lock:
+            self._pending[job_id] = self._pending.get(job_id, 0) + 1
+            self.recorded += 1
+            buffer_full = len(self._pending) >= self.max_buffer_size
+            pending = self._pending_views(job_id)
+        if buffer_full:
+            self._wake.set()
+        return pending
+
+    def pending(self, job_id):
+        with self._lock:
+            return self._pending_views(job_id)
+
+    def flush(self):
+        """Send failed batches again, then the pending increments, to Rails.
+
+        A batch Rails rejects with a client error can never succeed; it is
+        set aside in ``view_count_backlog`` as dead. Any other failure ends
+        the flush, and the batch moves behind the others, keeping its
+        idempotency key for the next flush. Delivered increments are added to
+        the cached job posts, so served counts do not drop once the views
+        leave the buffer.
+        """
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending = self._pending, {}
+                batches, self._unsent = self._unsent, []
+                items = list(increments.items())
+                batches += [
+                    (
+                        uuid.uuid4().hex,
+                        dict(items[start : start + self.flush_batch_size]),
+                    )
+                    for start in range(0, len(items), self.flush_batch_size)
+                ]
+                for job_id, count in items:
+                    self._unsent_counts[job_id] = (
+                        self._unsent_counts.get(job_id, 0) + count
+                    )
+
+            for position, (key, batch) in enumerate(batches):
+                try:
+                    get_rails_client().increment_view_counts(batch, idempotency_key=key)
+                except requests.exceptions.RequestException as e:
+                    self.flush_failures += 1
+                    if self._rejected(e):
+                        logger.error(
+                            "Rails rejected %s view counts, setting them aside: %s",
+                            len(batch),
+                            e,
+                        )
+                        self._settle(batch)
+                        self._store_dead(key, batch, e)
+                        continue
+                    logger.error("Failed to flush %s view counts: %s", len(batch), e)
+                    self._keep_unsent(batches[position + 1 :] + [(key, batch)])
+                    return
+                self._settle(batch)
+                self._apply_to_cache(batch)
+                self.flushed += sum(batch.values())
+            if self._overflowed:
+                self._overflowed = self._load_backlog(self.max_unsent_batches)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending_jobs": len(set(self._pending) | set(self._unsent_counts)),
+                "pending_views": sum(self._pending.values())
+                + sum(self._unsent_counts.values()),
+                "unsent_batches": len(self._unsent),
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "flush_failures": self.flush_failures,
+                "dead_batches": self.dead_batches,
+            }
+
+    def _pending_views(self, job_id):
+        """Views of ``job_id`` not yet delivered; the caller holds ``_lock``."""
+        return self._pending.get(job_id, 0) + self._unsent_counts.get(job_id, 0)
+
+    @staticmethod
+    def _rejected(error):
+        """Whether Rails refused a batch in a way a retry cannot fix."""
+        response = getattr(error, "response", None)
+        return (
+            isinstance(error, requests.exceptions.HTTPError)
+            and response is not None
+            and 400 <= response.status_code < 500
+            and response.status_code not in RETRYABLE_STATUSES
+        )
+
+    def _settle(self, batch):
+        """Stop counting ``batch`` as pending, once delivered or given up on."""
+        with self._lock:
+            for job_id, count in batch.items():
+                remaining = self._unsent_counts.get(job_id, 0) - count
+                if remaining > 0:
+                    self._unsent_counts[job_id] = remaining
+                else:
+                    self._unsent_counts.pop(job_id, None)
+
+    def _keep_unsent(self, batches):
+        """Queue ``batches`` for the next flush, spilling those past the cap."""
+        with self._lock:
+            self._unsent[:0] = batches
+            excess = len(self._unsent) - self.max_unsent_batches
+            overflow = self._unsent[:excess] if excess > 0 else []
+            del self._unsent[: len(overflow)]
+        if overflow:
+            for _, batch in overflow:
+                self._settle(batch)
+            self._overflowed = True
+            self._write_backlog({}, overflow)
+
+    def _store_dead(self, key, batch, error):
+        """Keep a rejected batch for inspection; it is never loaded back."""
+        self.dead_batches += 1
+        try:
+            mongo.db.view_count_backlog.update_one(
+                {"_id": key},
+                {
+                    "$setOnInsert": {
+                        "batch": list(batch.items()),
+                        "dead": True,
+                        "error": str(error),
+                    }
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error("Lost dead batch of %s view counts: %s", len(batch), e)
+
+    @staticmethod
+    def _apply_to_cache(batch):
+        cache = get_job_post_cache()
+        for job_id, count in batch.items():
+            cached = cache.peek(job_id)
+            if cached is not None:
+                cache.update(
+                    job_id, {"view_count": (cached.get("view_count") or 0) + count}
+                )
+
+    def _merge(self, increments):
+        with self._lock:
+            for job_id, count in increments.items():
+                self._pending[job_id] = self._pending.get(job_id, 0) + count
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Unexpected error flushing view counts: %s", e)
+
+    def _load_backlog(self, limit=None):
+        """Claim view counts and failed batches spilled to Mongo.
+
+        Loads at most ``limit`` entries (all of them if None) and returns
+        whether more may be left.
+        """
+        loaded = 0
+        try:
+            while limit is None or loaded < limit:
+                doc = mongo.db.view_count_backlog.find_one_and_delete(
+                    {"dead": {"$exists": False}}
+                )
+                if doc is None:
+                    return False
+                loaded += 1
+                if "batch" in doc:
+                    batch = dict(doc["batch"])
+                    with self._lock:
+                        self._unsent.append((doc["_id"], batch))
+                        for job_id, count in batch.items():
+                            self._unsent_counts[job_id] = (
+                                self._unsent_counts.get(job_id, 0) + count
+                            )
+                else:
+                    self._merge({doc["_id"]: doc["count"]})
+        except Exception as e:
+            logger.error("Error loading view count backlog: %s", e)
+        return True
+
+    def _spill_backlog(self):
+        """Write everything undelivered to Mongo for the next worker."""
+        with self._lock:
+            increments, self._pending = self._pending, {}
+            batches, self._unsent = self._unsent, []
+            self._unsent_counts = {}
+        self._write_backlog(increments, batches)
+
+    @staticmethod
+    def _write_backlog(increments, batches):
+        """Add pending views to per-job counts and store failed batches whole.
+
+        Batches keep their idempotency keys, so their retry can still be
+        recognised by Rails.
+        """
+        operations = [
+            UpdateOne({"_id": job_id}, {"$inc": {"count": count}}, upsert=True)
+            for job_id, count in increments.items()
+        ] + [
+            # Stored as pairs: job IDs are not safe to use as field names
+            UpdateOne(
+                {"_id": key},
+                {"$setOnInsert": {"batch": list(batch.items())}},
+                upsert=True,
+            )
+            for key, batch in batches
+        ]
+        if not operations:
+            return
+        try:
+            mongo.db.view_count_backlog.bulk_write(operations, ordered=False)
+            logger.info(
+                "Spilled %s pending view counts and %s failed batches to Mongo",
+                len(increments),
+                len(batches),
+            )
+        except Exception as e:
+            logger.error(
+                "Lost %s pending view counts and %s failed batches: %s",
+                len(increments),
+                len(batches),
+                e,
+            )
+
+
+def _start_view_counter():
+    buffer = ViewCountBuffer.from_config(get_config())
+    buffer.start()
+    return buffer
+
+
+_buffer = ProcessLocal(_start_view_counter)
+
+
+def get_view_counter():
+    """Return the worker's started ViewCountBuffer, recreating it after a fork."""
+    return _buffer.get()